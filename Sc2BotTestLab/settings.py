@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
+import shlex
 from pathlib import Path
 from decouple import config
 
@@ -75,6 +76,9 @@ WSGI_APPLICATION = 'Sc2BotTestLab.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/6.0/ref/settings/#databases
 
+# Set by asgi.py when the site is served through the ASGI application
+RUNNING_UNDER_ASGI = config('DJANGO_SERVER_INTERFACE', default='wsgi') == 'asgi'
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
@@ -85,12 +89,53 @@ DATABASES = {
         'NAME': DATABASE_DIR / 'match_data.db',
     },
     'sc2bot_test_lab_db_2': {
-        'ENGINE': 'django.db.backends.mysql',
+        # Django's MySQL backend plus connection counters (test_lab/db_metrics.py)
+        'ENGINE': 'test_lab.db_backends.mysql',
         'NAME': config('DB_NAME', default='sc_bot'),
         'USER': config('DB_USER', default='root'),
         'PASSWORD': config('DB_PASSWORD', default='default'),
         'HOST': config('DB_HOST', default='localhost'),
         'PORT': config('DB_PORT', default='3306'),
+        # Keep connections open between requests instead of reconnecting every time,
+        # checking them before reuse so a connection MySQL dropped isn't handed out.
+        # Not under ASGI: sync code there runs on per-request threads, which would each
+        # keep a connection open, so Django advises against persistent connections
+        'CONN_MAX_AGE': config('DB_CONN_MAX_AGE', default=0 if RUNNING_UNDER_ASGI else 60, cast=int),
+        'CONN_HEALTH_CHECKS': config('DB_CONN_HEALTH_CHECKS', default=True, cast=bool),
+    }
+}
+
+# test_lab models live in sc2bot_test_lab_db_2. With ANALYTICS_READ_SNAPSHOT, analytics
+# views read the local sc2bot_test_lab_db snapshot instead, which is only as fresh as the
+# last `manage.py sync_analytics_snapshot` (run it with --interval to keep it current)
+DATABASE_ROUTERS = ['test_lab.routers.TestLabRouter']
+ANALYTICS_READ_SNAPSHOT = config('ANALYTICS_READ_SNAPSHOT', default=False, cast=bool)
+
+
+# Test runner
+# With a warm pool size above 0, trigger_tests queues matches for that many long-lived
+# workers (test_lab/warm_pool.py) instead of a new `docker compose run` per match.
+# '{name}' in the worker command is replaced with the worker's name.
+
+RUNNER_WARM_POOL_SIZE = config('RUNNER_WARM_POOL_SIZE', default=0, cast=int)
+RUNNER_WARM_POOL_COMMAND = config('RUNNER_WARM_POOL_COMMAND',
+                                  default='docker compose run --rm -i --name {name} -e WARM_POOL=1 bot',
+                                  cast=shlex.split)
+
+
+# Cache
+# Used for the rendered rows of finished test groups in match_list.html. Each group
+# has up to two (unfiltered and filtered by its difficulty), plus outdated versions
+# until they are culled, so the limit must stay well above twice the number of
+# groups: LocMemCache's default of 300 would evict rows on every page view
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'sc2bot-test-lab',
+        'OPTIONS': {
+            'MAX_ENTRIES': config('CACHE_MAX_ENTRIES', default=20000, cast=int),
+        },
     }
 }
 
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class TestLabConfig(AppConfig):
     name = 'test_lab'
+
+    def ready(self):
+        from . import signals  # noqa: F401
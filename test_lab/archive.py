@@ -0,0 +1,85 @@
+"""Move MatchEvent rows of old test groups into match_event_archive and back.
+
+Before a match's events leave the hot table they are folded into
+MatchBuildingTiming, so building_timing keeps working from the summaries.
+"""
+from django.db import router, transaction
+
+from .building_timings import record_building_timings
+from .models import Match, MatchEvent, MatchEventArchive, SnapshotChange
+
+BATCH_SIZE = 5000
+
+EVENT_FIELDS = ('id', 'match_id', 'event_type_id', 'label_id', 'game_timestamp')
+
+
+def archivable_test_groups(keep_groups: int) -> list[int]:
+    """Test groups older than the newest keep_groups that still have matches with hot events."""
+    group_ids = list(
+        Match.objects
+        .exclude(test_group_id=-1)
+        .order_by('-test_group_id')
+        .values_list('test_group_id', flat=True)
+        .distinct()
+    )
+    old_groups = group_ids[keep_groups:]
+    return sorted(set(
+        Match.objects
+        .filter(test_group_id__in=old_groups, events_archived=False)
+        .values_list('test_group_id', flat=True)
+    ))
+
+
+def _move_events(source, destination, match_id: int) -> int:
+    """Copy all events of a match from one table to the other in id order, deleting as it goes."""
+    moved = 0
+    while True:
+        rows = list(
+            source.objects
+            .filter(match_id=match_id)
+            .order_by('id')
+            .values_list(*EVENT_FIELDS)[:BATCH_SIZE]
+        )
+        if not rows:
+            return moved
+        destination.objects.bulk_create(
+            [destination(**dict(zip(EVENT_FIELDS, row))) for row in rows]
+        )
+        source.objects.filter(id__in=[row[0] for row in rows]).delete()
+        moved += len(rows)
+
+
+def _record_moved(match_id: int):
+    """Have the snapshot sync copy the match and both event tables' rows of it again."""
+    SnapshotChange.record(MatchEvent, 'match_id', [match_id])
+    SnapshotChange.record(MatchEventArchive, 'match_id', [match_id])
+    SnapshotChange.record(Match, 'id', [match_id])
+
+
+def archive_match(match_id: int) -> int:
+    """Summarize a match's building timings, then move its events to the archive table."""
+    record_building_timings([match_id])
+    with transaction.atomic(using=router.db_for_write(MatchEvent)):
+        moved = _move_events(MatchEvent, MatchEventArchive, match_id)
+        Match.objects.filter(id=match_id).update(events_archived=True)
+        _record_moved(match_id)
+    return moved
+
+
+def archive_test_group(test_group_id: int) -> int:
+    """Archive every match of a test group that still has hot events. Returns the number of events moved."""
+    match_ids = (
+        Match.objects
+        .filter(test_group_id=test_group_id, events_archived=False)
+        .values_list('id', flat=True)
+    )
+    return sum(archive_match(match_id) for match_id in list(match_ids))
+
+
+def restore_match_events(match_id: int) -> int:
+    """Move a single match's events back into the hot table."""
+    with transaction.atomic(using=router.db_for_write(MatchEvent)):
+        moved = _move_events(MatchEventArchive, MatchEvent, match_id)
+        Match.objects.filter(id=match_id).update(events_archived=False)
+        _record_moved(match_id)
+    return moved
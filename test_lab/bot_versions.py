@@ -0,0 +1,60 @@
+"""Which build of the bot played a test group: its git commit and run configuration.
+
+trigger_tests records a TestGroup before launching a group's matches. The
+commit is read from the bot checkout the containers are built from
+(runner.DOCKER_COMPOSE_PATH). Config files are fingerprinted too, since a
+tuning change doesn't always come with a commit.
+"""
+import asyncio
+import hashlib
+import os
+
+from django.utils import timezone
+
+from .models import TestGroup
+
+# Bot files whose contents are fingerprinted into TestGroup.config, relative to the bot checkout
+CONFIG_FILES = ['docker-compose.yml', 'config.yml']
+
+
+async def _git(cwd: str, *args: str) -> str | None:
+    """Output of a git command in the bot checkout, None if git isn't available or the command failed."""
+    try:
+        process = await asyncio.create_subprocess_exec(
+            'git', *args, cwd=cwd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL)
+    except OSError:
+        return None
+    stdout, _ = await process.communicate()
+    if process.returncode != 0:
+        return None
+    return stdout.decode('utf-8', errors='replace').strip()
+
+
+def _file_fingerprints(bot_path: str) -> dict[str, str]:
+    fingerprints = {}
+    for name in CONFIG_FILES:
+        path = os.path.join(bot_path, name)
+        if os.path.isfile(path):
+            with open(path, 'rb') as config_file:
+                fingerprints[name] = hashlib.sha1(config_file.read()).hexdigest()[:12]
+    return fingerprints
+
+
+async def record_test_group(test_group_id: int, bot_path: str, **options) -> TestGroup:
+    """Record the bot version about to play a test group, along with the run options it is started with.
+
+    A group that is started again (it never finished) gets the new version.
+    """
+    git_hash = await _git(bot_path, 'rev-parse', 'HEAD')
+    status = await _git(bot_path, 'status', '--porcelain', '--untracked-files=no')
+    subject = await _git(bot_path, 'log', '-1', '--format=%s')
+    files = await asyncio.to_thread(_file_fingerprints, bot_path)
+
+    test_group, _ = await TestGroup.objects.aupdate_or_create(id=test_group_id, defaults={
+        'created_at': timezone.now(),
+        'git_hash': git_hash or '',
+        'git_dirty': bool(status),
+        'git_subject': (subject or '')[:255],
+        'config': {**options, 'files': files},
+    })
+    return test_group
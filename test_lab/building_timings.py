@@ -0,0 +1,69 @@
+"""Fold a match's Building events into MatchBuildingTiming rows."""
+from django.db import router, transaction
+from django.db.models import Min
+
+from . import event_names
+from .models import Match, MatchBuildingTiming, MatchEvent, SnapshotChange
+
+
+def record_building_timings(match_ids) -> int:
+    """(Re)compute the first completion time of every building type for the given matches.
+
+    Returns the number of MatchBuildingTiming rows written.
+    """
+    match_ids = list(match_ids)
+    if not match_ids:
+        return 0
+
+    matches = Match.objects.filter(id__in=match_ids).values_list('id', 'test_group_id', 'result')
+    match_info = {match_id: (test_group_id, result) for match_id, test_group_id, result in matches}
+
+    building_type_id = event_names.event_types.id_for('Building', create=False)
+    first_times = [] if building_type_id is None else (
+        MatchEvent.objects
+        .filter(event_type_id=building_type_id, match_id__in=match_ids)
+        .values('match_id', 'label_id')
+        .annotate(first_time=Min('game_timestamp'))
+    )
+    timings = [
+        MatchBuildingTiming(
+            match_id=row['match_id'],
+            test_group_id=match_info[row['match_id']][0],
+            building_id=row['label_id'],
+            first_time=row['first_time'],
+            result=match_info[row['match_id']][1],
+        )
+        for row in first_times
+    ]
+
+    with transaction.atomic(using=router.db_for_write(MatchBuildingTiming)):
+        MatchBuildingTiming.objects.filter(match_id__in=match_ids).delete()
+        MatchBuildingTiming.objects.bulk_create(timings, batch_size=1000)
+        SnapshotChange.record(MatchBuildingTiming, 'match_id', match_ids)
+        # Marked even without any Building events, so the backfill doesn't look at them again
+        (Match.objects.filter(id__in=match_ids, end_timestamp__isnull=False)
+         .update(building_timings_recorded=True))
+    return len(timings)
+
+
+def finished_matches(missing_only: bool = True):
+    """Ids of finished matches whose events are still in the hot table.
+
+    With missing_only, only matches whose timings haven't been recorded since they finished.
+    """
+    matches = Match.objects.filter(end_timestamp__isnull=False, events_archived=False)
+    if missing_only:
+        matches = matches.filter(building_timings_recorded=False)
+    return matches.values_list('id', flat=True)
+
+
+def backfill_building_timings(recompute: bool = False, batch_size: int = 200) -> int:
+    """Record building timings for finished matches that don't have them yet (or all of them, with recompute).
+
+    Returns the number of MatchBuildingTiming rows written.
+    """
+    written = 0
+    match_ids = list(finished_matches(missing_only=not recompute))
+    for start in range(0, len(match_ids), batch_size):
+        written += record_building_timings(match_ids[start:start + batch_size])
+    return written
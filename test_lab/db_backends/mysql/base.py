@@ -0,0 +1,8 @@
+"""Django's MySQL backend with connection metrics (see test_lab.db_metrics)."""
+from django.db.backends.mysql import base
+
+from test_lab.db_metrics import ConnectionMetricsMixin
+
+
+class DatabaseWrapper(ConnectionMetricsMixin, base.DatabaseWrapper):
+    pass
@@ -0,0 +1,116 @@
+"""Per-process counters for database connection handling.
+
+ConnectionMetricsMixin is mixed into the MySQL backend (test_lab.db_backends.mysql)
+so every DatabaseWrapper reports how often it opens a new connection, reuses a
+persistent one (CONN_MAX_AGE) and fails a health check (CONN_HEALTH_CHECKS).
+
+Django has no connection pool for MySQL, so there is no pool wait to measure.
+The closest equivalent is the wait: how long a request's first query waits
+for a usable connection. That is the health check of a kept connection, or
+opening a new one.
+"""
+import threading
+import time
+from collections import defaultdict
+
+
+def _empty_stats() -> dict:
+    return {
+        'opened': 0,
+        'reused': 0,
+        'closed': 0,
+        'health_check_failures': 0,
+        'connect_seconds_total': 0.0,
+        'connect_seconds_max': 0.0,
+        'waits': 0,
+        'wait_seconds_total': 0.0,
+        'wait_seconds_max': 0.0,
+    }
+
+
+class ConnectionMetrics:
+    """Thread-safe connection counters keyed by database alias."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = defaultdict(_empty_stats)
+
+    def record_opened(self, alias: str, connect_seconds: float):
+        with self._lock:
+            stats = self._stats[alias]
+            stats['opened'] += 1
+            stats['connect_seconds_total'] += connect_seconds
+            stats['connect_seconds_max'] = max(stats['connect_seconds_max'], connect_seconds)
+
+    def record_wait(self, alias: str, wait_seconds: float):
+        with self._lock:
+            stats = self._stats[alias]
+            stats['waits'] += 1
+            stats['wait_seconds_total'] += wait_seconds
+            stats['wait_seconds_max'] = max(stats['wait_seconds_max'], wait_seconds)
+
+    def increment(self, alias: str, counter: str):
+        with self._lock:
+            self._stats[alias][counter] += 1
+
+    def snapshot(self) -> dict[str, dict]:
+        with self._lock:
+            return {alias: dict(stats) for alias, stats in self._stats.items()}
+
+
+connection_metrics = ConnectionMetrics()
+
+
+class ConnectionMetricsMixin:
+    """DatabaseWrapper mixin that records connection opens, reuses, closes and health check failures.
+
+    A connection counts as reused the first time a request runs a query on a
+    connection that was kept open from an earlier request.
+    """
+
+    # Whether the current connection has already been counted during this request
+    _counted_for_request = False
+
+    def get_new_connection(self, conn_params):
+        started = time.perf_counter()
+        connection = super().get_new_connection(conn_params)
+        connection_metrics.record_opened(self.alias, time.perf_counter() - started)
+        return connection
+
+    def _cursor(self, name=None):
+        if self._counted_for_request:
+            return super()._cursor(name)
+        # First query of the request: the health check or connect below is what it waits on
+        started = time.perf_counter()
+        cursor = super()._cursor(name)
+        connection_metrics.record_wait(self.alias, time.perf_counter() - started)
+        return cursor
+
+    def connect(self):
+        # Set first, since initializing the new connection already creates cursors
+        self._counted_for_request = True
+        super().connect()
+
+    def close_if_unusable_or_obsolete(self):
+        # Called by Django at the start and end of every request
+        super().close_if_unusable_or_obsolete()
+        self._counted_for_request = False
+
+    def close_if_health_check_failed(self):
+        # Called before every cursor is created, so this sees the first query of each request
+        reusing = self.connection is not None and not self._counted_for_request
+        super().close_if_health_check_failed()
+        if reusing and self.connection is not None:
+            self._counted_for_request = True
+            connection_metrics.increment(self.alias, 'reused')
+
+    def is_usable(self):
+        usable = super().is_usable()
+        if not usable:
+            connection_metrics.increment(self.alias, 'health_check_failures')
+        return usable
+
+    def _close(self):
+        if self.connection is not None:
+            connection_metrics.increment(self.alias, 'closed')
+        return super()._close()
@@ -0,0 +1,85 @@
+"""In-process cache of the EventType / EventLabel id <-> name dictionaries.
+
+MatchEvent rows only store small integer ids for their type and message. The
+dictionaries are tiny compared to the event table and almost never change, so
+each process keeps both directions in memory and only goes to the database for
+names it hasn't seen yet.
+"""
+import hashlib
+import threading
+
+from django.apps import apps
+
+
+def hash_label(name: str) -> str:
+    """Hash used for the unique index on EventLabel, since messages can be long text."""
+    return hashlib.sha1(name.encode('utf-8')).hexdigest()
+
+
+class NameCache:
+    """Two-way id <-> name map for one dictionary model, filled lazily from the database."""
+
+    def __init__(self, model_name: str, hashed: bool = False):
+        self.model_name = model_name
+        self.hashed = hashed
+        self._ids: dict[str, int] = {}
+        self._names: dict[int, str] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def model(self):
+        return apps.get_model('test_lab', self.model_name)
+
+    def _lookup(self, name: str) -> dict:
+        if self.hashed:
+            return {'name_hash': hash_label(name)}
+        return {'name': name}
+
+    def _remember(self, id: int, name: str):
+        with self._lock:
+            self._ids[name] = id
+            self._names[id] = name
+
+    def id_for(self, name: str, create: bool = True) -> int | None:
+        """Return the id for name, inserting a new dictionary row if needed (unless create is False)."""
+        id = self._ids.get(name)
+        if id is not None:
+            return id
+
+        queryset = self.model.objects
+        if create:
+            entry, _ = queryset.get_or_create(**self._lookup(name), defaults={'name': name})
+        else:
+            entry = queryset.filter(**self._lookup(name)).first()
+            if entry is None:
+                return None
+        self._remember(entry.id, name)
+        return entry.id
+
+    def name_for(self, id: int | None) -> str | None:
+        """Return the name for id, loading it from the database on a miss."""
+        if id is None:
+            return None
+        name = self._names.get(id)
+        if name is None:
+            name = self.names_for([id]).get(id)
+        return name
+
+    def names_for(self, ids) -> dict[int, str]:
+        """Return {id: name} for all ids, loading every missing one in a single query."""
+        ids = set(ids)
+        missing = [id for id in ids if id not in self._names]
+        if missing:
+            rows = self.model.objects.filter(id__in=missing).values_list('id', 'name')
+            for id, name in rows:
+                self._remember(id, name)
+        return {id: self._names[id] for id in ids if id in self._names}
+
+    def clear(self):
+        with self._lock:
+            self._ids.clear()
+            self._names.clear()
+
+
+event_types = NameCache('EventType')
+event_labels = NameCache('EventLabel', hashed=True)
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from test_lab.archive import archivable_test_groups, archive_test_group
+
+
+class Command(BaseCommand):
+    help = "Move events of old test groups to match_event_archive after summarizing their building timings."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keep-groups', type=int, default=20,
+                            help="Number of most recent test groups to leave in the hot table (default 20).")
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Only list the test groups that would be archived.")
+
+    def handle(self, *args, **options):
+        test_group_ids = archivable_test_groups(options['keep_groups'])
+        if not test_group_ids:
+            self.stdout.write("Nothing to archive.")
+            return
+
+        for test_group_id in test_group_ids:
+            if options['dry_run']:
+                self.stdout.write(f"Would archive test group {test_group_id}")
+                continue
+            moved = archive_test_group(test_group_id)
+            self.stdout.write(f"Archived test group {test_group_id}: {moved} events")
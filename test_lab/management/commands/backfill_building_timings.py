@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from test_lab.building_timings import backfill_building_timings
+
+
+class Command(BaseCommand):
+    help = "Fill match_building_timing for finished matches that don't have timings yet."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true',
+                            help="Recompute timings for every finished match that still has hot events.")
+
+    def handle(self, *args, **options):
+        written = backfill_building_timings(recompute=options['all'])
+        self.stdout.write(f"Wrote {written} building timings")
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from test_lab.regressions import compute_missing_reports, compute_report
+
+
+class Command(BaseCommand):
+    help = "Compare completed test groups with their baselines and store regression reports for groups without one."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help="Recompute the reports of every completed group.")
+        parser.add_argument('--group', type=int, help="Only (re)compute this group's report.")
+        parser.add_argument('--baseline', type=int,
+                            help="Baseline group for --group (default: latest pinned baseline, else the previous group).")
+
+    def handle(self, *args, **options):
+        if options['group'] is None:
+            if options['baseline'] is not None:
+                raise CommandError("--baseline needs --group")
+            written = compute_missing_reports(recompute=options['all'])
+            self.stdout.write(f"Wrote {written} regression reports")
+            return
+
+        report = compute_report(options['group'], options['baseline'])
+        if report is None:
+            raise CommandError(f"No earlier group at the same difficulty to compare group {options['group']} with")
+        self.stdout.write(report.summary)
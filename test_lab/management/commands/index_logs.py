@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from test_lab import runner
+from test_lab.search import index_log_files
+
+
+class Command(BaseCommand):
+    help = "Add lines appended to bot log files since the last run to the full-text search index."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--log-dir', default=runner.MATCH_OUTPUT_DIR,
+                            help="Directory containing the <match_id>_<race>_<build>.log files "
+                                 "(default: where the runner writes them).")
+
+    def handle(self, *args, **options):
+        added = index_log_files(options['log_dir'])
+        self.stdout.write(f"Indexed {added} new log lines")
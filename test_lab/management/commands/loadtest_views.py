@@ -0,0 +1,90 @@
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import RequestFactory
+
+from test_lab.db_metrics import connection_metrics
+from test_lab.routers import PRIMARY_DATABASE
+
+DEFAULT_URLS = ['/test_lab/', '/test_lab/maps/']
+
+
+def _percentile(sorted_values: list[float], percent: float) -> float:
+    index = min(len(sorted_values) - 1, int(len(sorted_values) * percent / 100))
+    return sorted_values[index]
+
+
+class Command(BaseCommand):
+    help = ("Send concurrent requests to the dashboard views through the WSGI handler and report latency "
+            "and database connection counts, once per CONN_MAX_AGE value.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', action='append', dest='urls',
+                            help="Path to request; repeat for several (default: match list and map breakdown).")
+        parser.add_argument('--concurrency', type=int, default=15,
+                            help="Number of simultaneous clients (default: 15).")
+        parser.add_argument('--requests', type=int, default=300,
+                            help="Requests per CONN_MAX_AGE value (default: 300).")
+        parser.add_argument('--conn-max-age', default='0,60',
+                            help="Comma separated CONN_MAX_AGE values to compare (default: 0,60).")
+        parser.add_argument('--database', default=PRIMARY_DATABASE,
+                            help=f"Database alias whose CONN_MAX_AGE is changed (default: {PRIMARY_DATABASE}).")
+        parser.add_argument('--primary-reads', action='store_true',
+                            help="Turn off ANALYTICS_READ_SNAPSHOT so analytics views also read the primary.")
+
+    def handle(self, *args, **options):
+        alias = options['database']
+        if alias not in connections.settings:
+            raise CommandError(f"Unknown database alias '{alias}'")
+        try:
+            max_ages = [int(value) for value in options['conn_max_age'].split(',')]
+        except ValueError:
+            raise CommandError("--conn-max-age must be a comma separated list of integers")
+        if options['primary_reads']:
+            settings.ANALYTICS_READ_SNAPSHOT = False
+
+        urls = options['urls'] or DEFAULT_URLS
+        handler = WSGIHandler()
+        environs = [RequestFactory(SERVER_NAME='localhost').get(url).environ for url in urls]
+
+        def send(number: int) -> tuple[float, int]:
+            started = time.perf_counter()
+            environ = dict(environs[number % len(environs)])
+            response = handler(environ, lambda status, headers: None)
+            b''.join(response)
+            # Closing the response fires request_finished, which is where Django drops
+            # or keeps the thread's connections depending on CONN_MAX_AGE
+            response.close()
+            return time.perf_counter() - started, response.status_code
+
+        for max_age in max_ages:
+            connections.settings[alias]['CONN_MAX_AGE'] = max_age
+            before = connection_metrics.snapshot().get(alias, {})
+
+            started = time.perf_counter()
+            # A new pool per run so persistent connections from the previous run aren't reused
+            with ThreadPoolExecutor(max_workers=options['concurrency']) as executor:
+                results = list(executor.map(send, range(options['requests'])))
+            elapsed = time.perf_counter() - started
+
+            after = connection_metrics.snapshot().get(alias, {})
+            latencies = sorted(latency for latency, _ in results)
+            errors = sum(1 for _, status in results if status >= 500)
+            self.stdout.write(
+                f"CONN_MAX_AGE={max_age}: {len(results)} requests in {elapsed:.2f}s "
+                f"({len(results) / elapsed:.1f}/s), errors {errors}, "
+                f"p50 {_percentile(latencies, 50) * 1000:.1f}ms, "
+                f"p95 {_percentile(latencies, 95) * 1000:.1f}ms, "
+                f"p99 {_percentile(latencies, 99) * 1000:.1f}ms, "
+                f"mean {statistics.mean(latencies) * 1000:.1f}ms"
+            )
+            counts = ', '.join(
+                f"{counter} {after.get(counter, 0) - before.get(counter, 0)}"
+                for counter in ('opened', 'reused', 'closed', 'health_check_failures')
+            )
+            self.stdout.write(f"  {alias} connections: {counts}")
@@ -0,0 +1,129 @@
+import hashlib
+import random
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+from django.core.management.base import BaseCommand
+from django.test.utils import setup_databases, teardown_databases
+
+from test_lab.models import EventLabel, Match, MatchBuildingTiming
+from test_lab.pivot import building_timing_pivot, map_breakdown_pivot, match_list_pivot, opponent_results
+from test_lab.routers import PRIMARY_DATABASE
+
+OPPONENTS = [(race, build) for race in ('Protoss', 'Terran', 'Zerg') for build in ('Rush', 'Timing', 'Macro', 'Power', 'Air')]
+DIFFICULTIES = ['Hard', 'VeryHard', 'CheatInsane']
+MAPS = ['Abyssal Reef', 'Acropolis', 'Automaton', 'Ephemeron', 'Thunderbird', 'Triton', 'Winter\'s Gate']
+RESULTS = ['Victory', 'Victory', 'Defeat', 'Crash']
+# Building types and how many each match records, like match_building_timing
+BUILDINGS = 40
+BUILDINGS_PER_MATCH = 12
+BATCH_SIZE = 5000
+
+
+def _seed(first_id: int, last_id: int, labels: list[EventLabel], rng: random.Random):
+    """Matches first_id..last_id, one group per len(OPPONENTS), with BUILDINGS_PER_MATCH timings each."""
+    started = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    for batch_start in range(first_id, last_id + 1, BATCH_SIZE):
+        matches, timings = [], []
+        for match_id in range(batch_start, min(batch_start + BATCH_SIZE, last_id + 1)):
+            group_id, opponent = divmod(match_id - 1, len(OPPONENTS))
+            race, build = OPPONENTS[opponent]
+            result = rng.choice(RESULTS)
+            matches.append(Match(
+                id=match_id, test_group_id=group_id, start_timestamp=started, end_timestamp=started,
+                map_name=rng.choice(MAPS), opponent_race=race, opponent_build=build,
+                opponent_difficulty=DIFFICULTIES[group_id % len(DIFFICULTIES)], result=result,
+                duration_in_game_time=rng.randint(120, 1800), building_timings_recorded=True))
+            for building in rng.sample(range(BUILDINGS), BUILDINGS_PER_MATCH):
+                timings.append(MatchBuildingTiming(match_id=match_id, test_group_id=group_id, building=labels[building],
+                                                   first_time=building * 20 + rng.random() * 60, result=result))
+        Match.objects.bulk_create(matches)
+        MatchBuildingTiming.objects.bulk_create(timings)
+
+
+def _measure(build) -> tuple[float, int]:
+    """Seconds of building a pivot and its marginals, and peak traced bytes of building it again.
+
+    Timed without tracing, since tracemalloc slows down allocation heavy code several times over.
+    """
+    started = time.perf_counter()
+    build()
+    elapsed = time.perf_counter() - started
+    tracemalloc.start()
+    build()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def _match_list():
+    matches = Match.objects.all()
+    pivot = match_list_pivot(matches)
+    table = pivot.arrange(sorted(pivot.rows, reverse=True), sorted(pivot.columns))
+    table.row_totals('victories')
+    opponent_results(matches)
+
+
+def _map_breakdown():
+    pivot = map_breakdown_pivot(Match.objects.all())
+    table = pivot.arrange(sorted(pivot.rows), sorted(pivot.columns))
+    table.row_totals('victories')
+    table.column_totals('victories')
+
+
+def _building_timing():
+    pivot = building_timing_pivot(MatchBuildingTiming.objects.all())
+    table = pivot.arrange(sorted(pivot.rows, reverse=True), pivot.columns)
+    table.column_totals('total')
+
+
+def _model_instances():
+    """What match_list and map_breakdown held before the pivots: every match as a model instance."""
+    return len(list(Match.objects.all()))
+
+
+class Command(BaseCommand):
+    help = ("Seed a throwaway test database with generated matches and building timings, then report the time "
+            "and peak memory of building the match_list, map_breakdown and building_timing pivots (queries "
+            "included) as the number of matches grows.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='10000,50000,100000,200000',
+                            help="Comma separated numbers of matches (default: 10000,50000,100000,200000).")
+        parser.add_argument('--skip-models', action='store_true',
+                            help="Don't measure loading the matches as model instances, for comparison.")
+
+    def handle(self, *args, **options):
+        sizes = sorted(int(size) for size in options['sizes'].split(','))
+        pivots = [
+            ('match_list', _match_list),
+            ('map_breakdown', _map_breakdown),
+            ('building_timing', _building_timing),
+        ]
+        if not options['skip_models']:
+            pivots.append(('Match instances', _model_instances))
+
+        # Test databases, like the test runner's, so generated rows never reach the real ones
+        old_config = setup_databases(verbosity=0, interactive=False, aliases={'default', PRIMARY_DATABASE})
+        try:
+            labels = EventLabel.objects.bulk_create(
+                EventLabel(name=f"Building {number}", name_hash=hashlib.sha1(str(number).encode()).hexdigest())
+                for number in range(BUILDINGS))
+            rng = random.Random(1)
+            results = {name: [] for name, _ in pivots}
+            seeded = 0
+            for size in sizes:
+                _seed(seeded + 1, size, labels, rng)
+                seeded = size
+                for name, build in pivots:
+                    elapsed, peak = _measure(build)
+                    results[name].append(f"{elapsed:>7.2f}s {peak / 2 ** 20:>7.1f} MiB {peak / size:>5.0f} B/m")
+        finally:
+            teardown_databases(old_config, verbosity=0)
+
+        self.stdout.write(f"{'':<17}" + ''.join(f"{size:>26,}" for size in sizes))
+        for name, cells in results.items():
+            self.stdout.write(f"{name:<17}" + ''.join(f"{cell:>26}" for cell in cells))
+        self.stdout.write("Times include the queries. B/m is peak traced bytes per match "
+                          "(the database's own memory isn't traced).")
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from test_lab.archive import restore_match_events
+from test_lab.models import Match
+
+
+class Command(BaseCommand):
+    help = "Move a single match's archived events back into the match_event table."
+
+    def add_arguments(self, parser):
+        parser.add_argument('match_id', type=int)
+
+    def handle(self, *args, **options):
+        match_id = options['match_id']
+        if not Match.objects.filter(id=match_id).exists():
+            raise CommandError(f"Match {match_id} does not exist")
+
+        moved = restore_match_events(match_id)
+        self.stdout.write(f"Restored {moved} events for match {match_id}")
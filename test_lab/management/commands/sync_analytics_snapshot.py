@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from test_lab.snapshot import sync_snapshot
+
+
+class Command(BaseCommand):
+    help = "Copy new and changed rows from the primary database into the local SQLite analytics snapshot."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=int, default=0,
+                            help="Keep running and sync every INTERVAL seconds (default: sync once).")
+
+    def handle(self, *args, **options):
+        while True:
+            copied = sync_snapshot()
+            summary = ', '.join(f"{table}: {count}" for table, count in copied.items() if count)
+            self.stdout.write(f"Snapshot synced ({summary or 'no changes'})")
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
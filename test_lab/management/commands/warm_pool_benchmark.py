@@ -0,0 +1,117 @@
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+
+from test_lab.warm_pool import WarmPool
+
+MATCHUPS = [(race, build) for race in ('protoss', 'terran', 'zerg') for build in ('rush', 'timing', 'macro', 'power', 'air')]
+
+
+class TimingRecorder:
+    """Collects startup times in memory instead of writing MatchRun rows."""
+
+    def __init__(self):
+        self.handed_off = {}
+        self.startups = []
+        self.boots = []
+
+    async def assignment_started(self, match_id, worker, container, boot_seconds):
+        self.handed_off[match_id] = time.monotonic()
+        if boot_seconds is not None:
+            self.boots.append(boot_seconds)
+
+    async def game_started(self, match_id):
+        self.startups.append(time.monotonic() - self.handed_off[match_id])
+
+    async def assignment_finished(self, match_id, exit_code):
+        pass
+
+
+class Command(BaseCommand):
+    help = ("Play the same matches with one-off stub workers and with a warm pool of stub workers "
+            "(test_lab.stub_worker) and compare startup and total time.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=3, help="Concurrent matches / warm workers (default: 3).")
+        parser.add_argument('--matches', type=int, default=15, help="Matches to play in each mode (default: 15).")
+        parser.add_argument('--boot-seconds', type=float, default=3, help="Stub client boot time (default: 3).")
+        parser.add_argument('--load-seconds', type=float, default=0.5, help="Stub map load time (default: 0.5).")
+        parser.add_argument('--game-seconds', type=float, default=1, help="Stub game length (default: 1).")
+
+    def _stub_command(self, options, *extra) -> list[str]:
+        return [sys.executable, '-m', 'test_lab.stub_worker',
+                '--boot-seconds', str(options['boot_seconds']),
+                '--load-seconds', str(options['load_seconds']),
+                '--game-seconds', str(options['game_seconds']),
+                '--reset-seconds', '0', *extra]
+
+    def _assignments(self, options, log_dir: str) -> list[dict]:
+        assignments = []
+        for match_id in range(1, options['matches'] + 1):
+            race, build = MATCHUPS[(match_id - 1) % len(MATCHUPS)]
+            assignments.append({
+                'match_id': match_id, 'race': race, 'build': build, 'difficulty': '',
+                'log_path': os.path.join(log_dir, f"{match_id}_{race}_{build}.log"),
+            })
+        return assignments
+
+    async def _cold(self, options, assignments: list[dict]) -> tuple[float, list[float]]:
+        """One stub process per match, `workers` at a time, like one `docker compose run` per match."""
+        slots = asyncio.Semaphore(options['workers'])
+        startups = []
+
+        async def play(assignment):
+            async with slots:
+                env = {**os.environ, 'MATCH_ID': str(assignment['match_id']),
+                       'RACE': assignment['race'], 'BUILD': assignment['build']}
+                launched = time.monotonic()
+                with open(assignment['log_path'], 'w') as log:
+                    process = await asyncio.create_subprocess_exec(
+                        *self._stub_command(options, '--single'), env=env,
+                        stdout=asyncio.subprocess.PIPE, stderr=log)
+                    async for line in process.stdout:
+                        if json.loads(line).get('event') == 'game_started':
+                            startups.append(time.monotonic() - launched)
+                    await process.wait()
+
+        started = time.monotonic()
+        await asyncio.gather(*[play(assignment) for assignment in assignments])
+        return time.monotonic() - started, startups
+
+    async def _warm(self, options, assignments: list[dict], log_dir: str) -> tuple[float, TimingRecorder]:
+        recorder = TimingRecorder()
+        pool = WarmPool(options['workers'], self._stub_command(options), log_dir=log_dir, recorder=recorder)
+        started = time.monotonic()
+        pool.start()
+        for assignment in assignments:
+            pool.submit(assignment)
+        await pool.join()
+        elapsed = time.monotonic() - started
+        await pool.stop()
+        return elapsed, recorder
+
+    def _report(self, label: str, elapsed: float, startups: list[float], matches: int):
+        self.stdout.write(
+            f"{label}: {matches} matches in {elapsed:.1f}s ({matches / elapsed * 3600:.0f}/hour), "
+            f"startup median {statistics.median(startups):.2f}s, max {max(startups):.2f}s"
+        )
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as log_dir:
+            cold_elapsed, cold_startups = asyncio.run(self._cold(options, self._assignments(options, log_dir)))
+            warm_elapsed, recorder = asyncio.run(self._warm(options, self._assignments(options, log_dir), log_dir))
+
+        matches = options['matches']
+        self._report("One-off workers", cold_elapsed, cold_startups, matches)
+        self._report("Warm pool", warm_elapsed, recorder.startups, matches)
+        saved = (statistics.median(cold_startups) - statistics.median(recorder.startups)) * matches - sum(recorder.boots)
+        self.stdout.write(
+            f"Warm pool paid {sum(recorder.boots):.1f}s for {len(recorder.boots)} worker boots and saved "
+            f"{saved:.1f}s of startup overall ({cold_elapsed - warm_elapsed:.1f}s of wall time)"
+        )
@@ -0,0 +1,241 @@
+"""Lifecycle timestamps and resource samples of the matches trigger_tests starts.
+
+Every match gets a MatchRun row when it is queued. The rest of its timestamps
+are filled in by the runner's background loop:
+
+- launched: its `docker compose run` process was spawned
+- container started: Docker's StartedAt of the match container (named by container_name)
+- game started: the bot replaced the TBD map name, which it does once the game is running
+- ended: the docker process exited, whose exit code is kept
+
+While any match is running, `docker stats` is read every SAMPLE_INTERVAL seconds
+for the CPU and memory use of each match container.
+"""
+import asyncio
+import functools
+import logging
+import re
+from datetime import datetime
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+from django.utils import timezone
+
+from . import regressions, runner
+from .building_timings import record_building_timings
+from .models import MatchRun
+
+SAMPLE_INTERVAL = 10
+CONTAINER_PREFIX = 'sc2-match-'
+
+logger = logging.getLogger(__name__)
+
+# Container of each match with a live process, and the matches whose container start has been recorded.
+# Only touched from the runner's background loop.
+_running: dict[int, str] = {}
+_containers_seen: set[int] = set()
+_sampler: asyncio.Task | None = None
+
+_BYTE_UNITS = {
+    'B': 1,
+    'kB': 1000, 'KB': 1000, 'MB': 1000 ** 2, 'GB': 1000 ** 3, 'TB': 1000 ** 4,
+    'KiB': 1024, 'MiB': 1024 ** 2, 'GiB': 1024 ** 3, 'TiB': 1024 ** 4,
+}
+
+
+def container_name(match_id: int) -> str:
+    return f"{CONTAINER_PREFIX}{match_id}"
+
+
+def _parse_percent(value: str) -> float | None:
+    try:
+        return float(value.strip().rstrip('%'))
+    except ValueError:
+        return None
+
+
+def _parse_bytes(value: str) -> int | None:
+    """Parse a `docker stats` size such as '1.25GiB'."""
+    found = re.fullmatch(r'([\d.]+)\s*([A-Za-z]+)', value.strip())
+    if not found or found.group(2) not in _BYTE_UNITS:
+        return None
+    return int(float(found.group(1)) * _BYTE_UNITS[found.group(2)])
+
+
+def _parse_docker_time(value: str) -> datetime | None:
+    """Parse Docker's RFC 3339 timestamps, which have nanoseconds and use year 1 for 'never'."""
+    value = re.sub(r'(\.\d{6})\d+', r'\1', value.strip()).replace('Z', '+00:00')
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    return parsed if parsed.year > 1 else None
+
+
+async def queue_match(match_id: int):
+    """Record that a match was created and is waiting to be launched."""
+    await MatchRun.objects.acreate(match_id=match_id, queued_at=timezone.now())
+
+
+async def launch_match(match_id: int, *command: str, cwd: str, log_path: str) -> int:
+    """Start a match's docker process and record its lifecycle until it exits. Returns the process id."""
+    await runner.in_background(_track(match_id, container_name(match_id)))
+    try:
+        pid = await runner.launch(*command, cwd=cwd, log_path=log_path,
+                                  on_exit=functools.partial(_match_exited, match_id))
+    except BaseException:
+        await runner.in_background(_untrack(match_id))
+        # Counted as failed, since it never gets an exit code
+        await MatchRun.objects.filter(match_id=match_id).aupdate(ended_at=timezone.now())
+        raise
+    await MatchRun.objects.filter(match_id=match_id).aupdate(launched_at=timezone.now())
+    return pid
+
+
+async def _track(match_id: int, container: str):
+    global _sampler
+    _running[match_id] = container
+    if _sampler is None or _sampler.done():
+        _sampler = asyncio.create_task(_sample_while_running())
+
+
+async def _untrack(match_id: int):
+    _running.pop(match_id, None)
+    _containers_seen.discard(match_id)
+
+
+async def _match_exited(match_id: int, exit_code: int | None):
+    await _untrack(match_id)
+    await _record_end(match_id, exit_code)
+    # Before the report, which compares building timings. The bot saves the match itself,
+    # so Match's post_save hook doesn't see it end.
+    await _record_building_timings(match_id)
+    # Not awaited, so a warm worker can reset while the report is computed
+    regressions.schedule_report(match_id)
+
+
+@sync_to_async
+def _update_run(match_id: int, **fields):
+    # Background work isn't wrapped in a request, which is where Django normally drops stale connections
+    close_old_connections()
+    MatchRun.objects.filter(match_id=match_id).update(**fields)
+
+
+async def _record_end(match_id: int, exit_code: int | None):
+    await _update_run(match_id, ended_at=timezone.now(), exit_code=exit_code)
+
+
+@sync_to_async
+def _record_building_timings(match_id: int):
+    close_old_connections()
+    try:
+        record_building_timings([match_id])
+    except Exception:
+        logger.exception("Recording building timings of match %s failed", match_id)
+
+
+class PoolRecorder:
+    """Records the lifecycle of matches played by warm pool workers (see warm_pool.WarmPool).
+
+    Called on the runner's background loop. A warm worker's container is already
+    running when it gets a match, so container start is recorded as the hand-off
+    time. The worker itself reports when the game starts and ends.
+    """
+
+    async def assignment_started(self, match_id: int, worker: str, container: str | None,
+                                 boot_seconds: float | None):
+        """boot_seconds is set on the first match after the worker booted, so the boot cost is counted once."""
+        if container is not None:
+            await _track(match_id, container)
+            _containers_seen.add(match_id)
+        now = timezone.now()
+        await _update_run(match_id, launched_at=now, container_started_at=now, pool_worker=worker,
+                          worker_boot_seconds=boot_seconds)
+
+    async def game_started(self, match_id: int):
+        await _update_run(match_id, game_started_at=timezone.now())
+
+    async def assignment_finished(self, match_id: int, exit_code: int | None):
+        await _match_exited(match_id, exit_code)
+
+
+async def _docker_output(*args: str) -> str:
+    process = await asyncio.create_subprocess_exec(
+        'docker', *args, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL)
+    stdout, _ = await process.communicate()
+    return stdout.decode('utf-8', errors='replace')
+
+
+async def _sample_while_running():
+    while _running:
+        try:
+            await _sample(dict(_running))
+        except Exception:
+            logger.exception("Sampling match containers failed")
+        await asyncio.sleep(SAMPLE_INTERVAL)
+
+
+async def _sample(containers: dict[int, str]):
+    """Record one `docker stats` reading for every running match container."""
+    match_ids_by_name = {container: match_id for match_id, container in containers.items()}
+
+    # All containers are listed instead of naming ours, since naming one that has exited fails the whole call
+    stats = await _docker_output('stats', '--no-stream', '--format', '{{.Name}}\t{{.CPUPerc}}\t{{.MemUsage}}')
+    samples = {}
+    for line in stats.splitlines():
+        fields = line.split('\t')
+        if len(fields) != 3 or fields[0] not in match_ids_by_name:
+            continue
+        samples[match_ids_by_name[fields[0]]] = (_parse_percent(fields[1]), _parse_bytes(fields[2].split('/')[0]))
+
+    container_started = {}
+    new_containers = [match_id for match_id in samples if match_id not in _containers_seen]
+    if new_containers:
+        inspected = await _docker_output(
+            'inspect', '--format', '{{.Name}}\t{{.State.StartedAt}}',
+            *[containers[match_id] for match_id in new_containers])
+        for line in inspected.splitlines():
+            name, _, started_at = line.partition('\t')
+            match_id = match_ids_by_name.get(name.lstrip('/'))
+            started_at = _parse_docker_time(started_at)
+            if match_id is not None and started_at is not None:
+                container_started[match_id] = started_at
+                _containers_seen.add(match_id)
+
+    await _record_samples(set(containers), samples, container_started)
+
+
+def _add_sample(run: MatchRun, cpu_percent: float | None, memory_bytes: int | None):
+    if cpu_percent is not None:
+        run.cpu_percent_last = cpu_percent
+        run.cpu_percent_mean = ((run.cpu_percent_mean or 0) * run.samples + cpu_percent) / (run.samples + 1)
+        run.cpu_percent_max = max(run.cpu_percent_max or 0, cpu_percent)
+        run.samples += 1
+    if memory_bytes is not None:
+        run.memory_bytes_last = memory_bytes
+        run.memory_bytes_max = max(run.memory_bytes_max or 0, memory_bytes)
+
+
+@sync_to_async
+def _record_samples(match_ids: set[int], samples: dict[int, tuple], container_started: dict[int, datetime]):
+    close_old_connections()
+    now = timezone.now()
+
+    for match_id, started_at in container_started.items():
+        MatchRun.objects.filter(match_id=match_id, container_started_at__isnull=True).update(
+            container_started_at=started_at)
+
+    # The bot fills in the map once the game is running
+    (MatchRun.objects
+     .filter(match_id__in=match_ids, game_started_at__isnull=True)
+     .exclude(match__map_name='TBD')
+     .update(game_started_at=now))
+
+    runs = MatchRun.objects.in_bulk(list(samples))
+    for match_id, (cpu_percent, memory_bytes) in samples.items():
+        run = runs.get(match_id)
+        if run is None:
+            continue
+        _add_sample(run, cpu_percent, memory_bytes)
+        run.save(update_fields=['samples', 'cpu_percent_last', 'cpu_percent_mean', 'cpu_percent_max',
+                                'memory_bytes_last', 'memory_bytes_max'])
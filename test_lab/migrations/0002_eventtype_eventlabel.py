@@ -0,0 +1,102 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class AlignWithBotSchema(migrations.SeparateDatabaseAndState):
+    """Brings 0001's tables in line with the columns the bot writes, unless the database already has them.
+
+    The live MySQL database was created by the bot (0001 is applied to it with
+    --fake-initial), so its match_event table already has type and
+    game_timestamp and no timestamp column. Only the migration state changes
+    there. Databases created from the migrations, like the analytics snapshot,
+    get the columns changed too.
+    """
+
+    def __init__(self, operations):
+        super().__init__(state_operations=operations, database_operations=operations)
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        connection = schema_editor.connection
+        # Databases test_lab isn't routed to don't have the table
+        if not self.allow_migrate_model(connection.alias, from_state.apps.get_model(app_label, 'matchevent')):
+            return
+        with connection.cursor() as cursor:
+            columns = {column.name for column in connection.introspection.get_table_description(cursor, 'match_event')}
+        if 'game_timestamp' not in columns:
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('test_lab', '0001_initial'),
+    ]
+
+    operations = [
+        AlignWithBotSchema([
+            migrations.RemoveField(
+                model_name='match',
+                name='replay_path',
+            ),
+            migrations.RemoveField(
+                model_name='matchevent',
+                name='timestamp',
+            ),
+            migrations.AddField(
+                model_name='matchevent',
+                name='game_timestamp',
+                field=models.FloatField(default=0),
+                preserve_default=False,
+            ),
+            migrations.AddField(
+                model_name='matchevent',
+                name='type',
+                field=models.CharField(default='', max_length=50),
+                preserve_default=False,
+            ),
+        ]),
+        # type/message are nullable from here on: the bot still inserts them, but the
+        # trigger from 0003 moves them into event_type_id/label_id and clears them
+        migrations.AlterField(
+            model_name='matchevent',
+            name='type',
+            field=models.CharField(max_length=50, null=True),
+        ),
+        migrations.AlterField(
+            model_name='matchevent',
+            name='message',
+            field=models.TextField(null=True),
+        ),
+        migrations.CreateModel(
+            name='EventType',
+            fields=[
+                ('id', models.SmallAutoField(primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=50, unique=True)),
+            ],
+            options={
+                'db_table': 'event_type',
+            },
+        ),
+        migrations.CreateModel(
+            name='EventLabel',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('name', models.TextField()),
+                ('name_hash', models.CharField(max_length=40, unique=True)),
+            ],
+            options={
+                'db_table': 'event_label',
+            },
+        ),
+        # Nullable until 0003 has filled them in from the existing type/message text
+        migrations.AddField(
+            model_name='matchevent',
+            name='event_type',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, to='test_lab.eventtype'),
+        ),
+        migrations.AddField(
+            model_name='matchevent',
+            name='label',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, to='test_lab.eventlabel'),
+        ),
+    ]
@@ -0,0 +1,132 @@
+import hashlib
+
+from django.db import migrations, transaction
+
+BATCH_SIZE = 5000
+
+# The bot inserts events straight into MySQL with type and message text. This
+# resolves them to dictionary ids (adding new names) and clears the text, so
+# those inserts keep working once event_type_id and label_id are NOT NULL.
+# Rows inserted through the ORM already carry the ids and are left alone.
+ENCODE_TRIGGER = '''
+CREATE TRIGGER match_event_encode_names BEFORE INSERT ON match_event FOR EACH ROW
+BEGIN
+    IF NEW.event_type_id IS NULL AND NEW.type IS NOT NULL THEN
+        SET NEW.event_type_id = (SELECT id FROM event_type WHERE name = NEW.type);
+        IF NEW.event_type_id IS NULL THEN
+            INSERT IGNORE INTO event_type (name) VALUES (NEW.type);
+            SET NEW.event_type_id = (SELECT id FROM event_type WHERE name = NEW.type);
+        END IF;
+        SET NEW.type = NULL;
+    END IF;
+    IF NEW.label_id IS NULL AND NEW.message IS NOT NULL THEN
+        SET NEW.label_id = (SELECT id FROM event_label WHERE name_hash = SHA1(NEW.message));
+        IF NEW.label_id IS NULL THEN
+            INSERT IGNORE INTO event_label (name, name_hash) VALUES (NEW.message, SHA1(NEW.message));
+            SET NEW.label_id = (SELECT id FROM event_label WHERE name_hash = SHA1(NEW.message));
+        END IF;
+        SET NEW.message = NULL;
+    END IF;
+END
+'''
+
+
+def _label_hash(name):
+    return hashlib.sha1(name.encode('utf-8')).hexdigest()
+
+
+def add_encode_trigger(apps, schema_editor):
+    # Only MySQL gets inserts from the bot
+    if schema_editor.connection.vendor == 'mysql':
+        schema_editor.execute(ENCODE_TRIGGER)
+
+
+def remove_encode_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor == 'mysql':
+        schema_editor.execute('DROP TRIGGER IF EXISTS match_event_encode_names')
+
+
+def encode_event_names(apps, schema_editor):
+    """Point every MatchEvent without ids at EventType/EventLabel rows, one committed batch at a time."""
+    db = schema_editor.connection.alias
+    MatchEvent = apps.get_model('test_lab', 'MatchEvent')
+    EventType = apps.get_model('test_lab', 'EventType')
+    EventLabel = apps.get_model('test_lab', 'EventLabel')
+
+    type_ids = dict(EventType.objects.using(db).values_list('name', 'id'))
+    label_ids = dict(EventLabel.objects.using(db).values_list('name_hash', 'id'))
+
+    last_id = 0
+    while True:
+        batch = list(
+            MatchEvent.objects.using(db)
+            .filter(id__gt=last_id, event_type__isnull=True)
+            .order_by('id')
+            .values_list('id', 'type', 'message')[:BATCH_SIZE]
+        )
+        if not batch:
+            break
+
+        with transaction.atomic(using=db):
+            events = []
+            for event_id, type_name, message in batch:
+                if type_name not in type_ids:
+                    type_ids[type_name] = EventType.objects.using(db).create(name=type_name).id
+                name_hash = _label_hash(message)
+                if name_hash not in label_ids:
+                    label_ids[name_hash] = EventLabel.objects.using(db).create(name=message, name_hash=name_hash).id
+                events.append(MatchEvent(id=event_id, event_type_id=type_ids[type_name], label_id=label_ids[name_hash]))
+            MatchEvent.objects.using(db).bulk_update(events, ['event_type', 'label'])
+
+        last_id = batch[-1][0]
+
+
+def decode_event_names(apps, schema_editor):
+    """Copy the dictionary names back into the type/message text columns."""
+    db = schema_editor.connection.alias
+    MatchEvent = apps.get_model('test_lab', 'MatchEvent')
+    EventType = apps.get_model('test_lab', 'EventType')
+    EventLabel = apps.get_model('test_lab', 'EventLabel')
+
+    type_names = dict(EventType.objects.using(db).values_list('id', 'name'))
+
+    last_id = 0
+    while True:
+        batch = list(
+            MatchEvent.objects.using(db)
+            .filter(id__gt=last_id)
+            .order_by('id')
+            .values_list('id', 'event_type_id', 'label_id')[:BATCH_SIZE]
+        )
+        if not batch:
+            break
+
+        label_names = dict(
+            EventLabel.objects.using(db)
+            .filter(id__in={label_id for _, _, label_id in batch})
+            .values_list('id', 'name')
+        )
+        with transaction.atomic(using=db):
+            events = [
+                MatchEvent(id=event_id, type=type_names[type_id], message=label_names[label_id])
+                for event_id, type_id, label_id in batch
+            ]
+            MatchEvent.objects.using(db).bulk_update(events, ['type', 'message'])
+
+        last_id = batch[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    # Each batch commits on its own so a large match_event table isn't rewritten in one transaction
+    atomic = False
+
+    dependencies = [
+        ('test_lab', '0002_eventtype_eventlabel'),
+    ]
+
+    operations = [
+        # Added first so events the bot inserts while the existing rows are encoded get their ids
+        migrations.RunPython(add_encode_trigger, remove_encode_trigger),
+        migrations.RunPython(encode_event_names, decode_event_names),
+    ]
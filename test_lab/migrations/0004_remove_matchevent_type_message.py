@@ -0,0 +1,39 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('test_lab', '0003_encode_event_names'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='matchevent',
+            name='event_type',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='test_lab.eventtype'),
+        ),
+        migrations.AlterField(
+            model_name='matchevent',
+            name='label',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='test_lab.eventlabel'),
+        ),
+        migrations.AddIndex(
+            model_name='matchevent',
+            index=models.Index(fields=['event_type', 'match', 'label', 'game_timestamp'], name='match_event_type_label_idx'),
+        ),
+        # The columns stay in the database for the bot's inserts (see the trigger in 0003), always NULL once stored
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.RemoveField(
+                    model_name='matchevent',
+                    name='type',
+                ),
+                migrations.RemoveField(
+                    model_name='matchevent',
+                    name='message',
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 6.0.1 on 2026-10-19 06:17
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('test_lab', '0004_remove_matchevent_type_message'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='match',
+            name='events_archived',
+            field=models.BooleanField(db_default=False, default=False),
+        ),
+        migrations.CreateModel(
+            name='MatchBuildingTiming',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('test_group_id', models.IntegerField()),
+                ('first_time', models.FloatField()),
+                ('result', models.CharField(max_length=50)),
+                ('building', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='test_lab.eventlabel')),
+                ('match', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='test_lab.match')),
+            ],
+            options={
+                'db_table': 'match_building_timing',
+                'indexes': [models.Index(fields=['test_group_id', 'building'], name='building_timing_group_idx')],
+                'constraints': [models.UniqueConstraint(fields=('match', 'building'), name='building_timing_unique')],
+            },
+        ),
+        migrations.CreateModel(
+            name='MatchEventArchive',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('game_timestamp', models.FloatField()),
+                ('event_type', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='test_lab.eventtype')),
+                ('label', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='test_lab.eventlabel')),
+                ('match', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='test_lab.match')),
+            ],
+            options={
+                'db_table': 'match_event_archive',
+                'indexes': [models.Index(fields=['match', 'game_timestamp'], name='match_event_archive_match_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 6.0.1 on 2026-10-19 06:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('test_lab', '0005_match_event_archive'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='matchevent',
+            index=models.Index(fields=['match', 'game_timestamp', 'id'], name='match_event_timeline_idx'),
+        ),
+    ]
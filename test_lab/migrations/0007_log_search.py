@@ -0,0 +1,82 @@
+# Generated by Django 6.0.1 on 2026-10-19 07:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# (table, column) pairs that get a full-text index
+FULL_TEXT_COLUMNS = [
+    ('event_label', 'name'),
+    ('log_line', 'text'),
+]
+
+
+def add_full_text_indexes(apps, schema_editor):
+    """MySQL FULLTEXT index, or an external-content FTS5 table kept in sync by triggers on SQLite."""
+    vendor = schema_editor.connection.vendor
+    for table, column in FULL_TEXT_COLUMNS:
+        if vendor == 'mysql':
+            schema_editor.execute(f'ALTER TABLE {table} ADD FULLTEXT INDEX {table}_{column}_ft ({column})')
+        elif vendor == 'sqlite':
+            fts = f'{table}_fts'
+            schema_editor.execute(f"CREATE VIRTUAL TABLE {fts} USING fts5({column}, content='{table}', content_rowid='id')")
+            schema_editor.execute(
+                f'CREATE TRIGGER {fts}_insert AFTER INSERT ON {table} BEGIN '
+                f'INSERT INTO {fts}(rowid, {column}) VALUES (new.id, new.{column}); END'
+            )
+            schema_editor.execute(
+                f'CREATE TRIGGER {fts}_delete AFTER DELETE ON {table} BEGIN '
+                f"INSERT INTO {fts}({fts}, rowid, {column}) VALUES ('delete', old.id, old.{column}); END"
+            )
+            schema_editor.execute(
+                f'CREATE TRIGGER {fts}_update AFTER UPDATE ON {table} BEGIN '
+                f"INSERT INTO {fts}({fts}, rowid, {column}) VALUES ('delete', old.id, old.{column}); "
+                f'INSERT INTO {fts}(rowid, {column}) VALUES (new.id, new.{column}); END'
+            )
+            schema_editor.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def remove_full_text_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    for table, column in FULL_TEXT_COLUMNS:
+        if vendor == 'mysql':
+            schema_editor.execute(f'ALTER TABLE {table} DROP INDEX {table}_{column}_ft')
+        elif vendor == 'sqlite':
+            fts = f'{table}_fts'
+            for trigger in ('insert', 'delete', 'update'):
+                schema_editor.execute(f'DROP TRIGGER IF EXISTS {fts}_{trigger}')
+            schema_editor.execute(f'DROP TABLE IF EXISTS {fts}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('test_lab', '0006_match_event_timeline_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LogFile',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('indexed_bytes', models.BigIntegerField(default=0)),
+                ('match', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='test_lab.match')),
+            ],
+            options={
+                'db_table': 'log_file',
+            },
+        ),
+        migrations.CreateModel(
+            name='LogLine',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('offset', models.BigIntegerField()),
+                ('text', models.TextField()),
+                ('log_file', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='test_lab.logfile')),
+            ],
+            options={
+                'db_table': 'log_line',
+            },
+        ),
+        migrations.RunPython(add_full_text_indexes, remove_full_text_indexes),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 6.0.1 on 2026-10-19 07:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('test_lab', '0007_log_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SnapshotSyncState',
+            fields=[
+                ('table', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('last_id', models.BigIntegerField(default=0)),
+                ('last_end_timestamp', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'snapshot_sync_state',
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 6.0.1 on 2026-10-19 08:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('test_lab', '0008_snapshot_sync_state'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MatchRun',
+            fields=[
+                ('match', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='run', serialize=False, to='test_lab.match')),
+                ('queued_at', models.DateTimeField()),
+                ('launched_at', models.DateTimeField(blank=True, null=True)),
+                ('container_started_at', models.DateTimeField(blank=True, null=True)),
+                ('game_started_at', models.DateTimeField(blank=True, null=True)),
+                ('ended_at', models.DateTimeField(blank=True, null=True)),
+                ('exit_code', models.IntegerField(blank=True, null=True)),
+                ('samples', models.PositiveIntegerField(default=0)),
+                ('cpu_percent_last', models.FloatField(blank=True, null=True)),
+                ('cpu_percent_mean', models.FloatField(blank=True, null=True)),
+                ('cpu_percent_max', models.FloatField(blank=True, null=True)),
+                ('memory_bytes_last', models.BigIntegerField(blank=True, null=True)),
+                ('memory_bytes_max', models.BigIntegerField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'match_run',
+                'indexes': [models.Index(fields=['ended_at'], name='match_run_ended_idx')],
+            },
+        ),
+    ]
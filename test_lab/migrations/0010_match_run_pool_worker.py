@@ -0,0 +1,23 @@
+# Generated by Django 6.0.1 on 2026-10-19 09:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('test_lab', '0009_match_run'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='matchrun',
+            name='pool_worker',
+            field=models.CharField(blank=True, default='', max_length=50),
+        ),
+        migrations.AddField(
+            model_name='matchrun',
+            name='worker_boot_seconds',
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 6.0.1 on 2026-10-19 09:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('test_lab', '0010_match_run_pool_worker'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RegressionReport',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('test_group_id', models.IntegerField(unique=True)),
+                ('baseline_group_id', models.IntegerField()),
+                ('computed_at', models.DateTimeField()),
+                ('flagged', models.BooleanField(default=False)),
+                ('summary', models.CharField(max_length=255)),
+                ('details', models.JSONField(default=dict)),
+            ],
+            options={
+                'db_table': 'regression_report',
+            },
+        ),
+        migrations.CreateModel(
+            name='TestGroup',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField()),
+                ('git_hash', models.CharField(blank=True, default='', max_length=40)),
+                ('git_dirty', models.BooleanField(default=False)),
+                ('git_subject', models.CharField(blank=True, default='', max_length=255)),
+                ('config', models.JSONField(blank=True, default=dict)),
+                ('is_baseline', models.BooleanField(default=False)),
+            ],
+            options={
+                'db_table': 'test_group',
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+from django.db import migrations, models
+from django.db.models import Exists, OuterRef
+
+
+def mark_recorded_matches(apps, schema_editor):
+    """Matches that already have timings were recorded by the previous backfill."""
+    db = schema_editor.connection.alias
+    Match = apps.get_model('test_lab', 'Match')
+    MatchBuildingTiming = apps.get_model('test_lab', 'MatchBuildingTiming')
+    (Match.objects.using(db)
+     .filter(Exists(MatchBuildingTiming.objects.using(db).filter(match_id=OuterRef('id'))))
+     .update(building_timings_recorded=True))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('test_lab', '0011_test_group_regression_report'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='match',
+            name='building_timings_recorded',
+            field=models.BooleanField(db_default=False, default=False),
+        ),
+        migrations.RunPython(mark_recorded_matches, migrations.RunPython.noop),
+    ]
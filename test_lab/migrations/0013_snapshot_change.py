@@ -0,0 +1,30 @@
+# Generated by Django 6.0.1 on 2026-10-19 11:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('test_lab', '0012_match_building_timings_recorded'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SnapshotChange',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('table', models.CharField(max_length=50)),
+                ('column', models.CharField(max_length=50)),
+                ('value', models.BigIntegerField()),
+            ],
+            options={
+                'db_table': 'snapshot_change',
+            },
+        ),
+        migrations.AddField(
+            model_name='snapshotsyncstate',
+            name='reread_from',
+            field=models.BigIntegerField(default=0),
+        ),
+    ]
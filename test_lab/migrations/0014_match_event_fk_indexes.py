@@ -0,0 +1,29 @@
+# Generated by Django 6.0.1 on 2026-10-19 12:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('test_lab', '0013_snapshot_change'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='matchevent',
+            name='event_type',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, to='test_lab.eventtype'),
+        ),
+        migrations.AlterField(
+            model_name='matchevent',
+            name='match',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='test_lab.match'),
+        ),
+        migrations.AlterField(
+            model_name='matcheventarchive',
+            name='match',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='test_lab.match'),
+        ),
+    ]
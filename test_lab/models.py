@@ -1,5 +1,7 @@
 from django.db import models
 
+from . import event_names
+
 class Match(models.Model):
     class Meta:
         db_table = 'match'
@@ -20,19 +22,234 @@ class Match(models.Model):
     opponent_build = models.CharField(max_length=15, choices=Build)
     result = models.CharField(max_length=50, choices=Result)
     duration_in_game_time = models.IntegerField(null=True, blank=True)
+    # Set once the match's events have been moved to match_event_archive
+    events_archived = models.BooleanField(default=False, db_default=False)
+    # Set once the match has finished and its Building events are folded into MatchBuildingTiming
+    building_timings_recorded = models.BooleanField(default=False, db_default=False)
 
     def __str__(self):
         return f"Group {self.test_group_id} - {self.map_name} vs {self.opponent_race}-{self.opponent_build} ({self.result})"
 
+class EventType(models.Model):
+    """Dictionary of MatchEvent types (e.g. 'Building'), referenced by small integer id."""
+    class Meta:
+        db_table = 'event_type'
+
+    id = models.SmallAutoField(primary_key=True)
+    name = models.CharField(max_length=50, unique=True)
+
+    def __str__(self):
+        return self.name
+
+class EventLabel(models.Model):
+    """Dictionary of MatchEvent messages (e.g. building names), referenced by integer id.
+
+    Messages can be arbitrarily long, so uniqueness is enforced on a hash of the name.
+    """
+    class Meta:
+        db_table = 'event_label'
+
+    id = models.AutoField(primary_key=True)
+    name = models.TextField()
+    name_hash = models.CharField(max_length=40, unique=True)
+
+    def __str__(self):
+        return self.name
+
 class MatchEvent(models.Model):
     class Meta:
         db_table = 'match_event'
+        indexes = [
+            # Covers building_timing: filter by type, group by match and label, MIN(game_timestamp)
+            models.Index(fields=['event_type', 'match', 'label', 'game_timestamp'], name='match_event_type_label_idx'),
+            # Keyset paging of a single match's timeline
+            models.Index(fields=['match', 'game_timestamp', 'id'], name='match_event_timeline_idx'),
+        ]
 
     id = models.AutoField(primary_key=True)
-    match = models.ForeignKey(Match, on_delete=models.CASCADE)
-    type = models.CharField(max_length=50)
-    message = models.TextField()
+    # Both lead one of the indexes above, which serve lookups by them as well
+    match = models.ForeignKey(Match, on_delete=models.CASCADE, db_index=False)
+    event_type = models.ForeignKey(EventType, on_delete=models.PROTECT, db_index=False)
+    label = models.ForeignKey(EventLabel, on_delete=models.PROTECT)
+    game_timestamp = models.FloatField()
+
+    # Ingestion still deals in strings: MatchEvent(type='Building', message='Barracks', ...)
+    # resolves the names to dictionary ids through the in-process cache. The bot's own
+    # inserts of type/message text are resolved by a MySQL trigger (migration 0003).
+    @property
+    def type(self) -> str:
+        return event_names.event_types.name_for(self.event_type_id)
+
+    @type.setter
+    def type(self, name: str):
+        self.event_type_id = event_names.event_types.id_for(name)
+
+    @property
+    def message(self) -> str:
+        return event_names.event_labels.name_for(self.label_id)
+
+    @message.setter
+    def message(self, name: str):
+        self.label_id = event_names.event_labels.id_for(name)
+
+    def __str__(self):
+        return f"Match {self.match.id} {self.type} Event at {self.game_timestamp}: {self.message}"
+
+class MatchEventArchive(models.Model):
+    """Cold storage for MatchEvent rows of old test groups. Keeps the original ids so rows can be restored."""
+    class Meta:
+        db_table = 'match_event_archive'
+        indexes = [
+            models.Index(fields=['match', 'game_timestamp'], name='match_event_archive_match_idx'),
+        ]
+
+    id = models.IntegerField(primary_key=True)
+    # Leads match_event_archive_match_idx
+    match = models.ForeignKey(Match, on_delete=models.CASCADE, db_index=False)
+    event_type = models.ForeignKey(EventType, on_delete=models.PROTECT)
+    label = models.ForeignKey(EventLabel, on_delete=models.PROTECT)
     game_timestamp = models.FloatField()
 
+class MatchBuildingTiming(models.Model):
+    """First time each building type was completed in a match, folded out of its Building events."""
+    class Meta:
+        db_table = 'match_building_timing'
+        constraints = [
+            models.UniqueConstraint(fields=['match', 'building'], name='building_timing_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['test_group_id', 'building'], name='building_timing_group_idx'),
+        ]
+
+    id = models.AutoField(primary_key=True)
+    match = models.ForeignKey(Match, on_delete=models.CASCADE)
+    test_group_id = models.IntegerField()
+    building = models.ForeignKey(EventLabel, on_delete=models.PROTECT)
+    first_time = models.FloatField()
+    result = models.CharField(max_length=50)
+
+    def __str__(self):
+        return f"Match {self.match_id} {self.building.name} at {self.first_time}"
+
+class LogFile(models.Model):
+    """A bot log file and how far into it the search indexer has read."""
+    class Meta:
+        db_table = 'log_file'
+
+    id = models.AutoField(primary_key=True)
+    name = models.CharField(max_length=255, unique=True)
+    match = models.ForeignKey(Match, null=True, blank=True, on_delete=models.SET_NULL)
+    indexed_bytes = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return self.name
+
+class LogLine(models.Model):
+    """One indexed line of a log file, with its byte offset so search results can link into the log."""
+    class Meta:
+        db_table = 'log_line'
+
+    id = models.BigAutoField(primary_key=True)
+    log_file = models.ForeignKey(LogFile, on_delete=models.CASCADE)
+    offset = models.BigIntegerField()
+    text = models.TextField()
+
+class MatchRun(models.Model):
+    """Lifecycle timestamps and sampled container resource usage of a match started by the test runner (see match_runs)."""
+    class Meta:
+        db_table = 'match_run'
+        indexes = [
+            models.Index(fields=['ended_at'], name='match_run_ended_idx'),
+        ]
+
+    match = models.OneToOneField(Match, primary_key=True, on_delete=models.CASCADE, related_name='run')
+    queued_at = models.DateTimeField()
+    launched_at = models.DateTimeField(null=True, blank=True)
+    container_started_at = models.DateTimeField(null=True, blank=True)
+    game_started_at = models.DateTimeField(null=True, blank=True)
+    ended_at = models.DateTimeField(null=True, blank=True)
+    exit_code = models.IntegerField(null=True, blank=True)
+    # Warm pool worker that played the match, blank for a one-off `docker compose run`
+    pool_worker = models.CharField(max_length=50, blank=True, default='')
+    # Boot time of the worker, set on the first match it played after starting
+    worker_boot_seconds = models.FloatField(null=True, blank=True)
+    # `docker stats` of the match's container, sampled while it runs
+    samples = models.PositiveIntegerField(default=0)
+    cpu_percent_last = models.FloatField(null=True, blank=True)
+    cpu_percent_mean = models.FloatField(null=True, blank=True)
+    cpu_percent_max = models.FloatField(null=True, blank=True)
+    memory_bytes_last = models.BigIntegerField(null=True, blank=True)
+    memory_bytes_max = models.BigIntegerField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Run of match {self.match_id} queued at {self.queued_at}"
+
+class SnapshotSyncState(models.Model):
+    """High-water marks of the last sync_analytics_snapshot run, one row per copied table (stored in the snapshot)."""
+    class Meta:
+        db_table = 'snapshot_sync_state'
+
+    table = models.CharField(max_length=50, primary_key=True)
+    last_id = models.BigIntegerField(default=0)
+    # last_id before the previous run; rows above it are read again in case their ids committed out of order
+    reread_from = models.BigIntegerField(default=0)
+    last_end_timestamp = models.DateTimeField(null=True, blank=True)
+
+class SnapshotChange(models.Model):
+    """Rows of a primary table that were updated or deleted in place, for the snapshot sync to copy again.
+
+    Writers record one in the same transaction as the change, naming the rows
+    by `column` = `value` (e.g. every match_event row of a match that was archived).
+    """
+    class Meta:
+        db_table = 'snapshot_change'
+
+    id = models.BigAutoField(primary_key=True)
+    table = models.CharField(max_length=50)
+    column = models.CharField(max_length=50)
+    value = models.BigIntegerField()
+
+    @classmethod
+    def record(cls, model, column: str, values):
+        cls.objects.bulk_create([cls(table=model._meta.db_table, column=column, value=value) for value in values])
+
+class TestGroup(models.Model):
+    """Which build of the bot played a test group, recorded by trigger_tests (see bot_versions)."""
+    class Meta:
+        db_table = 'test_group'
+
+    # The Match.test_group_id it describes
+    id = models.IntegerField(primary_key=True)
+    created_at = models.DateTimeField()
+    git_hash = models.CharField(max_length=40, blank=True, default='')
+    # Set when the bot checkout had uncommitted changes
+    git_dirty = models.BooleanField(default=False)
+    git_subject = models.CharField(max_length=255, blank=True, default='')
+    # Run options and fingerprints of the bot's config files
+    config = models.JSONField(default=dict, blank=True)
+    # Later groups of the same difficulty are compared against the latest pinned baseline
+    is_baseline = models.BooleanField(default=False)
+
+    @property
+    def short_hash(self) -> str:
+        return self.git_hash[:8]
+
+    def __str__(self):
+        return f"Group {self.id} at {self.short_hash or 'unknown version'}"
+
+class RegressionReport(models.Model):
+    """Comparison of a finished test group with its baseline group, stored when the group completes (see regressions)."""
+    class Meta:
+        db_table = 'regression_report'
+
+    id = models.AutoField(primary_key=True)
+    test_group_id = models.IntegerField(unique=True)
+    baseline_group_id = models.IntegerField()
+    computed_at = models.DateTimeField()
+    # Set when any comparison got significantly worse
+    flagged = models.BooleanField(default=False)
+    summary = models.CharField(max_length=255)
+    details = models.JSONField(default=dict)
+
     def __str__(self):
-        return f"Match {self.match.id} {self.type} Event at {self.game_timestamp}: {self.message}"
\ No newline at end of file
+        return f"Group {self.test_group_id} vs {self.baseline_group_id}: {self.summary}"
@@ -0,0 +1,204 @@
+"""Pivot tables behind match_list, map_breakdown and building_timing.
+
+A Pivot maps each row key to its cells, and each cell's column key to one
+record of measures, read by attribute (the named rows of
+values_list(named=True), or a BuildingTiming).
+match_list_pivot and map_breakdown_pivot aggregate in the database: their
+GROUP BY queries return one row per cell, so Python never sees single matches.
+building_timing_pivot folds the timings itself in one streamed pass (see there).
+Either way only the cells are kept, so memory follows the number of cells:
+match_list has one per match (the latest against each opponent),
+building_timing one per group and building type, and map_breakdown one per map
+and opponent, which doesn't grow with the number of matches.
+
+arrange() lays the cells out in display order, None where a row has no cell
+in a column, and marginals (row, column and column span totals) are sums over
+that layout.
+
+    pivot = map_breakdown_pivot(matches)
+    table = pivot.arrange(sorted(pivot.rows), sorted(pivot.columns))
+    map_wins = table.row_totals('victories')
+"""
+from collections.abc import Iterable
+from itertools import groupby
+from operator import attrgetter
+
+from django.db.models import Case, Count, F, IntegerField, Max, Q, QuerySet, Sum, Value, When
+from django.db.models.functions import Coalesce
+
+DECIDED_RESULTS = ('Victory', 'Defeat')
+# Timings fetched per round trip by building_timing_pivot
+FOLD_CHUNK_SIZE = 10000
+
+
+class Table:
+    """The cells of a Pivot in display order: rows[row][column] is a cell's record, or None."""
+
+    def __init__(self, row_keys: list, column_keys: list, rows: list[list]):
+        self.row_keys = row_keys
+        self.column_keys = column_keys
+        self.rows = rows
+
+    def row_totals(self, measure: str) -> list:
+        value = attrgetter(measure)
+        return [sum(value(cell) for cell in row if cell is not None) for row in self.rows]
+
+    def column_totals(self, measure: str) -> list:
+        value = attrgetter(measure)
+        return [sum(value(cell) for cell in column if cell is not None) for column in zip(*self.rows)]
+
+    def column_spans(self, depth: int) -> list[tuple[tuple, int, int]]:
+        """Runs of adjacent tuple column keys sharing their first `depth` parts, as (prefix, start, stop)."""
+        spans = []
+        start = 0
+        for prefix, keys in groupby(self.column_keys, key=lambda key: tuple(key[:depth])):
+            stop = start + len(list(keys))
+            spans.append((prefix, start, stop))
+            start = stop
+        return spans
+
+
+def span_totals(totals: list, spans: list[tuple[tuple, int, int]]) -> dict[tuple, float]:
+    """Sum of the column totals in each span from Table.column_spans, by span prefix."""
+    return {prefix: sum(totals[start:stop]) for prefix, start, stop in spans}
+
+
+def ratio(part: float, whole: float) -> float | None:
+    return part / whole if whole else None
+
+
+class Pivot:
+    """Records of measures by row key, then column key."""
+
+    def __init__(self, cells: dict[object, dict]):
+        self.cells = cells
+
+    @classmethod
+    def of(cls, records: Iterable, row_key, column_key) -> 'Pivot':
+        """Pivot of one record per cell, keyed by row_key(record) and column_key(record)."""
+        cells = {}
+        for record in records:
+            row = cells.get(row_key(record))
+            if row is None:
+                row = cells[row_key(record)] = {}
+            row[column_key(record)] = record
+        return cls(cells)
+
+    @property
+    def rows(self) -> list:
+        """Row keys in the order they were first seen."""
+        return list(self.cells)
+
+    @property
+    def columns(self) -> list:
+        """Distinct column keys in the order they were first seen."""
+        return list(dict.fromkeys(column_key for row in self.cells.values() for column_key in row))
+
+    def arrange(self, row_keys: Iterable, column_keys: Iterable) -> Table:
+        """Lay the cells out with rows and columns in the given key order.
+
+        Keys left out of row_keys or column_keys drop their cells.
+        """
+        row_keys, column_keys = list(row_keys), list(column_keys)
+        rows = [self.cells.get(row_key, {}) for row_key in row_keys]
+        return Table(row_keys, column_keys, [[row.get(column_key) for column_key in column_keys] for row in rows])
+
+
+def _flag(condition: Q) -> Case:
+    """1 where condition holds, else 0 (also for NULLs), so flags can be summed."""
+    return Case(When(condition, then=Value(1)), default=Value(0), output_field=IntegerField())
+
+
+def match_list_pivot(matches: QuerySet) -> Pivot:
+    """Test groups against (race, build) opponents, each cell the group's latest match against that opponent.
+
+    Records have the match's id, result, duration_in_game_time, map_name and
+    opponent_difficulty, plus victories, decided, timed_duration and timed
+    flags for the group totals. Opponent win rates count every match, see
+    opponent_results().
+    """
+    latest = (matches.values('test_group_id', 'opponent_race', 'opponent_build')
+              .annotate(latest_id=Max('id')).values('latest_id'))
+    rows = (matches.filter(id__in=latest)
+            .annotate(
+                victories=_flag(Q(result='Victory')),
+                decided=_flag(Q(result__in=DECIDED_RESULTS)),
+                timed_duration=Case(When(duration_in_game_time__gt=0, then=F('duration_in_game_time')),
+                                    default=Value(0)),
+                timed=_flag(Q(duration_in_game_time__gt=0)),
+            )
+            .values_list('test_group_id', 'opponent_race', 'opponent_build', 'id', 'result', 'duration_in_game_time',
+                         'map_name', 'opponent_difficulty', 'victories', 'decided', 'timed_duration', 'timed',
+                         named=True)
+            .order_by())
+    return Pivot.of(rows, attrgetter('test_group_id'), attrgetter('opponent_race', 'opponent_build'))
+
+
+def opponent_results(matches: QuerySet) -> dict[tuple[str, str], tuple[int, int]]:
+    """(victories, decided matches) of every match against each (race, build) opponent."""
+    rows = (matches.values_list('opponent_race', 'opponent_build')
+            .annotate(victories=Count('id', filter=Q(result='Victory')),
+                      decided=Count('id', filter=Q(result__in=DECIDED_RESULTS)))
+            .order_by())
+    return {(race, build): (victories, decided) for race, build, victories, decided in rows}
+
+
+def map_breakdown_pivot(matches: QuerySet) -> Pivot:
+    """Maps against (difficulty, race, build) opponents with results and game lengths summed per cell.
+
+    Records have count, victories, decided, total_duration and games_with_duration.
+    """
+    timed = Q(duration_in_game_time__gt=0)
+    rows = (matches.values('map_name', 'opponent_difficulty', 'opponent_race', 'opponent_build')
+            .annotate(
+                count=Count('id'),
+                victories=Count('id', filter=Q(result='Victory')),
+                decided=Count('id', filter=Q(result__in=DECIDED_RESULTS)),
+                total_duration=Coalesce(Sum('duration_in_game_time', filter=timed), 0),
+                games_with_duration=Count('id', filter=timed),
+            )
+            .values_list('map_name', 'opponent_difficulty', 'opponent_race', 'opponent_build', 'count', 'victories',
+                         'decided', 'total_duration', 'games_with_duration', named=True)
+            .order_by())
+    return Pivot.of(rows, attrgetter('map_name'), attrgetter('opponent_difficulty', 'opponent_race', 'opponent_build'))
+
+
+class BuildingTiming:
+    """Earliest, latest and total first completion time of a building over a test group's matches."""
+    __slots__ = ('count', 'total', 'min', 'max', 'min_result', 'max_result')
+
+    def __init__(self, first_time: float, result: str):
+        self.count = 1
+        self.total = self.min = self.max = first_time
+        self.min_result = self.max_result = result
+
+
+def building_timing_pivot(timings: QuerySet) -> Pivot:
+    """Test groups against building ids, as BuildingTimings.
+
+    The result initial of the match with the earliest and latest time is kept
+    as min_result and max_result; on ties, the lowest id wins. GROUP BY can't
+    return which row holds an extreme, and the window functions or correlated
+    subqueries that can were several times slower on SQLite than folding the
+    timings here, streamed in id order, keeping only the cells.
+    """
+    cells = {}
+    rows = (timings.values_list('test_group_id', 'building_id', 'first_time', 'result')
+            .order_by('id').iterator(chunk_size=FOLD_CHUNK_SIZE))
+    for group_id, building_id, first_time, result in rows:
+        row = cells.get(group_id)
+        if row is None:
+            row = cells[group_id] = {}
+        cell = row.get(building_id)
+        if cell is None:
+            row[building_id] = BuildingTiming(first_time, result[:1])
+            continue
+        cell.count += 1
+        cell.total += first_time
+        if first_time < cell.min:
+            cell.min = first_time
+            cell.min_result = result[:1]
+        if first_time > cell.max:
+            cell.max = first_time
+            cell.max_result = result[:1]
+    return Pivot(cells)
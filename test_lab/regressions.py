@@ -0,0 +1,325 @@
+"""Head-to-head comparison of a finished test group with a baseline group.
+
+When the last match of a group ends (see match_runs and signals), a
+RegressionReport is computed in the background and stored. match_list then
+flags regressions without comparing anything at view time. The comparisons:
+
+- head to head: every opponent (race and build) is played once per group, so a
+  baseline Victory that became a Defeat is a regression. The flips in both
+  directions are scored with a one-sided sign test.
+- duration: game time of victories, tested with a one-sided Mann-Whitney U test.
+- building timings: first completion time of each building type, tested the
+  same way.
+- maps: win rate on each map both groups played often enough.
+
+Slower wins and buildings are only flagged when they are significant and also
+meaningfully later (MIN_SLOWDOWN_*). With a 15 match group only large
+regressions pass the significance level, which is intended.
+
+The baseline is the latest earlier group of the same difficulty pinned with
+TestGroup.is_baseline, or else the previous group of that difficulty.
+"""
+import logging
+import math
+from collections import defaultdict
+from statistics import median
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections, router, transaction
+from django.db.models import Count, Max, Min, Q, QuerySet, Subquery
+from django.utils import timezone
+
+from . import runner
+from .models import Match, MatchBuildingTiming, RegressionReport, TestGroup
+
+SIGNIFICANCE = 0.05
+# Samples needed on both sides before durations or timings are tested
+MIN_SAMPLES = 3
+# A significantly later win or building is only flagged if it's also at least this much later
+MIN_SLOWDOWN_RATIO = 0.1
+MIN_SLOWDOWN_SECONDS = 10
+# Maps are compared when both groups played them this often, and flagged for this big a drop in win rate
+MAP_MIN_GAMES = 2
+MAP_MIN_DROP = 50
+# Buildings kept in a stored report, flagged ones first
+MAX_BUILDINGS = 10
+
+DECIDED_RESULTS = ('Victory', 'Defeat')
+
+logger = logging.getLogger(__name__)
+
+
+def sign_test_p(worse: int, better: int) -> float:
+    """One-sided p-value of at least `worse` of the changed outcomes being worse if either direction was a coin flip."""
+    changed = worse + better
+    if changed == 0:
+        return 1.0
+    return sum(math.comb(changed, k) for k in range(worse, changed + 1)) / 2 ** changed
+
+
+def mann_whitney_p(baseline: list[float], group: list[float]) -> float | None:
+    """One-sided p-value of the group's values being this much larger than the baseline's by chance.
+
+    Uses the normal approximation with tied values given their average rank.
+    None with fewer than MIN_SAMPLES values on either side.
+    """
+    baseline_count, group_count = len(baseline), len(group)
+    if baseline_count < MIN_SAMPLES or group_count < MIN_SAMPLES:
+        return None
+
+    ordered = sorted([(value, False) for value in baseline] + [(value, True) for value in group])
+    group_rank_sum = 0.0
+    start = 0
+    while start < len(ordered):
+        end = start
+        while end + 1 < len(ordered) and ordered[end + 1][0] == ordered[start][0]:
+            end += 1
+        average_rank = (start + end) / 2 + 1
+        group_rank_sum += average_rank * sum(1 for _, in_group in ordered[start:end + 1] if in_group)
+        start = end + 1
+
+    u = group_rank_sum - group_count * (group_count + 1) / 2
+    mean = baseline_count * group_count / 2
+    deviation = math.sqrt(baseline_count * group_count * (baseline_count + group_count + 1) / 12)
+    z = (u - mean - 0.5) / deviation
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def _opponent(match: Match) -> str:
+    return f"{match.opponent_race}-{match.opponent_build}"
+
+
+def _win_rate(matches: list[Match]) -> list[int]:
+    decided = [match for match in matches if match.result in DECIDED_RESULTS]
+    return [sum(1 for match in decided if match.result == 'Victory'), len(decided)]
+
+
+def _head_to_head(baseline: list[Match], group: list[Match]) -> dict:
+    baseline_results = {_opponent(match): match.result for match in baseline if match.result in DECIDED_RESULTS}
+    worse, better = [], []
+    for match in group:
+        before = baseline_results.get(_opponent(match))
+        if before == 'Victory' and match.result == 'Defeat':
+            worse.append(_opponent(match))
+        elif before == 'Defeat' and match.result == 'Victory':
+            better.append(_opponent(match))
+
+    p = sign_test_p(len(worse), len(better))
+    return {
+        'worse': sorted(worse),
+        'better': sorted(better),
+        'p': round(p, 3),
+        'flagged': bool(worse) and p < SIGNIFICANCE,
+    }
+
+
+def _compare_times(baseline: list[float], group: list[float]) -> dict:
+    """Medians of two samples of times, flagged if the group's are significantly and meaningfully later."""
+    comparison = {
+        'baseline': round(median(baseline), 1) if baseline else None,
+        'group': round(median(group), 1) if group else None,
+        'p': None,
+        'flagged': False,
+    }
+    p = mann_whitney_p(baseline, group)
+    if p is not None:
+        comparison['p'] = round(p, 3)
+        slowdown = comparison['group'] - comparison['baseline']
+        comparison['flagged'] = (
+            p < SIGNIFICANCE
+            and slowdown >= max(MIN_SLOWDOWN_SECONDS, MIN_SLOWDOWN_RATIO * comparison['baseline'])
+        )
+    return comparison
+
+
+def _victory_durations(matches: list[Match]) -> list[float]:
+    return [match.duration_in_game_time for match in matches
+            if match.result == 'Victory' and match.duration_in_game_time]
+
+
+def _building_times(test_group_id: int) -> dict[str, list[float]]:
+    times = defaultdict(list)
+    rows = MatchBuildingTiming.objects.filter(test_group_id=test_group_id).values_list('building__name', 'first_time')
+    for building, first_time in rows:
+        times[building].append(first_time)
+    return times
+
+
+def _buildings(baseline_group_id: int, test_group_id: int) -> list[dict]:
+    baseline_times = _building_times(baseline_group_id)
+    group_times = _building_times(test_group_id)
+    buildings = []
+    for building in baseline_times.keys() & group_times.keys():
+        comparison = _compare_times(baseline_times[building], group_times[building])
+        buildings.append({'name': building, **comparison})
+    buildings.sort(key=lambda building: (not building['flagged'], -(building['group'] - building['baseline'])))
+    return buildings[:MAX_BUILDINGS]
+
+
+def _maps(baseline: list[Match], group: list[Match]) -> list[dict]:
+    def by_map(matches):
+        grouped = defaultdict(list)
+        for match in matches:
+            grouped[match.map_name].append(match)
+        return {map_name: _win_rate(map_matches) for map_name, map_matches in grouped.items()}
+
+    baseline_maps = by_map(baseline)
+    group_maps = by_map(group)
+    maps = []
+    for map_name in sorted(baseline_maps.keys() & group_maps.keys()):
+        (baseline_wins, baseline_games), (group_wins, group_games) = baseline_maps[map_name], group_maps[map_name]
+        if not baseline_games or not group_games:
+            continue
+        drop = 100 * (baseline_wins / baseline_games - group_wins / group_games)
+        maps.append({
+            'name': map_name,
+            'baseline': [baseline_wins, baseline_games],
+            'group': [group_wins, group_games],
+            'flagged': baseline_games >= MAP_MIN_GAMES and group_games >= MAP_MIN_GAMES and drop >= MAP_MIN_DROP,
+        })
+    return maps
+
+
+def _summary(baseline_group_id: int, details: dict) -> str:
+    problems = []
+    head_to_head = details['head_to_head']
+    if head_to_head['flagged']:
+        problems.append(f"{len(head_to_head['worse'])} matchups lost (p={head_to_head['p']})")
+    duration = details['duration']
+    if duration['flagged']:
+        problems.append(f"wins {duration['group'] - duration['baseline']:.0f}s slower")
+    for building in details['buildings']:
+        if building['flagged']:
+            problems.append(f"{building['name']} +{building['group'] - building['baseline']:.0f}s")
+    for map_result in details['maps']:
+        if map_result['flagged']:
+            problems.append(f"{map_result['name']} {map_result['group'][0]}/{map_result['group'][1]} wins")
+
+    if not problems:
+        return f"No significant regressions vs group {baseline_group_id}"
+    summary = f"Regressed vs group {baseline_group_id}: {', '.join(problems)}"
+    return summary if len(summary) <= 255 else summary[:254] + '…'
+
+
+def group_difficulty(test_group_id: int) -> str | None:
+    return (Match.objects.filter(test_group_id=test_group_id)
+            .values_list('opponent_difficulty', flat=True).first())
+
+
+def baseline_for(test_group_id: int) -> int | None:
+    """Group to compare a test group against: the latest pinned baseline before it, else the group before it.
+
+    Only groups played at the same difficulty are considered.
+    """
+    earlier = (Match.objects.filter(test_group_id__lt=test_group_id,
+                                    opponent_difficulty=group_difficulty(test_group_id))
+               .exclude(test_group_id=-1))
+    pinned = (TestGroup.objects.filter(is_baseline=True, id__lt=test_group_id,
+                                       id__in=earlier.values('test_group_id'))
+              .order_by('-id').values_list('id', flat=True).first())
+    if pinned is not None:
+        return pinned
+    return earlier.aggregate(Max('test_group_id'))['test_group_id__max']
+
+
+def first_groups() -> QuerySet:
+    """Ids of the earliest group of each difficulty, which has no earlier group to be compared with (see baseline_for)."""
+    return (Match.objects.exclude(test_group_id=-1).values('opponent_difficulty')
+            .annotate(first_group_id=Min('test_group_id')).values_list('first_group_id', flat=True))
+
+
+def is_complete(test_group_id: int) -> bool:
+    """Whether every match of the group has ended.
+
+    A match has ended once it has an end timestamp, or once the runner saw its
+    process exit. Matches of older groups that never ended count as aborted,
+    like on match_list.
+    """
+    latest_group = Match.objects.aggregate(Max('test_group_id'))['test_group_id__max']
+    if latest_group is not None and test_group_id < latest_group:
+        return True
+    unfinished = (Match.objects.filter(test_group_id=test_group_id, end_timestamp__isnull=True)
+                  .exclude(run__ended_at__isnull=False))
+    return not unfinished.exists()
+
+
+def compute_report(test_group_id: int, baseline_group_id: int | None = None) -> RegressionReport | None:
+    """Compare a test group with a baseline group (baseline_for by default) and store the result.
+
+    Replaces an existing report of the group. Returns None if there is no group to compare with.
+    """
+    if baseline_group_id is None:
+        baseline_group_id = baseline_for(test_group_id)
+    if baseline_group_id is None:
+        return None
+
+    baseline = list(Match.objects.filter(test_group_id=baseline_group_id))
+    group = list(Match.objects.filter(test_group_id=test_group_id))
+    details = {
+        'win_rate': {'baseline': _win_rate(baseline), 'group': _win_rate(group)},
+        'head_to_head': _head_to_head(baseline, group),
+        'duration': _compare_times(_victory_durations(baseline), _victory_durations(group)),
+        'buildings': _buildings(baseline_group_id, test_group_id),
+        'maps': _maps(baseline, group),
+    }
+    flagged = (
+        details['head_to_head']['flagged']
+        or details['duration']['flagged']
+        or any(item['flagged'] for item in details['buildings'] + details['maps'])
+    )
+
+    with transaction.atomic(using=router.db_for_write(RegressionReport)):
+        # Replaced rather than updated so the snapshot sync copies it again under its new id
+        RegressionReport.objects.filter(test_group_id=test_group_id).delete()
+        return RegressionReport.objects.create(
+            test_group_id=test_group_id,
+            baseline_group_id=baseline_group_id,
+            computed_at=timezone.now(),
+            flagged=flagged,
+            summary=_summary(baseline_group_id, details),
+            details=details,
+        )
+
+
+def compute_missing_reports(recompute: bool = False) -> int:
+    """Report on every completed group that doesn't have a report yet (or all of them, with recompute).
+
+    Catches up on groups that completed outside the runner. The groups are
+    selected in one query, with completeness decided like is_complete. The
+    first group of each difficulty is skipped rather than retried on every
+    call: it has no baseline and never gets one, since later groups have higher
+    ids. Returns the number of reports written.
+    """
+    latest_group = Match.objects.order_by('-test_group_id').values('test_group_id')[:1]
+    groups = (Match.objects.exclude(test_group_id=-1).exclude(test_group_id__in=first_groups())
+              .values('test_group_id')
+              .annotate(unfinished=Count('id', filter=Q(end_timestamp__isnull=True, run__ended_at__isnull=True)))
+              .filter(Q(test_group_id__lt=Subquery(latest_group)) | Q(unfinished=0)))
+    if not recompute:
+        groups = groups.exclude(test_group_id__in=RegressionReport.objects.values('test_group_id'))
+    # Listed up front, since compute_report writes while the ids would still be read
+    group_ids = list(groups.order_by('test_group_id').values_list('test_group_id', flat=True))
+    return sum(1 for test_group_id in group_ids if compute_report(test_group_id))
+
+
+@sync_to_async
+def _report_in_background(match_id: int):
+    # Background work isn't wrapped in a request, which is where Django normally drops stale connections
+    close_old_connections()
+    try:
+        test_group_id = Match.objects.filter(id=match_id).values_list('test_group_id', flat=True).first()
+        if (test_group_id is None or test_group_id == -1
+                or RegressionReport.objects.filter(test_group_id=test_group_id).exists()):
+            return
+        if is_complete(test_group_id):
+            compute_report(test_group_id)
+    except Exception:
+        logger.exception("Regression report after match %s failed", match_id)
+
+
+def schedule_report(match_id: int):
+    """Report on the match's group if that was its last match to end.
+
+    Runs on the runner's background loop, the caller doesn't wait for it.
+    """
+    runner.schedule(_report_in_background(match_id))
@@ -0,0 +1,64 @@
+"""Database routing for test_lab models.
+
+Bots and the test runner read and write the MySQL database (PRIMARY_DATABASE).
+Analytics views run inside snapshot_reads(), which sends their reads to the
+local SQLite copy (SNAPSHOT_DATABASE) kept up to date by the
+sync_analytics_snapshot command, so heavy pages don't compete with ingestion.
+"""
+import contextvars
+import functools
+from contextlib import contextmanager
+
+from django.conf import settings
+
+PRIMARY_DATABASE = 'sc2bot_test_lab_db_2'
+SNAPSHOT_DATABASE = 'sc2bot_test_lab_db'
+
+_read_from_snapshot = contextvars.ContextVar('read_from_snapshot', default=False)
+
+
+def reading_from_snapshot() -> bool:
+    return _read_from_snapshot.get()
+
+
+@contextmanager
+def snapshot_reads():
+    """Route test_lab reads to the analytics snapshot for the duration of the block."""
+    token = _read_from_snapshot.set(settings.ANALYTICS_READ_SNAPSHOT)
+    try:
+        yield
+    finally:
+        _read_from_snapshot.reset(token)
+
+
+def analytics_view(view):
+    """Decorator for read-only views that can be served from the analytics snapshot."""
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        with snapshot_reads():
+            return view(request, *args, **kwargs)
+    return wrapper
+
+
+class TestLabRouter:
+    """Sends test_lab models to the primary database, or the snapshot for analytics reads."""
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label != 'test_lab':
+            return None
+        return SNAPSHOT_DATABASE if reading_from_snapshot() else PRIMARY_DATABASE
+
+    def db_for_write(self, model, **hints):
+        if model._meta.app_label != 'test_lab':
+            return None
+        return PRIMARY_DATABASE
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if obj1._meta.app_label == 'test_lab' and obj2._meta.app_label == 'test_lab':
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if app_label == 'test_lab':
+            return db in (PRIMARY_DATABASE, SNAPSHOT_DATABASE)
+        return db == 'default'
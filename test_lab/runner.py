@@ -0,0 +1,88 @@
+"""Starts and cleans up test match processes without blocking a request worker.
+
+Docker runs and the replay viewer keep running after the request that starts
+them has returned. asyncio kills a child process when its transport is closed,
+which happens when a short-lived event loop shuts down (runserver creates one
+per async view). So these processes are spawned on one background event loop
+owned by this module. That loop also waits on each process so it is reaped
+when it exits.
+"""
+import asyncio
+import concurrent.futures
+import contextvars
+import logging
+import threading
+from collections.abc import Awaitable, Callable
+
+DOCKER_COMPOSE_PATH = r'c:\Users\inter\Documents\sc_bot\bot'
+# Bot logs and replays are both written here as <match_id>_<race>_<build>.<ext>
+MATCH_OUTPUT_DIR = r'C:\Users\inter\Documents\StarCraft II\Replays\Multiplayer\docker'
+SC2_SWITCHER_PATH = r"C:\Program Files (x86)\StarCraft II\Support\SC2Switcher.exe"
+
+logger = logging.getLogger(__name__)
+
+_loop: asyncio.AbstractEventLoop | None = None
+_loop_lock = threading.Lock()
+# Only touched from the background loop
+_waiters: set[asyncio.Task] = set()
+
+
+def _background_loop() -> asyncio.AbstractEventLoop:
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name='test-lab-runner', daemon=True).start()
+        return _loop
+
+
+async def run(*command: str, cwd: str | None = None) -> int:
+    """Run a command to completion without blocking the event loop. Returns its exit code."""
+    process = await asyncio.create_subprocess_exec(*command, cwd=cwd)
+    return await process.wait()
+
+
+def schedule(coroutine) -> concurrent.futures.Future:
+    """Start a coroutine on the background loop without waiting for it."""
+    # Scheduled from an empty context so the caller's request state (snapshot routing,
+    # asgiref's executor for the request thread) doesn't carry over into the background loop
+    return contextvars.Context().run(asyncio.run_coroutine_threadsafe, coroutine, _background_loop())
+
+
+async def in_background(coroutine):
+    """Run a coroutine on the background loop and return its result."""
+    return await asyncio.wrap_future(schedule(coroutine))
+
+
+async def _wait(process: asyncio.subprocess.Process, on_exit: Callable[[int], Awaitable] | None):
+    returncode = await process.wait()
+    if on_exit is not None:
+        try:
+            await on_exit(returncode)
+        except Exception:
+            logger.exception("Exit handler of process %s failed", process.pid)
+
+
+async def _spawn(command: tuple[str, ...], cwd: str | None, log_path: str | None,
+                 on_exit: Callable[[int], Awaitable] | None) -> int:
+    if log_path is None:
+        process = await asyncio.create_subprocess_exec(*command, cwd=cwd)
+    else:
+        # The child keeps its own handle to the log after ours is closed
+        with open(log_path, 'w') as log:
+            process = await asyncio.create_subprocess_exec(*command, cwd=cwd, stdout=log, stderr=log)
+
+    waiter = asyncio.create_task(_wait(process, on_exit))
+    _waiters.add(waiter)
+    waiter.add_done_callback(_waiters.discard)
+    return process.pid
+
+
+async def launch(*command: str, cwd: str | None = None, log_path: str | None = None,
+                 on_exit: Callable[[int], Awaitable] | None = None) -> int:
+    """Start a command that keeps running after the caller returns, optionally writing its output to log_path.
+
+    on_exit is awaited on the background loop with the exit code once the process ends.
+    Returns the process id.
+    """
+    return await in_background(_spawn(command, cwd, log_path, on_exit))
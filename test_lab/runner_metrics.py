@@ -0,0 +1,352 @@
+"""Throughput, latency and resource figures of the test runner, read from MatchRun rows.
+
+render_prometheus() is served at /test_lab/metrics for scraping. Its counters and
+histograms cover every recorded run, so they only ever grow, as Prometheus expects.
+They are computed with SQL aggregates rather than by loading the runs.
+throughput_summary() backs the throughput page and only looks at a recent window.
+"""
+import statistics
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db.models import Case, Count, DurationField, ExpressionWrapper, F, Q, Sum, Value, When
+from django.db.models.functions import Greatest, Lower
+from django.utils import timezone
+
+from .db_metrics import connection_metrics
+from .models import Match, MatchRun
+from .warm_pool import pool_status
+
+# (name, start field, end field) of each step of a match's lifecycle
+PHASES = [
+    ('queue_wait', 'queued_at', 'launched_at'),
+    ('container_start', 'launched_at', 'container_started_at'),
+    ('game_start', 'container_started_at', 'game_started_at'),
+    ('game', 'game_started_at', 'ended_at'),
+]
+PHASE_BUCKETS = (1, 5, 15, 30, 60, 120, 300, 600, 1200, 1800, 3600)
+CPU_PERCENT_BUCKETS = (25, 50, 100, 150, 200, 300, 400, 800)
+MEMORY_BYTES_BUCKETS = tuple(int(gib * 1024 ** 3) for gib in (0.5, 1, 1.5, 2, 3, 4, 6, 8))
+
+# Runs that haven't ended after this long lost their runner (e.g. the server restarted) and aren't counted as running
+RUN_TIMEOUT = timedelta(hours=2)
+
+DB_COUNTERS = [
+    ('opened', 'sc2_test_lab_db_connections_opened_total', "Database connections opened."),
+    ('reused', 'sc2_test_lab_db_connections_reused_total', "Requests served on a connection kept from an earlier request."),
+    ('closed', 'sc2_test_lab_db_connections_closed_total', "Database connections closed."),
+    ('health_check_failures', 'sc2_test_lab_db_health_check_failures_total',
+     "Persistent connections that failed their health check."),
+    ('connect_seconds_total', 'sc2_test_lab_db_connect_seconds_total', "Time spent opening database connections."),
+    ('waits', 'sc2_test_lab_db_connection_waits_total', "Requests that waited for a usable database connection."),
+    ('wait_seconds_total', 'sc2_test_lab_db_connection_wait_seconds_total',
+     "Time requests waited for a usable database connection (health check or connect)."),
+]
+
+
+def outcome(run: MatchRun) -> str:
+    """'failed' if the runner process failed or the bot never reported a result, otherwise the lowercase result."""
+    if run.exit_code != 0 or run.match.result not in Match.Result.values:
+        return 'failed'
+    return run.match.result.lower()
+
+
+def phase_seconds(run: MatchRun, start: str, end: str) -> float | None:
+    started, ended = getattr(run, start), getattr(run, end)
+    if started is None or ended is None:
+        return None
+    return max(0.0, (ended - started).total_seconds())
+
+
+def mode(run: MatchRun) -> str:
+    """'warm' for matches played by a warm pool worker, 'cold' for a one-off docker run."""
+    return 'warm' if run.pool_worker else 'cold'
+
+
+def startup_seconds(run: MatchRun) -> float | None:
+    """Launch (or hand-off to a warm worker) until the game started: the cost the warm pool saves."""
+    return phase_seconds(run, 'launched_at', 'game_started_at')
+
+
+def is_running(run: MatchRun, now) -> bool:
+    return run.ended_at is None and run.queued_at > now - RUN_TIMEOUT
+
+
+def percentile(sorted_values: list[float], percent: float) -> float | None:
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * percent / 100))]
+
+
+def _number(value) -> str:
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value)
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _labels(labels: dict) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + '}'
+
+
+class _Exposition:
+    """Builds the Prometheus text format (version 0.0.4)."""
+
+    def __init__(self):
+        self.lines = []
+
+    def family(self, name: str, kind: str, help_text: str):
+        self.lines.append(f"# HELP {name} {help_text}")
+        self.lines.append(f"# TYPE {name} {kind}")
+
+    def sample(self, name: str, value, **labels):
+        self.lines.append(f"{name}{_labels(labels)} {_number(value)}")
+
+    def histogram(self, name: str, aggregates: dict, total: float, buckets: tuple, **labels):
+        """A histogram from the result of _histogram_aggregates, with its sum converted to a number."""
+        for index, bound in enumerate(buckets):
+            self.sample(f"{name}_bucket", aggregates[f'le_{index}'], **labels, le=_number(bound))
+        self.sample(f"{name}_bucket", aggregates['count'], **labels, le='+Inf')
+        self.sample(f"{name}_sum", total, **labels)
+        self.sample(f"{name}_count", aggregates['count'], **labels)
+
+    def text(self) -> str:
+        return '\n'.join(self.lines) + '\n'
+
+
+def _histogram_aggregates(buckets: tuple) -> dict:
+    """Aggregates of a queryset's `value` annotation: cumulative count per bucket bound, sum and count."""
+    aggregates = {f'le_{index}': Count('pk', filter=Q(value__lte=bound)) for index, bound in enumerate(buckets)}
+    aggregates['sum'] = Sum('value')
+    aggregates['count'] = Count('value')
+    return aggregates
+
+
+def _phase_seconds(start: str, end: str):
+    """SQL for phase_seconds: the time between two lifecycle fields, negative times counted as 0."""
+    return Greatest(ExpressionWrapper(F(end) - F(start), output_field=DurationField()), Value(timedelta(0)))
+
+
+def _outcome():
+    """SQL for outcome()."""
+    return Case(
+        When(exit_code=0, match__result__in=Match.Result.values, then=Lower('match__result')),
+        default=Value('failed'),
+    )
+
+
+def render_prometheus() -> str:
+    """Every figure is a SQL aggregate, so a scrape costs the same few queries however many runs there are."""
+    now = timezone.now()
+    live = MatchRun.objects.filter(ended_at__isnull=True, queued_at__gt=now - RUN_TIMEOUT)
+    running = live.filter(launched_at__isnull=False).aggregate(
+        count=Count('pk'), cpu_percent=Sum('cpu_percent_last'), memory_bytes=Sum('memory_bytes_last'))
+    ended = MatchRun.objects.filter(ended_at__isnull=False)
+    out = _Exposition()
+
+    out.family('sc2_test_lab_matches_queued', 'gauge', "Matches waiting to be launched.")
+    out.sample('sc2_test_lab_matches_queued', live.filter(launched_at__isnull=True).count())
+    out.family('sc2_test_lab_matches_running', 'gauge', "Matches whose runner process hasn't exited.")
+    out.sample('sc2_test_lab_matches_running', running['count'])
+    out.family('sc2_test_lab_running_cpu_percent', 'gauge', "CPU use of all running match containers at the last sample.")
+    out.sample('sc2_test_lab_running_cpu_percent', running['cpu_percent'] or 0)
+    out.family('sc2_test_lab_running_memory_bytes', 'gauge', "Memory use of all running match containers at the last sample.")
+    out.sample('sc2_test_lab_running_memory_bytes', running['memory_bytes'] or 0)
+
+    outcomes = (ended.values(race=F('match__opponent_race'), build=F('match__opponent_build'), run_outcome=_outcome())
+                .annotate(count=Count('pk')).order_by('race', 'build', 'run_outcome'))
+    out.family('sc2_test_lab_match_runs_total', 'counter', "Finished match runs by opponent and outcome.")
+    for row in outcomes:
+        out.sample('sc2_test_lab_match_runs_total', row['count'], opponent_race=row['race'], opponent_build=row['build'],
+                   outcome=row['run_outcome'])
+
+    out.family('sc2_test_lab_match_phase_seconds', 'histogram',
+               "Time spent in each step of a match's lifecycle, for one-off (cold) and warm pool runs.")
+    phase_buckets = tuple(timedelta(seconds=bound) for bound in PHASE_BUCKETS)
+    for run_mode in ('cold', 'warm'):
+        mode_runs = ended.filter(pool_worker='') if run_mode == 'cold' else ended.exclude(pool_worker='')
+        for phase, start, end in PHASES:
+            histogram = (mode_runs.filter(**{f'{start}__isnull': False, f'{end}__isnull': False})
+                         .annotate(value=_phase_seconds(start, end))
+                         .aggregate(**_histogram_aggregates(phase_buckets)))
+            total = histogram['sum'].total_seconds() if histogram['sum'] is not None else 0
+            out.histogram('sc2_test_lab_match_phase_seconds', histogram, total, PHASE_BUCKETS, phase=phase, mode=run_mode)
+
+    boots = MatchRun.objects.filter(worker_boot_seconds__isnull=False).aggregate(
+        count=Count('pk'), seconds=Sum('worker_boot_seconds'))
+    out.family('sc2_test_lab_pool_worker_boots_total', 'counter', "Warm pool worker starts that went on to play a match.")
+    out.sample('sc2_test_lab_pool_worker_boots_total', boots['count'])
+    out.family('sc2_test_lab_pool_worker_boot_seconds_total', 'counter', "Time spent starting warm pool workers.")
+    out.sample('sc2_test_lab_pool_worker_boot_seconds_total', boots['seconds'] or 0)
+    out.family('sc2_test_lab_pool_workers', 'gauge', "Warm pool workers in this process by state, and queued matches.")
+    for state, count in sorted(pool_status().items()):
+        out.sample('sc2_test_lab_pool_workers', count, state=state)
+
+    sampled = ended.filter(samples__gt=0)
+    cpu = (sampled.filter(cpu_percent_mean__isnull=False).annotate(value=F('cpu_percent_mean'))
+           .aggregate(**_histogram_aggregates(CPU_PERCENT_BUCKETS)))
+    out.family('sc2_test_lab_match_cpu_percent_mean', 'histogram', "Mean CPU use of each finished match container.")
+    out.histogram('sc2_test_lab_match_cpu_percent_mean', cpu, cpu['sum'] or 0, CPU_PERCENT_BUCKETS)
+    memory = (sampled.filter(memory_bytes_max__isnull=False).annotate(value=F('memory_bytes_max'))
+              .aggregate(**_histogram_aggregates(MEMORY_BYTES_BUCKETS)))
+    out.family('sc2_test_lab_match_memory_peak_bytes', 'histogram', "Peak memory use of each finished match container.")
+    out.histogram('sc2_test_lab_match_memory_peak_bytes', memory, memory['sum'] or 0, MEMORY_BYTES_BUCKETS)
+
+    # Connection counters are per process, like the rest of the process's metrics
+    db_stats = connection_metrics.snapshot()
+    for counter, name, help_text in DB_COUNTERS:
+        out.family(name, 'counter', help_text)
+        for alias, stats in sorted(db_stats.items()):
+            out.sample(name, stats[counter], database=alias)
+
+    return out.text()
+
+
+def _max_concurrent(runs: list[MatchRun]) -> int:
+    """Most runs that were between launch and end at the same time."""
+    changes = []
+    for run in runs:
+        if run.launched_at is not None and run.ended_at is not None:
+            changes.append((run.launched_at, 1))
+            changes.append((run.ended_at, -1))
+    concurrent = peak = 0
+    # Ends sort before launches at the same instant
+    for _, change in sorted(changes):
+        concurrent += change
+        peak = max(peak, concurrent)
+    return peak
+
+
+def _startup_by_mode(runs: list[MatchRun]) -> dict:
+    """Startup times of cold and warm runs, and the time the warm pool saved after paying for worker boots."""
+    startups = {'cold': [], 'warm': []}
+    for run in runs:
+        seconds = startup_seconds(run)
+        if seconds is not None:
+            startups[mode(run)].append(seconds)
+    boots = [run.worker_boot_seconds for run in runs if run.worker_boot_seconds is not None]
+
+    modes = []
+    for run_mode, seconds in startups.items():
+        seconds.sort()
+        modes.append({
+            'mode': run_mode,
+            'matches': len(seconds),
+            'median': percentile(seconds, 50),
+            'p95': percentile(seconds, 95),
+        })
+    cold_median, warm_median = modes[0]['median'], modes[1]['median']
+    saved_per_match = saved_total = None
+    if cold_median is not None and warm_median is not None:
+        saved_per_match = cold_median - warm_median
+        saved_total = saved_per_match * len(startups['warm']) - sum(boots)
+    return {
+        'modes': modes,
+        'boots': len(boots),
+        'boot_seconds': sum(boots),
+        'saved_per_match': saved_per_match,
+        'saved_total': saved_total,
+    }
+
+
+def _run_state(run: MatchRun) -> str:
+    if run.launched_at is None:
+        return "Queued"
+    if run.container_started_at is None:
+        return "Starting container"
+    if run.game_started_at is None:
+        return "Starting game"
+    return "In game"
+
+
+def throughput_summary(hours: int = 24) -> dict:
+    """Games per hour, lifecycle latencies, failure rate and resource use over the last `hours` hours."""
+    now = timezone.now()
+    # Whole clock hours, the last one being the current partial hour
+    since = now.replace(minute=0, second=0, microsecond=0) - timedelta(hours=hours - 1)
+    runs = list(
+        MatchRun.objects
+        .select_related('match')
+        .filter(Q(ended_at__gte=since) | Q(ended_at__isnull=True, queued_at__gte=now - RUN_TIMEOUT))
+        .order_by('queued_at')
+    )
+    ended = [run for run in runs if run.ended_at is not None]
+    failed = [run for run in ended if outcome(run) == 'failed']
+
+    hourly = defaultdict(int)
+    for run in ended:
+        hourly[min(int((run.ended_at - since).total_seconds() // 3600), hours - 1)] += 1
+    busiest_hour = max(hourly.values(), default=0)
+    hourly_rows = [
+        {
+            'start': since + timedelta(hours=hour),
+            'count': hourly[hour],
+            'percent': hourly[hour] / busiest_hour * 100 if busiest_hour else 0,
+        }
+        for hour in range(hours)
+    ]
+
+    phases = []
+    for phase, start, end in PHASES:
+        durations = sorted(d for d in (phase_seconds(run, start, end) for run in ended) if d is not None)
+        phases.append({
+            'name': phase.replace('_', ' ').capitalize(),
+            'count': len(durations),
+            'median': percentile(durations, 50),
+            'p95': percentile(durations, 95),
+            'max': durations[-1] if durations else None,
+        })
+
+    by_opponent = defaultdict(list)
+    for run in ended:
+        by_opponent[f"{run.match.opponent_race}-{run.match.opponent_build}"].append(run)
+    opponents = []
+    for opponent in sorted(by_opponent):
+        opponent_runs = by_opponent[opponent]
+        opponent_failed = sum(1 for run in opponent_runs if outcome(run) == 'failed')
+        game_lengths = sorted(d for d in (phase_seconds(run, 'game_started_at', 'ended_at') for run in opponent_runs)
+                              if d is not None)
+        cpu = [run.cpu_percent_mean for run in opponent_runs if run.cpu_percent_mean is not None]
+        memory = [run.memory_bytes_max for run in opponent_runs if run.memory_bytes_max is not None]
+        opponents.append({
+            'name': opponent,
+            'runs': len(opponent_runs),
+            'failed': opponent_failed,
+            'failure_rate': opponent_failed / len(opponent_runs) * 100,
+            'median_game': percentile(game_lengths, 50),
+            'cpu_percent_mean': statistics.mean(cpu) if cpu else None,
+            'memory_peak_mean': statistics.mean(memory) if memory else None,
+            'memory_peak_max': max(memory, default=None),
+        })
+
+    memory_peaks = sorted(run.memory_bytes_max for run in ended if run.memory_bytes_max is not None)
+    cpu_means = sorted(run.cpu_percent_mean for run in ended if run.cpu_percent_mean is not None)
+    running = [
+        {
+            'run': run,
+            'state': _run_state(run),
+            'elapsed': (now - run.queued_at).total_seconds(),
+        }
+        for run in runs if is_running(run, now)
+    ]
+
+    return {
+        'hours': hours,
+        'finished': len(ended),
+        'games_per_hour': len(ended) / ((now - since).total_seconds() / 3600),
+        'failed': len(failed),
+        'failure_rate': len(failed) / len(ended) * 100 if ended else None,
+        'max_concurrent': _max_concurrent(ended),
+        'memory_peak_p95': percentile(memory_peaks, 95),
+        'cpu_percent_p95': percentile(cpu_means, 95),
+        'hourly': hourly_rows,
+        'phases': phases,
+        'startup': _startup_by_mode(ended),
+        'opponents': opponents,
+        'running': running,
+    }
@@ -0,0 +1,180 @@
+"""Full-text search over match event messages and indexed log lines.
+
+Event messages are dictionary-encoded (see event_names), so the full-text index
+only has to cover event_label.name: one row per distinct message instead of one
+per event. Log lines are copied into log_line by index_log_files, which only
+reads the bytes appended since the previous run.
+
+Migration 0007 creates the indexes: FULLTEXT on MySQL, FTS5 tables on SQLite.
+"""
+import os
+import re
+from collections import defaultdict
+
+from django.db import connections, router, transaction
+from django.db.models import Count, F, Min, Q
+
+from . import event_names
+from .models import LogFile, LogLine, Match, MatchEvent, MatchEventArchive, SnapshotChange
+
+MAX_LABELS = 1000
+MAX_EVENT_RESULTS = 500
+MAX_LOG_RESULTS = 200
+READ_CHUNK_BYTES = 8 * 1024 * 1024
+# Longer lines are indexed in pieces of this size, which also keeps them within a MySQL TEXT column
+MAX_LINE_BYTES = 16 * 1024
+
+
+def _terms(query: str) -> list[str]:
+    return re.findall(r'\w+', query)
+
+
+def _full_text_ids(model, column: str, query: str, limit: int) -> list[int]:
+    """Ids of the newest rows whose column contains every word of query."""
+    terms = _terms(query)
+    if not terms:
+        return []
+
+    table = model._meta.db_table
+    connection = connections[router.db_for_read(model)]
+    if connection.vendor == 'sqlite':
+        sql = f'SELECT rowid FROM {table}_fts WHERE {table}_fts MATCH %s ORDER BY rowid DESC LIMIT %s'
+        match = ' '.join(f'"{term}"' for term in terms)
+    elif connection.vendor == 'mysql':
+        sql = f'SELECT id FROM {table} WHERE MATCH({column}) AGAINST (%s IN BOOLEAN MODE) ORDER BY id DESC LIMIT %s'
+        match = ' '.join(f'+{term}' for term in terms)
+    else:
+        # No full-text index on this backend, fall back to a scan
+        condition = Q()
+        for term in terms:
+            condition &= Q(**{f'{column}__icontains': term})
+        return list(model.objects.filter(condition).order_by('-id').values_list('id', flat=True)[:limit])
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [match, limit])
+        return [row[0] for row in cursor.fetchall()]
+
+
+def search_events(query: str) -> list[dict]:
+    """Matches with events whose message matches query, one row per (match, message)."""
+    label_ids = _full_text_ids(event_names.event_labels.model, 'name', query, MAX_LABELS)
+    if not label_ids:
+        return []
+
+    hits = []
+    for event_model in (MatchEvent, MatchEventArchive):
+        hits.extend(
+            event_model.objects
+            .filter(label_id__in=label_ids)
+            .values('match_id', 'label_id')
+            .annotate(hits=Count('id'), first_time=Min('game_timestamp'))
+            .order_by('-match_id')[:MAX_EVENT_RESULTS]
+        )
+    label_names = event_names.event_labels.names_for(hit['label_id'] for hit in hits)
+    for hit in hits:
+        hit['message'] = label_names[hit['label_id']]
+    return hits
+
+
+def search_log_lines(query: str) -> list[dict]:
+    """Newest indexed log lines matching query."""
+    line_ids = _full_text_ids(LogLine, 'text', query, MAX_LOG_RESULTS)
+    return list(
+        LogLine.objects
+        .filter(id__in=line_ids)
+        .order_by('-id')
+        .values('offset', 'text', match_id=F('log_file__match_id'), log_name=F('log_file__name'))
+    )
+
+
+def search(query: str, include_logs: bool = True) -> list[dict]:
+    """Event and log hits grouped by test group (newest first), then by match."""
+    event_hits = search_events(query)
+    log_hits = search_log_lines(query) if include_logs else []
+
+    hits_by_match = defaultdict(lambda: {'events': [], 'log_lines': []})
+    for hit in event_hits:
+        hits_by_match[hit['match_id']]['events'].append(hit)
+    for hit in log_hits:
+        if hit['match_id'] is not None:
+            hits_by_match[hit['match_id']]['log_lines'].append(hit)
+
+    matches = Match.objects.in_bulk(list(hits_by_match.keys()))
+    groups = defaultdict(list)
+    for match_id in sorted(hits_by_match, reverse=True):
+        match = matches.get(match_id)
+        if match is None:
+            continue
+        groups[match.test_group_id].append({'match': match, **hits_by_match[match_id]})
+
+    return [
+        {'test_group_id': test_group_id, 'matches': groups[test_group_id]}
+        for test_group_id in sorted(groups, reverse=True)
+    ]
+
+
+def _match_id_from_log_name(name: str) -> int | None:
+    """Log files are written as <match_id>_<race>_<build>.log by trigger_tests."""
+    prefix = name.split('_', 1)[0]
+    if not prefix.isdigit():
+        return None
+    match_id = int(prefix)
+    return match_id if Match.objects.filter(id=match_id).exists() else None
+
+
+def index_log_file(path: str) -> int:
+    """Index the complete lines appended to a log file since the last run. Returns the number of lines added."""
+    name = os.path.basename(path)
+    log_file, created = LogFile.objects.get_or_create(name=name)
+    if created:
+        log_file.match_id = _match_id_from_log_name(name)
+        with transaction.atomic(using=router.db_for_write(LogFile)):
+            log_file.save(update_fields=['match'])
+            SnapshotChange.record(LogFile, 'id', [log_file.id])
+
+    size = os.path.getsize(path)
+    if size < log_file.indexed_bytes:
+        # The file was rewritten, start over
+        with transaction.atomic(using=router.db_for_write(LogLine)):
+            LogLine.objects.filter(log_file=log_file).delete()
+            SnapshotChange.record(LogLine, 'log_file_id', [log_file.id])
+        log_file.indexed_bytes = 0
+
+    added = 0
+    with open(path, 'rb') as f:
+        f.seek(log_file.indexed_bytes)
+        while log_file.indexed_bytes < size:
+            chunk = f.read(READ_CHUNK_BYTES)
+            # Only index up to the last complete line; the rest is picked up next time
+            end = chunk.rfind(b'\n') + 1
+            if end == 0:
+                if len(chunk) < READ_CHUNK_BYTES:
+                    break
+                # A line longer than a whole chunk would never complete, so it's indexed as it comes
+                end = len(chunk)
+
+            lines = []
+            offset = log_file.indexed_bytes
+            for raw_line in chunk[:end].splitlines(keepends=True):
+                for start in range(0, len(raw_line), MAX_LINE_BYTES):
+                    text = raw_line[start:start + MAX_LINE_BYTES].decode('utf-8', errors='replace').rstrip('\r\n')
+                    if text:
+                        lines.append(LogLine(log_file=log_file, offset=offset + start, text=text))
+                offset += len(raw_line)
+
+            with transaction.atomic(using=router.db_for_write(LogLine)):
+                LogLine.objects.bulk_create(lines, batch_size=2000)
+                log_file.indexed_bytes = offset
+                log_file.save(update_fields=['indexed_bytes'])
+            added += len(lines)
+            f.seek(offset)
+    return added
+
+
+def index_log_files(log_dir: str) -> int:
+    """Incrementally index every .log file in log_dir. Returns the number of lines added."""
+    added = 0
+    for entry in os.scandir(log_dir):
+        if entry.is_file() and entry.name.endswith('.log'):
+            added += index_log_file(entry.path)
+    return added
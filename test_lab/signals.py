@@ -0,0 +1,24 @@
+from django.db import router, transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from . import regressions
+from .building_timings import record_building_timings
+from .models import Match
+
+
+@receiver(post_save, sender=Match)
+def record_timings_on_match_end(sender, instance, raw, **kwargs):
+    """Summarize a match's building timings as soon as it is saved with an end timestamp."""
+    if raw or instance.end_timestamp is None or instance.events_archived:
+        return
+    record_building_timings([instance.id])
+
+
+@receiver(post_save, sender=Match)
+def report_regressions_on_group_end(sender, instance, raw, **kwargs):
+    """Compare the match's test group with its baseline in the background once its last match has ended."""
+    if raw or instance.end_timestamp is None:
+        return
+    match_id = instance.id
+    transaction.on_commit(lambda: regressions.schedule_report(match_id), using=router.db_for_write(Match))
@@ -0,0 +1,170 @@
+"""Incremental copy of the primary MySQL data into the local SQLite analytics snapshot.
+
+New rows are copied by id high-water mark. MySQL hands out ids as rows are
+inserted, but concurrent transactions can commit them out of order, so every
+run also reads the rows that were new in the previous run again
+(SnapshotSyncState.reread_from). A row is only missed if its transaction takes
+longer than a whole sync interval to commit.
+
+Rows that change after they are inserted are copied again:
+
+- matches that are still running, or that ended after the previous sync (the
+  bot fills in their result, map and end_timestamp)
+- rows named by a SnapshotChange, which the code that updates or deletes rows
+  in place records: archiving and restoring events, recomputed building
+  timings, rewritten logs. The snapshot's rows are replaced by the primary's,
+  so deleted rows leave the snapshot too.
+"""
+from collections import defaultdict
+
+from django.db import connections, transaction
+from django.db.models import Max, Q
+
+from .building_timings import backfill_building_timings
+from .models import (EventLabel, EventType, LogFile, LogLine, Match, MatchBuildingTiming, MatchEvent,
+                     MatchEventArchive, RegressionReport, SnapshotChange, SnapshotSyncState)
+from .regressions import compute_missing_reports
+from .routers import PRIMARY_DATABASE, SNAPSHOT_DATABASE
+
+BATCH_SIZE = 5000
+
+# Copied in this order so foreign keys always point at rows that are already in the snapshot
+SYNCED_MODELS = [
+    EventType,
+    EventLabel,
+    Match,
+    MatchEvent,
+    MatchEventArchive,
+    MatchBuildingTiming,
+    LogFile,
+    LogLine,
+    RegressionReport,
+]
+
+# Rows are upserted on these fields; MatchBuildingTiming and RegressionReport rows are replaced (with new ids) when recomputed
+UNIQUE_FIELDS = {
+    MatchBuildingTiming: ['match', 'building'],
+    RegressionReport: ['test_group_id'],
+}
+
+# SnapshotSyncState row of the SnapshotChange log, which is read but not copied
+CHANGES = 'snapshot_change'
+
+
+def _upsert(model, rows: list) -> None:
+    fields = [field.name for field in model._meta.concrete_fields if not field.primary_key]
+    unique_fields = UNIQUE_FIELDS.get(model, [model._meta.pk.name])
+    model.objects.using(SNAPSHOT_DATABASE).bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=unique_fields,
+        update_fields=[field for field in fields if field not in unique_fields],
+    )
+
+
+def _sync_new_rows(model, state: SnapshotSyncState) -> int:
+    """Copy rows with an id above the mark of the run before this one, saving the mark after each batch."""
+    copied = 0
+    after_id = state.reread_from
+    next_reread_from = state.last_id
+    while True:
+        rows = list(model.objects.using(PRIMARY_DATABASE).filter(id__gt=after_id).order_by('id')[:BATCH_SIZE])
+        if not rows:
+            break
+        after_id = rows[-1].id
+        with transaction.atomic(using=SNAPSHOT_DATABASE):
+            _upsert(model, rows)
+            state.last_id = max(state.last_id, after_id)
+            state.save(using=SNAPSHOT_DATABASE)
+        copied += len(rows)
+
+    state.reread_from = next_reread_from
+    state.save(using=SNAPSHOT_DATABASE)
+    return copied
+
+
+def _sync_changed_matches(state: SnapshotSyncState) -> int:
+    """Re-copy matches below the id mark that were still running or finished since the last sync."""
+    # Take the new mark first so a match finishing while this runs is picked up next time
+    last_end_timestamp = Match.objects.using(PRIMARY_DATABASE).aggregate(Max('end_timestamp'))['end_timestamp__max']
+
+    changed = Q(end_timestamp__isnull=True)
+    if state.last_end_timestamp is not None:
+        changed |= Q(end_timestamp__gt=state.last_end_timestamp)
+    rows = list(Match.objects.using(PRIMARY_DATABASE).filter(changed, id__lte=state.last_id))
+
+    with transaction.atomic(using=SNAPSHOT_DATABASE):
+        if rows:
+            _upsert(Match, rows)
+        state.last_end_timestamp = last_end_timestamp
+        state.save(using=SNAPSHOT_DATABASE)
+    return len(rows)
+
+
+def _replace_rows(model, column: str, value: int) -> int:
+    """Make the snapshot's rows where column = value match the primary's, deleting the ones that are gone."""
+    primary_ids = set(model.objects.using(PRIMARY_DATABASE).filter(**{column: value}).values_list('id', flat=True))
+    snapshot_rows = model.objects.using(SNAPSHOT_DATABASE).filter(**{column: value})
+    stale_ids = [row_id for row_id in snapshot_rows.values_list('id', flat=True) if row_id not in primary_ids]
+
+    copied = 0
+    with transaction.atomic(using=SNAPSHOT_DATABASE):
+        for start in range(0, len(stale_ids), BATCH_SIZE):
+            model.objects.using(SNAPSHOT_DATABASE).filter(id__in=stale_ids[start:start + BATCH_SIZE]).delete()
+        after_id = 0
+        while True:
+            rows = list(model.objects.using(PRIMARY_DATABASE)
+                        .filter(**{column: value}, id__gt=after_id).order_by('id')[:BATCH_SIZE])
+            if not rows:
+                return copied
+            _upsert(model, rows)
+            after_id = rows[-1].id
+            copied += len(rows)
+
+
+def _sync_changes(state: SnapshotSyncState) -> dict[str, int]:
+    """Replace the snapshot's rows named by SnapshotChange records. Returns the number of rows copied per table."""
+    changes = SnapshotChange.objects.using(PRIMARY_DATABASE)
+    # Applied by at least two runs already (see reread_from), so the primary doesn't need them anymore
+    changes.filter(id__lte=state.reread_from).delete()
+    pending = list(changes.filter(id__gt=state.reread_from).order_by('id').values_list('id', 'table', 'column', 'value'))
+
+    targets = defaultdict(set)
+    for _, table, column, value in pending:
+        targets[table].add((column, value))
+    copied = {}
+    for model in SYNCED_MODELS:
+        table = model._meta.db_table
+        if targets[table]:
+            copied[table] = sum(_replace_rows(model, column, value) for column, value in sorted(targets[table]))
+
+    state.reread_from = state.last_id
+    if pending:
+        state.last_id = max(state.last_id, pending[-1][0])
+    state.save(using=SNAPSHOT_DATABASE)
+    return copied
+
+
+def sync_snapshot() -> dict[str, int]:
+    """Bring the analytics snapshot up to date. Returns the number of rows copied per table."""
+    # Summaries are computed on the primary so the snapshot gets them along with the events
+    backfill_building_timings()
+    compute_missing_reports()
+
+    copied = {}
+    for model in SYNCED_MODELS:
+        table = model._meta.db_table
+        state, _ = SnapshotSyncState.objects.using(SNAPSHOT_DATABASE).get_or_create(table=table)
+        if model is Match:
+            copied[table] = _sync_changed_matches(state) + _sync_new_rows(model, state)
+        else:
+            copied[table] = _sync_new_rows(model, state)
+
+    # After the new rows, so rows a change points at are already in the snapshot
+    state, _ = SnapshotSyncState.objects.using(SNAPSHOT_DATABASE).get_or_create(table=CHANGES)
+    for table, count in _sync_changes(state).items():
+        copied[table] += count
+
+    with connections[SNAPSHOT_DATABASE].cursor() as cursor:
+        cursor.execute('PRAGMA optimize')
+    return copied
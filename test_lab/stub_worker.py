@@ -0,0 +1,69 @@
+"""Stand-in bot worker that follows the warm pool protocol (see warm_pool) without starting StarCraft.
+
+    python -m test_lab.stub_worker --boot-seconds 20 --game-seconds 5
+
+Sleeps stand in for booting the client, loading the map, playing and resetting.
+With --single it plays one match from the MATCH_ID, RACE and BUILD environment
+variables and exits, like a one-off `docker compose run`.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+
+def emit(event: str, **fields):
+    print(json.dumps({'event': event, **fields}), flush=True)
+
+
+def log(message: str):
+    print(message, file=sys.stderr, flush=True)
+
+
+def play(assignment: dict, args) -> int:
+    match_id = assignment['match_id']
+    log(f"Match {match_id}: {assignment['race']} {assignment['build']} {assignment.get('difficulty') or 'default'}")
+    time.sleep(args.load_seconds)
+    emit('game_started', match_id=match_id)
+    time.sleep(args.game_seconds)
+    status = 1 if random.random() < args.failure_rate else 0
+    log(f"Match {match_id} finished with status {status}")
+    emit('finished', match_id=match_id, status=status)
+    return status
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--boot-seconds', type=float, default=10)
+    parser.add_argument('--load-seconds', type=float, default=2)
+    parser.add_argument('--game-seconds', type=float, default=5)
+    parser.add_argument('--reset-seconds', type=float, default=0.5)
+    parser.add_argument('--failure-rate', type=float, default=0)
+    parser.add_argument('--single', action='store_true')
+    args = parser.parse_args(argv)
+
+    log("Booting")
+    time.sleep(args.boot_seconds)
+
+    if args.single:
+        return play({
+            'match_id': int(os.environ['MATCH_ID']),
+            'race': os.environ.get('RACE', ''),
+            'build': os.environ.get('BUILD', ''),
+            'difficulty': os.environ.get('DIFFICULTY', ''),
+        }, args)
+
+    emit('ready')
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        play(json.loads(line), args)
+        time.sleep(args.reset_seconds)
+        emit('ready')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,3 +1,607 @@
-from django.test import TestCase
+import asyncio
+import os
+import sys
+import tempfile
+from datetime import datetime, timezone
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from . import event_names, regressions, runner, search, views, warm_pool
+from .archive import archive_test_group, restore_match_events
+from .models import EventLabel, LogFile, LogLine, Match, MatchBuildingTiming, MatchEvent, MatchRun, RegressionReport
+from .routers import PRIMARY_DATABASE, SNAPSHOT_DATABASE
+from .snapshot import SYNCED_MODELS, sync_snapshot
+from .warm_pool import WarmPool
+
+# Seconds a test waits for the pool before failing
+WAIT_TIMEOUT = 20
+
+
+class RecordingRecorder:
+    """Stands in for match_runs.PoolRecorder, keeping the calls instead of writing MatchRun rows."""
+
+    def __init__(self):
+        self.calls = []
+
+    async def assignment_started(self, match_id, worker, container, boot_seconds):
+        self.calls.append(('started', match_id, worker, boot_seconds))
+
+    async def game_started(self, match_id):
+        self.calls.append(('game_started', match_id))
+
+    async def assignment_finished(self, match_id, exit_code):
+        self.calls.append(('finished', match_id, exit_code))
+
+    def of(self, kind: str) -> list[tuple]:
+        return [call for call in self.calls if call[0] == kind]
+
+
+class WarmPoolTests(SimpleTestCase):
+    """WarmPool driving real test_lab.stub_worker processes, with short timeouts patched in."""
+
+    def setUp(self):
+        self.log_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.log_dir.cleanup)
+        self.recorder = RecordingRecorder()
+        patcher = mock.patch.object(warm_pool, 'RESTART_DELAY', 0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def pool(self, size: int = 1, **stub_options) -> WarmPool:
+        options = {'boot_seconds': 0, 'load_seconds': 0, 'game_seconds': 0, 'reset_seconds': 0, **stub_options}
+        command = [sys.executable, '-m', 'test_lab.stub_worker']
+        for option, value in options.items():
+            command += [f"--{option.replace('_', '-')}", str(value)]
+        return WarmPool(size, command, cwd=str(settings.BASE_DIR), log_dir=self.log_dir.name, recorder=self.recorder)
+
+    def assignment(self, match_id: int) -> dict:
+        return {
+            'match_id': match_id,
+            'race': 'zerg',
+            'build': 'rush',
+            'difficulty': 'Hard',
+            'log_path': os.path.join(self.log_dir.name, f"{match_id}_zerg_rush.log"),
+        }
+
+    async def wait_for(self, condition):
+        async with asyncio.timeout(WAIT_TIMEOUT):
+            while not condition():
+                await asyncio.sleep(0.05)
+
+    async def test_workers_become_idle_once_ready(self):
+        pool = self.pool(size=2)
+        pool.start()
+        try:
+            await self.wait_for(lambda: pool.status() == {'idle': 2, 'queued': 0})
+        finally:
+            await pool.stop()
+        self.assertEqual(pool.status(), {'stopped': 2, 'queued': 0})
+        self.assertEqual(self.recorder.calls, [])
+
+    async def test_assignments_are_played_and_logged(self):
+        pool = self.pool(size=2)
+        pool.start()
+        try:
+            for match_id in (1, 2, 3):
+                pool.submit(self.assignment(match_id))
+            async with asyncio.timeout(WAIT_TIMEOUT):
+                await pool.join()
+        finally:
+            await pool.stop()
+
+        self.assertCountEqual(self.recorder.of('finished'), [('finished', match_id, 0) for match_id in (1, 2, 3)])
+        self.assertCountEqual(self.recorder.of('game_started'), [('game_started', match_id) for match_id in (1, 2, 3)])
+        started = self.recorder.of('started')
+        self.assertEqual(sorted(call[1] for call in started), [1, 2, 3])
+        # Each worker's boot is attributed to the first match it plays only
+        for worker in {call[2] for call in started}:
+            boot_seconds = [call[3] for call in started if call[2] == worker]
+            self.assertIsNotNone(boot_seconds[0])
+            self.assertTrue(all(seconds is None for seconds in boot_seconds[1:]))
+        for match_id in (1, 2, 3):
+            with open(self.assignment(match_id)['log_path'], encoding='utf-8') as log:
+                self.assertIn(f"Match {match_id}: zerg rush Hard", log.read())
+
+    async def test_failed_match_reports_its_status(self):
+        pool = self.pool(failure_rate=1)
+        pool.start()
+        try:
+            pool.submit(self.assignment(1))
+            async with asyncio.timeout(WAIT_TIMEOUT):
+                await pool.join()
+        finally:
+            await pool.stop()
+        self.assertEqual(self.recorder.of('finished'), [('finished', 1, 1)])
+
+    async def test_crashed_worker_ends_its_match_and_is_restarted(self):
+        # Long enough to kill the worker mid-game, short enough to play the next match after the restart
+        pool = self.pool(game_seconds=3)
+        worker = pool.workers[0]
+        pool.start()
+        try:
+            pool.submit(self.assignment(1))
+            await self.wait_for(lambda: self.recorder.of('game_started'))
+            crashed = worker.process
+            with self.assertLogs(warm_pool.logger, 'ERROR'):
+                crashed.kill()
+                async with asyncio.timeout(WAIT_TIMEOUT):
+                    await pool.join()
+            self.assertEqual(self.recorder.of('finished'), [('finished', 1, crashed.returncode)])
+            self.assertNotEqual(crashed.returncode, 0)
+
+            await self.wait_for(lambda: worker.state == 'idle')
+            self.assertIsNot(worker.process, crashed)
+            pool.submit(self.assignment(2))
+            async with asyncio.timeout(WAIT_TIMEOUT):
+                await pool.join()
+        finally:
+            await pool.stop()
+        self.assertEqual(self.recorder.of('finished')[1:], [('finished', 2, 0)])
+
+    async def test_game_timeout_ends_the_match_and_restarts_the_worker(self):
+        pool = self.pool(game_seconds=60)
+        worker = pool.workers[0]
+        with mock.patch.object(warm_pool, 'GAME_TIMEOUT', 0.5):
+            pool.start()
+            try:
+                pool.submit(self.assignment(1))
+                await self.wait_for(lambda: self.recorder.of('game_started'))
+                timed_out = worker.process
+                with self.assertLogs(warm_pool.logger, 'ERROR'):
+                    async with asyncio.timeout(WAIT_TIMEOUT):
+                        await pool.join()
+                await self.wait_for(lambda: worker.state == 'idle' and worker.process is not timed_out)
+            finally:
+                await pool.stop()
+        # The worker was still running when the match timed out, so there is no exit code
+        self.assertEqual(self.recorder.of('finished'), [('finished', 1, None)])
+        self.assertIsNotNone(timed_out.returncode)
+
+    async def test_boot_timeout_restarts_the_worker(self):
+        pool = self.pool(boot_seconds=60)
+        worker = pool.workers[0]
+        with mock.patch.object(warm_pool, 'BOOT_TIMEOUT', 0.2):
+            pool.start()
+            try:
+                await self.wait_for(lambda: worker.process is not None)
+                first = worker.process
+                with self.assertLogs(warm_pool.logger, 'ERROR'):
+                    await self.wait_for(lambda: worker.process is not first)
+                self.assertIsNotNone(first.returncode)
+                self.assertEqual(worker.state, 'starting')
+            finally:
+                await pool.stop()
+        self.assertEqual(self.recorder.calls, [])
+
+
+# (test_group_id, race, build, difficulty, result, duration, map_name, Gateway, CyberneticsCore, TwilightCouncil times)
+PIVOT_MATCHES = [
+    (1, 'Protoss', 'Rush', 'Hard', 'Victory', 610, 'Acropolis', 95.5, 180.0, 300.25),
+    (1, 'Protoss', 'Macro', 'Hard', 'Defeat', 905, 'Automaton', 101.0, 175.5, None),
+    (1, 'Zerg', 'Air', 'Hard', 'Victory', None, 'Acropolis', 90.0, None, 280.0),
+    (2, 'Protoss', 'Rush', 'Hard', 'Defeat', 0, 'Automaton', 99.0, 190.0, 310.0),
+    (2, 'Protoss', 'Macro', 'Hard', 'Victory', 720, 'Acropolis', 93.5, 170.0, 295.0),
+    # Later matches against the same opponent take the cell on match_list, win rates count them all
+    (2, 'Zerg', 'Air', 'Hard', 'Defeat', 300, 'Acropolis', 95.0, 190.0, 270.5),
+    (2, 'Zerg', 'Air', 'Hard', 'Crash', 120, 'Automaton', None, None, None),
+    (2, 'Zerg', 'Air', 'Hard', 'Victory', 1030, 'Automaton', 88.0, 165.0, 270.5),
+    (3, 'Terran', 'Timing', 'VeryHard', 'Victory', 840, 'Acropolis', 110.0, 200.0, None),
+    (3, 'Zerg', 'Air', 'VeryHard', 'Pending', None, 'TBD', None, None, None),
+    (4, 'Terran', 'Timing', 'VeryHard', 'Defeat', 415, 'Automaton', 105.0, 210.5, 330.0),
+    (4, 'Zerg', 'Air', 'VeryHard', 'Pending', None, 'TBD', None, None, None),
+]
+PIVOT_BUILDINGS = ['Gateway', 'CyberneticsCore', 'TwilightCouncil']
+
+
+@override_settings(ANALYTICS_READ_SNAPSHOT=False)
+class PivotViewTests(TestCase):
+    """Pins what match_list, map_breakdown and building_timing show for a small set of matches.
+
+    The expected values are what the views rendered before they were built on
+    test_lab.pivot, so these also check that the pivot engine didn't change them.
+    """
+    databases = {'default', PRIMARY_DATABASE}
+
+    @classmethod
+    def setUpTestData(cls):
+        labels = [EventLabel.objects.create(name=name, name_hash=event_names.hash_label(name))
+                  for name in PIVOT_BUILDINGS]
+        for hour, (group_id, race, build, difficulty, result, duration, map_name, *times) in enumerate(PIVOT_MATCHES):
+            match = Match.objects.create(
+                test_group_id=group_id, start_timestamp=datetime(2026, 1, 1, hour, tzinfo=timezone.utc),
+                end_timestamp=None if result == 'Pending' else datetime(2026, 1, 1, hour, 30, tzinfo=timezone.utc),
+                map_name=map_name, opponent_race=race, opponent_build=build, opponent_difficulty=difficulty,
+                result=result, duration_in_game_time=duration)
+            MatchBuildingTiming.objects.bulk_create(
+                MatchBuildingTiming(match=match, test_group_id=group_id, building=label, first_time=time, result=result)
+                for label, time in zip(labels, times) if time is not None)
+
+    def setUp(self):
+        # Label ids are rolled back with each test, so names cached under them must not outlive it
+        self.addCleanup(event_names.event_labels.clear)
+
+    def test_match_list(self):
+        response = self.client.get(reverse('match_list'))
+
+        self.assertEqual(response.context['opponents'], ['Protoss-Macro', 'Protoss-Rush', 'Terran-Timing', 'Zerg-Air'])
+        self.assertEqual(response.context['header_structure'], [
+            {'name': 'Protoss', 'span': 2, 'builds': ['Macro 50%', 'Rush 50%'], 'win_rate': '50%'},
+            {'name': 'Terran', 'span': 1, 'builds': ['Timing 50%'], 'win_rate': '50%'},
+            {'name': 'Zerg', 'span': 1, 'builds': ['Air 67%'], 'win_rate': '67%'},
+        ])
+        rows = [
+            (row['test_group_id'], row['difficulty'], row['group_win_percentage'], row['avg_duration'],
+             row['avg_duration_display'],
+             [cell and (cell['id'], cell['result'], cell['css_class'], cell['duration_display'], cell['map_name'])
+              for cell in row['results']])
+            for row in response.context['pivot_data']
+        ]
+        self.assertEqual(rows, [
+            (4, 'VeryHard', '0.0%', 415, '6:55',
+             [None, None, (11, 'Defeat', 'defeat', '6:55', 'Automaton'), (12, 'Pending', 'pending', '-', 'TBD')]),
+            (3, 'VeryHard', '100.0%', 840, '14:00',
+             [None, None, (9, 'Victory', 'victory', '14:00', 'Acropolis'), (10, 'Aborted', '', '-', 'TBD')]),
+            (2, 'Hard', '66.7%', 875, '14:35',
+             [(5, 'Victory', 'victory', '12:00', 'Acropolis'), (4, 'Defeat', 'defeat', '0:00', 'Automaton'), None,
+              (8, 'Victory', 'victory', '17:10', 'Automaton')]),
+            (1, 'Hard', '66.7%', 757, '12:37',
+             [(2, 'Defeat', 'defeat', '15:05', 'Automaton'), (1, 'Victory', 'victory', '10:10', 'Acropolis'), None,
+              (3, 'Victory', 'victory', '-', 'Acropolis')]),
+        ])
+        self.assertContains(response, '<th colspan="2" class="race-header race-border-right">Protoss 50%</th>',
+                            html=True)
+
+    def test_match_list_difficulty_filter(self):
+        response = self.client.get(reverse('match_list'), {'difficulty': 'VeryHard'})
+
+        self.assertEqual(response.context['opponents'], ['Terran-Timing', 'Zerg-Air'])
+        self.assertEqual([row['test_group_id'] for row in response.context['pivot_data']], [4, 3])
+        self.assertEqual(response.context['header_structure'][1]['win_rate'], '-')
+
+    def test_map_breakdown(self):
+        response = self.client.get(reverse('map_breakdown'))
+
+        self.assertEqual(response.context['opponents'],
+                         ['Protoss-Hard-Macro', 'Protoss-Hard-Rush', 'Zerg-Hard-Air', 'Terran-VeryHard-Timing'])
+        self.assertEqual(response.context['header_structure'], [
+            {'difficulty': 'Hard', 'span': 3, 'win_rate': '57%', 'races': [
+                {'name': 'Protoss', 'span': 2, 'builds': ['Macro 50%', 'Rush 50%'], 'win_rate': '50%'},
+                {'name': 'Zerg', 'span': 1, 'builds': ['Air 67%'], 'win_rate': '67%'},
+            ]},
+            {'difficulty': 'VeryHard', 'span': 1, 'win_rate': '50%', 'races': [
+                {'name': 'Terran', 'span': 1, 'builds': ['Timing 50%'], 'win_rate': '50%'},
+            ]},
+        ])
+        rows = [
+            (row['map_name'], row['overall_wins'], row['overall_games'], row['overall_win_rate'],
+             row['overall_avg_duration'],
+             [(cell['wins'], cell['games_played'], cell['win_rate'], cell['avg_duration']) for cell in row['results']])
+            for row in response.context['pivot_data']
+        ]
+        self.assertEqual(rows, [
+            ('Acropolis', 4, 5, '80%', 617,
+             [(1, 1, '100%', 720), (1, 1, '100%', 610), (1, 2, '50%', 300), (1, 1, '100%', 840)]),
+            ('Automaton', 1, 4, '25%', 617,
+             [(0, 1, '0%', 905), (0, 1, '0%', None), (1, 1, '100%', 575), (0, 1, '0%', 415)]),
+        ])
+        self.assertNotContains(response, 'TBD')
+
+    def test_building_timing(self):
+        response = self.client.get(reverse('building_timing'))
+
+        self.assertEqual(response.context['building_types'], ['Gateway', 'CyberneticsCore', 'TwilightCouncil'])
+        for average, expected in zip(response.context['avg_timings'], [101.09375, 191.75, 302.2083333]):
+            self.assertAlmostEqual(average, expected)
+        rows = [
+            (row['test_group_id'],
+             [timing and (timing['min'], timing['max'], round(timing['avg'], 2), timing['min_result'],
+                          timing['max_result'], timing['performance_class'])
+              for timing in row['timings']])
+            for row in response.context['pivot_data']
+        ]
+        self.assertEqual(rows, [
+            (4, [(105.0, 105.0, 105.0, 'D', 'D', 'slightly-slower'), (210.5, 210.5, 210.5, 'D', 'D', 'much-slower'),
+                 (330.0, 330.0, 330.0, 'D', 'D', 'much-slower')]),
+            (3, [(110.0, 110.0, 110.0, 'V', 'V', 'slower'), (200.0, 200.0, 200.0, 'V', 'V', 'slower'), None]),
+            # TwilightCouncil's 270.5 was first reached in a defeat, the later victory only tied it
+            (2, [(88.0, 99.0, 93.88, 'V', 'D', 'faster'), (165.0, 190.0, 178.75, 'V', 'D', 'much-faster'),
+                 (270.5, 310.0, 286.5, 'D', 'D', 'much-faster')]),
+            (1, [(90.0, 101.0, 95.5, 'V', 'D', 'faster'), (175.5, 180.0, 177.75, 'D', 'V', 'much-faster'),
+                 (280.0, 300.25, 290.12, 'V', 'V', 'much-faster')]),
+        ])
+
+    def test_building_timing_filters(self):
+        response = self.client.get(reverse('building_timing'), {'race': 'Zerg', 'group_max': 2})
+
+        self.assertEqual(response.context['building_types'], ['Gateway', 'CyberneticsCore', 'TwilightCouncil'])
+        self.assertEqual([row['test_group_id'] for row in response.context['pivot_data']], [2, 1])
+        self.assertIsNone(response.context['pivot_data'][1]['timings'][1])
+
+
+@override_settings(ANALYTICS_READ_SNAPSHOT=False)
+class MatchListRowCacheTests(TestCase):
+    """Rendered rows of finished groups must all stay cached, however many groups there are."""
+    databases = {'default', PRIMARY_DATABASE}
+    # More than LocMemCache's default MAX_ENTRIES of 300
+    GROUPS = 400
+
+    @classmethod
+    def setUpTestData(cls):
+        started = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        Match.objects.bulk_create(
+            Match(test_group_id=group_id, start_timestamp=started, end_timestamp=started, map_name='Acropolis',
+                  opponent_race='Zerg', opponent_build='Air', opponent_difficulty='Hard', result='Victory',
+                  duration_in_game_time=600)
+            for group_id in range(cls.GROUPS + 1))
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_every_finished_row_stays_cached(self):
+        response = self.client.get(reverse('match_list'))
+
+        rows = [row for row in response.context['pivot_data'] if row.get('cache_version')]
+        self.assertEqual(len(rows), self.GROUPS)
+        missing = [row['test_group_id'] for row in rows
+                   if make_template_fragment_key('match_list_row', [row['test_group_id'], row['cache_version']])
+                   not in cache]
+        self.assertEqual(missing, [])
+
+
+class ServeLogTests(TestCase):
+    """serve_log streams the log from the requested offset, with the iterator the server interface can stream."""
+    databases = {'default', PRIMARY_DATABASE}
+    # Three full chunks and a partial one
+    LOG = b''.join(f"line {number}\n".encode() for number in range(30000))
+
+    def setUp(self):
+        log_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(log_dir.cleanup)
+        with open(os.path.join(log_dir.name, '12_zerg_rush.log'), 'wb') as log:
+            log.write(self.LOG)
+        patcher = mock.patch.object(runner, 'MATCH_OUTPUT_DIR', log_dir.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.assertGreater(len(self.LOG), 3 * views.LOG_CHUNK_BYTES)
+
+    @override_settings(RUNNING_UNDER_ASGI=False)
+    def test_wsgi_streams_sync_iterator(self):
+        response = self.client.get(reverse('serve_log', args=[12]), {'offset': 7})
+
+        self.assertFalse(response.is_async)
+        self.assertEqual(response['Content-Length'], str(len(self.LOG) - 7))
+        self.assertEqual(b''.join(response.streaming_content), self.LOG[7:])
+
+    @override_settings(RUNNING_UNDER_ASGI=True)
+    async def test_asgi_streams_async_iterator(self):
+        response = await self.async_client.get(reverse('serve_log', args=[12]), {'offset': len(self.LOG) + 5})
+
+        self.assertTrue(response.is_async)
+        self.assertEqual(response['Content-Length'], '0')
+        self.assertEqual([chunk async for chunk in response.streaming_content], [])
+
+    @override_settings(RUNNING_UNDER_ASGI=True)
+    async def test_asgi_streams_whole_log(self):
+        response = await self.async_client.get(reverse('serve_log', args=[12]))
+
+        self.assertEqual(b''.join([chunk async for chunk in response.streaming_content]), self.LOG)
+
+
+# (test_group_id, race, build, result, duration, {building: first completion time})
+SNAPSHOT_MATCHES = [
+    (1, 'Protoss', 'Rush', 'Victory', 610, {'Gateway': 95.5, 'CyberneticsCore': 180.0}),
+    (1, 'Zerg', 'Air', 'Defeat', 905, {'Gateway': 101.0}),
+    (2, 'Protoss', 'Rush', 'Defeat', 720, {'Gateway': 99.0, 'CyberneticsCore': 190.0}),
+    (2, 'Zerg', 'Air', 'Defeat', 300, {'Gateway': 93.5, 'TwilightCouncil': 280.0}),
+]
+
+# Context of each analytics page that holds everything it shows
+SNAPSHOT_PAGE_CONTEXT = {
+    'match_list': ['pivot_data', 'opponents', 'header_structure'],
+    'map_breakdown': ['pivot_data', 'opponents', 'header_structure'],
+    'building_timing': ['pivot_data', 'building_types', 'avg_timings'],
+}
+
+
+class SnapshotSyncTests(TestCase):
+    """After every sync, the snapshot has the primary's rows and the analytics views show the same from both."""
+    databases = {'default', PRIMARY_DATABASE, SNAPSHOT_DATABASE}
+
+    def setUp(self):
+        # Dictionary ids are rolled back with each test, so names cached under them must not outlive it
+        self.addCleanup(event_names.event_labels.clear)
+        self.addCleanup(event_names.event_types.clear)
+        for match in SNAPSHOT_MATCHES:
+            self.create_match(*match)
+
+    def create_match(self, group_id, race, build, result, duration, first_times) -> Match:
+        started = datetime(2026, 1, 1, len(first_times), tzinfo=timezone.utc)
+        match = Match.objects.create(test_group_id=group_id, start_timestamp=started, map_name='Acropolis',
+                                     opponent_race=race, opponent_build=build, opponent_difficulty='Hard',
+                                     result='Pending')
+        events = []
+        for building, first_time in first_times.items():
+            # A later completion of the same building, which the timings must ignore
+            for game_timestamp in (first_time, first_time + 60):
+                event = MatchEvent(match=match, game_timestamp=game_timestamp)
+                event.type, event.message = 'Building', building
+                events.append(event)
+        MatchEvent.objects.bulk_create(events)
+        # Ending the match records its building timings
+        match.result, match.duration_in_game_time, match.end_timestamp = result, duration, started
+        match.save()
+        return match
+
+    def assertSnapshotMatchesPrimary(self):
+        for model in SYNCED_MODELS:
+            with self.subTest(table=model._meta.db_table):
+                self.assertEqual(model.objects.using(SNAPSHOT_DATABASE).count(),
+                                 model.objects.using(PRIMARY_DATABASE).count())
+        # Pages compare by what they render (their CSRF tokens differ), the JSON events by content
+        pages = [(reverse(view), keys) for view, keys in SNAPSHOT_PAGE_CONTEXT.items()]
+        pages += [(reverse('match_events', args=[match_id]), None)
+                  for match_id in Match.objects.values_list('id', flat=True)]
+        for page, keys in pages:
+            with self.subTest(page=page):
+                with override_settings(ANALYTICS_READ_SNAPSHOT=False):
+                    primary = self.client.get(page)
+                with override_settings(ANALYTICS_READ_SNAPSHOT=True):
+                    snapshot = self.client.get(page)
+                self.assertEqual(snapshot.status_code, 200)
+                if keys is None:
+                    self.assertEqual(snapshot.json(), primary.json())
+                else:
+                    self.assertEqual({key: snapshot.context[key] for key in keys},
+                                     {key: primary.context[key] for key in keys})
+
+    def test_sync_archive_restore_resync(self):
+        sync_snapshot()
+        self.assertEqual(MatchBuildingTiming.objects.using(SNAPSHOT_DATABASE).count(), 7)
+        self.assertTrue(RegressionReport.objects.using(SNAPSHOT_DATABASE).filter(test_group_id=2).exists())
+        self.assertSnapshotMatchesPrimary()
+
+        # New rows are picked up incrementally
+        self.create_match(3, 'Protoss', 'Rush', 'Victory', 640, {'Gateway': 90.0})
+        sync_snapshot()
+        self.assertSnapshotMatchesPrimary()
+
+        archived = archive_test_group(1)
+        self.assertEqual(archived, 6)
+        sync_snapshot()
+        self.assertEqual(MatchEvent.objects.using(SNAPSHOT_DATABASE).filter(match__test_group_id=1).count(), 0)
+        self.assertSnapshotMatchesPrimary()
+
+        match = Match.objects.filter(test_group_id=1).order_by('id').first()
+        self.assertEqual(restore_match_events(match.id), 4)
+        sync_snapshot()
+        self.assertEqual(MatchEvent.objects.using(SNAPSHOT_DATABASE).filter(match=match).count(), 4)
+        self.assertSnapshotMatchesPrimary()
+
+
+class IndexLogFileTests(TestCase):
+    """index_log_file indexes complete lines once, picking up where the previous run stopped."""
+    databases = {'default', PRIMARY_DATABASE}
+
+    def setUp(self):
+        log_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(log_dir.cleanup)
+        self.path = os.path.join(log_dir.name, '12_zerg_rush.log')
+
+    def write(self, content: bytes, mode: str = 'wb'):
+        with open(self.path, mode) as log:
+            log.write(content)
+
+    def indexed(self) -> list[tuple[int, str]]:
+        return list(LogLine.objects.filter(log_file__name='12_zerg_rush.log').order_by('offset')
+                    .values_list('offset', 'text'))
+
+    def test_partial_final_line_waits_for_its_newline(self):
+        self.write(b'first\nsecond\npart')
+        self.assertEqual(search.index_log_file(self.path), 2)
+        self.assertEqual(LogFile.objects.get().indexed_bytes, 13)
+
+        self.write(b'ial\nthird\n', 'ab')
+        self.assertEqual(search.index_log_file(self.path), 2)
+        self.assertEqual(self.indexed(), [(0, 'first'), (6, 'second'), (13, 'partial'), (21, 'third')])
+        self.assertEqual(search.index_log_file(self.path), 0)
+
+    @mock.patch.object(search, 'READ_CHUNK_BYTES', 16)
+    def test_line_longer_than_a_chunk_is_indexed_in_pieces(self):
+        self.write(b'short\n' + b'x' * 40 + b'\nend\n')
+
+        self.assertEqual(search.index_log_file(self.path), 5)
+        self.assertEqual(self.indexed(), [(0, 'short'), (6, 'x' * 16), (22, 'x' * 16), (38, 'x' * 8), (47, 'end')])
+        self.assertEqual(LogFile.objects.get().indexed_bytes, 51)
+
+    def test_log_rewritten_shorter_is_indexed_again(self):
+        self.write(b'one\ntwo\nthree\n')
+        self.assertEqual(search.index_log_file(self.path), 3)
+
+        self.write(b'new\n')
+        self.assertEqual(search.index_log_file(self.path), 1)
+        self.assertEqual(self.indexed(), [(0, 'new')])
+        self.assertEqual(LogFile.objects.get().indexed_bytes, 4)
+
+
+class SignificanceTests(SimpleTestCase):
+    """The p-values regressions flags on, pinned to values worked out by hand."""
+
+    def test_sign_test_p(self):
+        self.assertEqual(regressions.sign_test_p(0, 0), 1.0)
+        self.assertEqual(regressions.sign_test_p(3, 0), 1 / 8)
+        self.assertEqual(regressions.sign_test_p(6, 0), 1 / 64)
+        # (C(6, 5) + C(6, 6)) / 2 ** 6
+        self.assertEqual(regressions.sign_test_p(5, 1), 7 / 64)
+
+    def test_mann_whitney_p(self):
+        # U = 9 of 9, z = (9 - 4.5 - 0.5) / sqrt(5.25)
+        self.assertAlmostEqual(regressions.mann_whitney_p([1, 2, 3], [4, 5, 6]), 0.040428, places=6)
+        self.assertAlmostEqual(regressions.mann_whitney_p([4, 5, 6], [1, 2, 3]), 0.985452, places=6)
+        # The three tied 2s share rank 3, so U = 8
+        self.assertAlmostEqual(regressions.mann_whitney_p([1, 2, 2], [2, 3, 4]), 0.095215, places=6)
+        self.assertIsNone(regressions.mann_whitney_p([1, 2], [3, 4, 5]))
+        self.assertIsNone(regressions.mann_whitney_p([1, 2, 3], [4, 5]))
+
+
+# Every group plays each of these opponents once
+REPORT_OPPONENTS = [(race, build) for race in ('Protoss', 'Terran', 'Zerg') for build in ('Rush', 'Macro')]
+# Six flips give sign_test_p(6, 0) = 1/64, rounded in the report
+GROUP_2_SUMMARY = "Regressed vs group 1: 6 matchups lost (p=0.016), Acropolis 0/6 wins"
+
+
+class RegressionReportTests(TestCase):
+    """Group 2 loses every matchup group 1 won, group 3 plays like group 2, and group 4 is still running."""
+    databases = {'default', PRIMARY_DATABASE}
+
+    def setUp(self):
+        started = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        for group_id, result in ((1, 'Victory'), (2, 'Defeat'), (3, 'Defeat'), (4, 'Victory')):
+            for race, build in REPORT_OPPONENTS:
+                Match.objects.create(test_group_id=group_id, start_timestamp=started, end_timestamp=started,
+                                     map_name='Acropolis', opponent_race=race, opponent_build=build,
+                                     opponent_difficulty='Hard', result=result, duration_in_game_time=600)
+        exited, playing = (Match.objects.create(test_group_id=4, start_timestamp=started, map_name='Acropolis',
+                                                opponent_race='Zerg', opponent_build=build,
+                                                opponent_difficulty='Hard', result='Pending')
+                           for build in ('Air', 'Timing'))
+        # One has exited without reporting a result, the other is still playing
+        MatchRun.objects.create(match=exited, queued_at=started, ended_at=started, exit_code=1)
+        MatchRun.objects.create(match=playing, queued_at=started)
+
+    def test_lost_matchups_are_flagged(self):
+        report = regressions.compute_report(2)
+
+        self.assertTrue(report.flagged)
+        self.assertEqual(report.baseline_group_id, 1)
+        self.assertEqual(report.summary, GROUP_2_SUMMARY)
+        self.assertEqual(report.details['head_to_head']['p'], 0.016)
+        self.assertEqual(report.details['win_rate'], {'baseline': [6, 6], 'group': [0, 6]})
+
+    def test_unchanged_group_is_not_flagged(self):
+        report = regressions.compute_report(3)
+
+        self.assertFalse(report.flagged)
+        self.assertEqual(report.baseline_group_id, 2)
+        self.assertEqual(report.summary, "No significant regressions vs group 2")
+        self.assertEqual(report.details['head_to_head']['p'], 1.0)
+
+    def test_missing_reports_skip_first_incomplete_and_reported_groups(self):
+        RegressionReport.objects.create(test_group_id=3, baseline_group_id=2, computed_at=datetime.now(timezone.utc),
+                                        summary='Stale')
+
+        self.assertEqual(regressions.compute_missing_reports(), 1)
+        self.assertEqual(list(RegressionReport.objects.order_by('test_group_id').values_list('test_group_id', 'summary')),
+                         [(2, GROUP_2_SUMMARY), (3, 'Stale')])
+        self.assertEqual(regressions.compute_missing_reports(), 0)
+
+        # Group 4 completes once its last match's process exits
+        MatchRun.objects.filter(ended_at__isnull=True).update(ended_at=datetime.now(timezone.utc))
+        self.assertEqual(regressions.compute_missing_reports(), 1)
+        self.assertEqual(regressions.compute_missing_reports(recompute=True), 3)
+        self.assertFalse(RegressionReport.objects.filter(summary='Stale').exists())
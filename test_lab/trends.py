@@ -0,0 +1,130 @@
+"""Rolling win rate and median game length per opponent or map across test groups.
+
+Only the newest `groups` test groups are read and every series is reduced to at
+most `points` bucket averages, so response size and work stay the same no
+matter how many groups exist.
+"""
+from bisect import bisect_left, insort
+from collections import defaultdict, deque
+
+from .models import Match
+
+DEFAULT_GROUPS = 300
+MAX_GROUPS = 1000
+DEFAULT_POINTS = 60
+MAX_POINTS = 200
+DEFAULT_WINDOW = 10
+MAX_WINDOW = 50
+
+
+def _series_key(dimension: str, race: str, build: str, map_name: str) -> str:
+    if dimension == 'map':
+        return map_name
+    return f"{race}-{build}"
+
+
+def _sorted_median(values: list[float]) -> float | None:
+    if not values:
+        return None
+    middle = len(values) // 2
+    return values[middle] if len(values) % 2 else (values[middle - 1] + values[middle]) / 2
+
+
+def _rolling(group_ids: list[int], per_group: dict, window: int) -> list[tuple[int, float | None, float | None]]:
+    """(group id, win rate %, median duration) over the trailing `window` groups, for each group with data.
+
+    Totals and the sorted durations are updated as a group enters or leaves the window instead of
+    being recomputed for every group.
+    """
+    recent = deque()
+    wins = games = 0
+    durations = []
+    rolled = []
+    for group_id in group_ids:
+        stats = per_group.get(group_id)
+        if stats is None:
+            continue
+        recent.append(stats)
+        wins += stats['wins']
+        games += stats['games']
+        for duration in stats['durations']:
+            insort(durations, duration)
+        if len(recent) > window:
+            dropped = recent.popleft()
+            wins -= dropped['wins']
+            games -= dropped['games']
+            for duration in dropped['durations']:
+                del durations[bisect_left(durations, duration)]
+        rolled.append((
+            group_id,
+            wins / games * 100 if games else None,
+            _sorted_median(durations),
+        ))
+    return rolled
+
+
+def _bucket_average(values: list[float | None]) -> float | None:
+    present = [value for value in values if value is not None]
+    return sum(present) / len(present) if present else None
+
+
+def downsample(rolled: list[tuple], points: int) -> list[list]:
+    """Average consecutive rows into at most `points` buckets."""
+    if len(rolled) <= points:
+        return [list(row) for row in rolled]
+
+    bucket_size = len(rolled) / points
+    sampled = []
+    for bucket in range(points):
+        rows = rolled[int(bucket * bucket_size):int((bucket + 1) * bucket_size)]
+        sampled.append([
+            rows[-1][0],  # label each bucket with its newest group
+            _bucket_average([row[1] for row in rows]),
+            _bucket_average([row[2] for row in rows]),
+        ])
+    return sampled
+
+
+def trend_series(dimension: str = 'opponent', groups: int = DEFAULT_GROUPS, points: int = DEFAULT_POINTS,
+                 window: int = DEFAULT_WINDOW, difficulty: str = '') -> dict:
+    """Downsampled rolling trends per opponent (race-build) or per map over the newest test groups."""
+    groups = max(1, min(groups, MAX_GROUPS))
+    points = max(2, min(points, MAX_POINTS))
+    window = max(1, min(window, MAX_WINDOW))
+
+    matches = Match.objects.exclude(test_group_id=-1)
+    if difficulty:
+        matches = matches.filter(opponent_difficulty=difficulty)
+
+    group_ids = list(
+        matches.order_by('-test_group_id')
+        .values_list('test_group_id', flat=True)
+        .distinct()[:groups]
+    )
+    if not group_ids:
+        return {'dimension': dimension, 'groups': [], 'series': []}
+    group_ids.reverse()
+
+    rows = (
+        matches.filter(test_group_id__gte=group_ids[0])
+        .values_list('test_group_id', 'opponent_race', 'opponent_build', 'map_name', 'result', 'duration_in_game_time')
+    )
+
+    # series -> test group -> {wins, games, durations}
+    stats = defaultdict(lambda: defaultdict(lambda: {'wins': 0, 'games': 0, 'durations': []}))
+    for test_group_id, race, build, map_name, result, duration in rows:
+        if dimension == 'map' and map_name == "TBD":
+            continue
+        group_stats = stats[_series_key(dimension, race, build, map_name)][test_group_id]
+        if result in ['Victory', 'Defeat']:
+            group_stats['games'] += 1
+            if result == 'Victory':
+                group_stats['wins'] += 1
+        if duration is not None and duration > 0:
+            group_stats['durations'].append(duration)
+
+    series = [
+        {'name': name, 'points': downsample(_rolling(group_ids, stats[name], window), points)}
+        for name in sorted(stats)
+    ]
+    return {'dimension': dimension, 'groups': [group_ids[0], group_ids[-1]], 'series': series}
@@ -6,6 +6,15 @@ urlpatterns = [
     path('trigger-tests/', views.trigger_tests, name='trigger_tests'),
     path('replay/<int:match_id>/', views.serve_replay, name='serve_replay'),
     path('log/<int:match_id>/', views.serve_log, name='serve_log'),
+    path('group/<int:test_group_id>/report/', views.regression_report, name='regression_report'),
     path('maps/', views.map_breakdown, name='map_breakdown'),
     path('buildings/', views.building_timing, name='building_timing'),
+    path('match/<int:match_id>/timeline/', views.match_timeline, name='match_timeline'),
+    path('match/<int:match_id>/events/', views.match_events, name='match_events'),
+    path('search/', views.search, name='search'),
+    path('trends/', views.trends, name='trends'),
+    path('trends/data/', views.trend_data, name='trend_data'),
+    path('db-metrics/', views.db_metrics, name='db_metrics'),
+    path('metrics', views.metrics, name='metrics'),
+    path('throughput/', views.throughput, name='throughput'),
 ]
@@ -1,26 +1,34 @@
+import asyncio
 import glob
 import os
-import subprocess
-from collections import defaultdict
+import zlib
 from datetime import datetime
 
+from django.conf import settings
 from django.contrib import messages
-from django.db.models import Avg, Max, Min
-from django.http import Http404, HttpResponse, HttpResponseRedirect
+from django.db import connections
+from django.db.models import Avg, Max, Min, Q
+from django.http import Http404, HttpResponse, HttpResponseRedirect, JsonResponse, StreamingHttpResponse
 from django.shortcuts import redirect, render
 from django.urls import reverse
+from django.utils.http import content_disposition_header
 
-from .models import Match, MatchEvent
+from . import bot_versions, event_names, match_runs, regressions, runner, warm_pool
+from .db_metrics import connection_metrics
+from .models import (EventType, LogFile, Match, MatchBuildingTiming, MatchEvent, MatchEventArchive, RegressionReport,
+                     TestGroup)
+from .pivot import (building_timing_pivot, map_breakdown_pivot, match_list_pivot, opponent_results, ratio,
+                    span_totals)
+from .routers import analytics_view
+from .runner_metrics import render_prometheus, throughput_summary
+from .search import search as full_text_search
+from .templatetags.time_filters import format_duration
+from .trends import DEFAULT_GROUPS, DEFAULT_POINTS, DEFAULT_WINDOW, MAX_WINDOW, trend_series
 
 
+@analytics_view
 def match_list(request):
     """View to display match data grouped by test_group_id in a pivot table."""
-    # Define difficulty order to match the filter dropdown
-    difficulty_order = [
-        'Easy', 'Medium', 'MediumHard', 'Hard', 'Harder', 'VeryHard',
-        'CheatVision', 'CheatMoney', 'CheatInsane'
-    ]
-    
     # Get difficulty filter from request
     selected_difficulty = request.GET.get('difficulty', '')
     
@@ -28,7 +36,7 @@ def match_list(request):
     print(f"DEBUG: All GET parameters: {request.GET}")
     print(f"DEBUG: Selected difficulty filter: '{selected_difficulty}'")
     
-    matches = Match.objects.using('sc2bot_test_lab_db_2').all().exclude(test_group_id=-1)
+    matches = Match.objects.all().exclude(test_group_id=-1)
     
     # Debug: Print total matches before filtering
     print(f"DEBUG: Total matches before filtering: {matches.count()}")
@@ -38,169 +46,88 @@ def match_list(request):
         matches = matches.filter(opponent_difficulty=selected_difficulty)
         print(f"DEBUG: Matches after filtering by '{selected_difficulty}': {matches.count()}")
     
-    # Group matches by test_group_id and create pivot structure
-    grouped_matches = defaultdict(dict[str,Match])
-    all_opponents = set()
-    difficulty_groups = defaultdict(list)  # race -> builds
-    
-    # Track win/loss counts for each opponent
-    opponent_stats = defaultdict(lambda: {'victories': 0, 'total_games': 0})
-    
-    for match in matches:
-        opponent_name = f"{match.opponent_race}-{match.opponent_build}"
-        all_opponents.add(opponent_name)
-        # Store both result and duration
-        grouped_matches[match.test_group_id][opponent_name] = match
-        if match.result in ['Victory', 'Defeat']:
-            opponent_stats[opponent_name]['total_games'] += 1
-            if match.result == 'Victory':
-                opponent_stats[opponent_name]['victories'] += 1
-        
-        # Build hierarchical structure for headers
-        difficulty_groups[match.opponent_race].append(match.opponent_build)
-    
-    # Sort and deduplicate builds within each race/difficulty group
-    for race in difficulty_groups:
-        difficulty_groups[race] = sorted(list(set(difficulty_groups[race])))
+    pivot = match_list_pivot(matches)
     
-    # Create ordered list of opponents for consistent column ordering
-    sorted_opponents = []
+    # Test groups newest first, opponents by race then build
+    table = pivot.arrange(sorted(pivot.rows, reverse=True), sorted(pivot.columns))
+    sorted_groups = table.row_keys
+    sorted_opponents = [f"{race}-{build}" for race, build in table.column_keys]
     
-    # Build header structure and opponent order
-    # When not filtering by difficulty, collapse all difficulties into one set of race-build columns
+    # One header per race spanning its builds, with win rates over every match against each opponent
+    opponent_totals = opponent_results(matches)
+    column_victories = [opponent_totals[opponent][0] for opponent in table.column_keys]
+    column_decided = [opponent_totals[opponent][1] for opponent in table.column_keys]
+    race_spans = table.column_spans(1)
+    race_victories = span_totals(column_victories, race_spans)
+    race_decided = span_totals(column_decided, race_spans)
     header_structure = []
-    
-    # All difficulties - collapse into unique race-build combinations
-    # Collect all unique race-build combinations across all difficulties
-    race_build_map = defaultdict(set)  # race -> set of builds
-    
-    for race in difficulty_groups:
-        for build in difficulty_groups[race]:
-            race_build_map[race].add(build)
-    
-    # Create sorted_opponents as just the unique race-build combinations
-    # We'll match based on the row's difficulty later
-    for race in sorted(race_build_map.keys()):
-        builds = sorted(list(race_build_map[race]))
-        for build in builds:
-            # Store as race-build (without difficulty)
-            sorted_opponents.append(f"{race}-{build}")
-    
-    # Build a single header structure with all races
-    for race in sorted(race_build_map.keys()):
-        builds = sorted(list(race_build_map[race]))
+    for (race,), start, stop in race_spans:
         header_structure.append({
             'name': race,
-            'span': len(builds),
-            'builds': builds
+            'span': stop - start,
+            'builds': [
+                f"{table.column_keys[column][1]} {_percentage(column_victories[column], column_decided[column]) or '-'}"
+                for column in range(start, stop)
+            ],
+            'win_rate': _percentage(race_victories[race,], race_decided[race,]) or "-",
         })
     
-    # Sort test groups for consistent display
-    sorted_groups = sorted(grouped_matches.keys(), reverse=True)
-    
     # Create the pivot table data
     max_group_id = max(sorted_groups) if sorted_groups else -1
+    # Computed when each group completed (see regressions), only looked up here
+    regression_reports = {
+        report['test_group_id']: report
+        for report in RegressionReport.objects.filter(test_group_id__in=sorted_groups)
+        .values('test_group_id', 'baseline_group_id', 'flagged', 'summary')
+    }
+    group_victories = table.row_totals('victories')
+    group_decided = table.row_totals('decided')
+    group_timed_duration = table.row_totals('timed_duration')
+    group_timed = table.row_totals('timed')
     pivot_data = []
-    for group_id in sorted_groups:
-        row = {'test_group_id': group_id, 'results': [], 'difficulty': None}
-        
-        # Determine difficulty for this test group (all matches in a group have same difficulty)
-        if not selected_difficulty:
-            # Get difficulty from first match in this group
-            for match in grouped_matches[group_id].values():
-                row['difficulty'] = match.opponent_difficulty
-                break
-        else:
-            row['difficulty'] = selected_difficulty
-        
-        # Calculate win percentage and average duration for this group
-        group_victories = 0
-        group_total_games = 0
-        group_total_duration = 0
-        group_games_with_duration = 0
+    for row_index, (group_id, cells) in enumerate(zip(sorted_groups, table.rows)):
+        row = {
+            'test_group_id': group_id,
+            'results': [],
+            'difficulty': selected_difficulty,
+            'regression': regression_reports.get(group_id),
+        }
         
-        for opponent in sorted_opponents:                
-            match_data = grouped_matches[group_id].get(opponent, None)
-            if not match_data:
+        for match in cells:
+            if match is None:
                 row['results'].append(None)
                 continue
-                
-            if group_id != max_group_id and match_data.result == 'Pending':
-                match_data.result = 'Aborted'
-
-            row['results'].append(match_data)
-            
-            # Count wins/losses for group percentage
-            result = match_data.result
-            duration = match_data.duration_in_game_time
             
-            if result in ['Victory', 'Defeat']:
-                group_total_games += 1
-                if result == 'Victory':
-                    group_victories += 1
-        
-            # Sum durations for average calculation
-            if duration is not None and duration > 0:
-                group_total_duration += duration
-                group_games_with_duration += 1
+            result = match.result
+            if group_id != max_group_id and result == 'Pending':
+                result = 'Aborted'
+            # All matches in a group have the same difficulty
+            if not row['difficulty']:
+                row['difficulty'] = match.opponent_difficulty
+            # Precompute what the template would otherwise branch on per cell
+            row['results'].append({
+                'id': match.id,
+                'result': result,
+                'css_class': RESULT_CSS_CLASSES.get(result, ''),
+                'duration_in_game_time': match.duration_in_game_time,
+                'duration_display': format_duration(match.duration_in_game_time),
+                'map_name': match.map_name,
+            })
         
         # Calculate group win percentage
-        if group_total_games > 0:
-            group_win_percentage = (group_victories / group_total_games) * 100
-            row['group_win_percentage'] = f"{group_win_percentage:.1f}%"
-        else:
-            row['group_win_percentage'] = "-"
+        row['group_win_percentage'] = _percentage(group_victories[row_index], group_decided[row_index], 1) or "-"
         
         # Calculate average game length
-        if group_games_with_duration > 0:
-            avg_duration = group_total_duration / group_games_with_duration
-            row['avg_duration'] = int(avg_duration)
-        else:
-            row['avg_duration'] = None
-        
-        pivot_data.append(row)
-    
-    # Calculate win percentages for each opponent column
-    win_percentages = []
-    for opponent in sorted_opponents:
-        stats = opponent_stats[opponent]
-        if stats['total_games'] > 0:
-            win_percentage = (stats['victories'] / stats['total_games']) * 100
-            win_percentages.append(f"{win_percentage:.1f}%")
-        else:
-            win_percentages.append("-")
-
-    # Calculate win rates by race within each difficulty
-    for race_group in header_structure:
-        race_name = race_group['name']
-        race_victories = 0
-        race_total_games = 0
-        
-        # All difficulties - aggregate across all difficulties for this race
-        for opponent_key in opponent_stats.keys():
-            # Match race at start and extract difficulty and build
-            if opponent_key.startswith(f"{race_name}-"):
-                stats = opponent_stats[opponent_key]
-                race_total_games += stats['total_games']
-                race_victories += stats['victories']
+        avg_duration = ratio(group_timed_duration[row_index], group_timed[row_index])
+        row['avg_duration'] = None if avg_duration is None else int(avg_duration)
+        row['avg_duration_display'] = format_duration(row['avg_duration'])
         
-        if race_total_games > 0:
-            race_win_percentage = (race_victories / race_total_games) * 100
-            race_group['win_rate'] = f"{race_win_percentage:.0f}%"
-        else:
-            race_group['win_rate'] = "-"
+        # Rows of finished groups don't change, so their rendered <tr> is cached under a
+        # version derived from everything the row displays (including the column layout)
+        if group_id != max_group_id:
+            row['cache_version'] = _row_version(sorted_opponents, row)
         
-        # Add win rates to individual builds
-        for i, build in enumerate(race_group['builds']):
-            stats = opponent_stats[f"{race_name}-{build}"]
-            build_total_games = stats['total_games']
-            build_victories = stats['victories']
-            
-            if build_total_games > 0:
-                build_win_percentage = (build_victories / build_total_games) * 100
-                race_group['builds'][i] = f"{build} {build_win_percentage:.0f}%"
-            else:
-                race_group['builds'][i] = f"{build} -"
+        pivot_data.append(row)
 
     return render(request, 'test_lab/match_list.html', {
         'pivot_data': pivot_data,
@@ -209,16 +136,37 @@ def match_list(request):
         'selected_difficulty': selected_difficulty
     })
 
-def get_next_test_group_id() -> int:
+RESULT_CSS_CLASSES = {
+    'Victory': 'victory',
+    'Defeat': 'defeat',
+    'Crash': 'crash',
+    'Pending': 'pending',
+}
+
+def _percentage(part: int, whole: int, digits: int = 0) -> str | None:
+    """part / whole formatted as a percentage, None when whole is 0."""
+    fraction = ratio(part, whole)
+    return None if fraction is None else f"{fraction * 100:.{digits}f}%"
+
+def _row_version(columns: list[str], row: dict) -> int:
+    """Checksum of the values a match_list row renders, used as its fragment cache version."""
+    cells = [
+        (cell['id'], cell['result'], cell['duration_in_game_time'], cell['map_name']) if cell else None
+        for cell in row['results']
+    ]
+    content = (columns, row['difficulty'], row['group_win_percentage'], row['avg_duration'], cells, row['regression'])
+    return zlib.crc32(repr(content).encode('utf-8'))
+
+async def get_next_test_group_id() -> int:
     """Get the next test group ID by incrementing the highest completed test group ID."""
-    result = Match.objects.using('sc2bot_test_lab_db_2').filter(
+    result = (await Match.objects.filter(
         end_timestamp__isnull=False
-    ).aggregate(Max('test_group_id'))['test_group_id__max']
+    ).aaggregate(Max('test_group_id')))['test_group_id__max']
     
     # If no completed matches exist, start at 0, otherwise increment by 1
     return 0 if result is None else result + 1
 
-def create_pending_match(test_group_id: int, race: str, build: str, difficulty: str) -> int:
+async def create_pending_match(test_group_id: int, race: str, build: str, difficulty: str) -> int:
     """Create a pending match entry and return the match ID."""
     match = Match(
         test_group_id=test_group_id,
@@ -229,16 +177,16 @@ def create_pending_match(test_group_id: int, race: str, build: str, difficulty:
         opponent_build=build.capitalize(),
         result="Pending"
     )
-    match.save(using='sc2bot_test_lab_db_2')
+    await match.asave()
     assert isinstance(match.id, int)
     return match.id
 
-def trigger_tests(request):
+async def trigger_tests(request):
     """Trigger the test suite by starting Docker containers directly."""
     if request.method == 'POST':
         try:
-            docker_compose_path = r'c:\Users\inter\Documents\sc_bot\bot'
-            logs_dir = r'C:\Users\inter\Documents\StarCraft II\Replays\Multiplayer\docker'
+            docker_compose_path = runner.DOCKER_COMPOSE_PATH
+            logs_dir = runner.MATCH_OUTPUT_DIR
             
             # Create logs directory if it doesn't exist
             os.makedirs(logs_dir, exist_ok=True)
@@ -253,24 +201,38 @@ def trigger_tests(request):
             difficulty = request.POST.get('difficulty', '')
             
             # Get next test group ID
-            test_group_id = get_next_test_group_id()
+            test_group_id = await get_next_test_group_id()
+            
+            # Record which bot build plays this group, for its regression report
+            await bot_versions.record_test_group(
+                test_group_id, docker_compose_path,
+                difficulty=difficulty or 'CheatInsane',
+                warm_pool_size=settings.RUNNER_WARM_POOL_SIZE,
+            )
             
             # Clean up containers first
-            cleanup_command = ['docker', 'container', 'prune', '-f']
-            subprocess.run(cleanup_command, cwd=docker_compose_path)
+            await runner.run('docker', 'container', 'prune', '-f', cwd=docker_compose_path)
             
             # Start all test jobs
-            processes = []
+            launched = 0
             for race in ('protoss', 'terran', 'zerg'):
                 for build in ['rush', 'timing', 'macro', 'power', 'air']:
                     # Create pending match entry and get match ID
-                    match_id = create_pending_match(test_group_id, race, build, difficulty)
+                    match_id = await create_pending_match(test_group_id, race, build, difficulty)
+                    await match_runs.queue_match(match_id)
                     
                     # Create log file path
                     log_file = os.path.join(logs_dir, f"{match_id}_{race}_{build}.log")
                     
+                    if warm_pool.enabled():
+                        # The next free warm worker picks the match up
+                        await warm_pool.submit_match(match_id, race, build, difficulty, log_file)
+                        launched += 1
+                        continue
+                    
                     # Build Docker compose command with environment variables
                     command = ['docker', 'compose', 'run', '--rm', 
+                              '--name', match_runs.container_name(match_id),
                               '-e', f'RACE={race}', 
                               '-e', f'BUILD={build}',
                               '-e', f'MATCH_ID={match_id}']
@@ -281,12 +243,15 @@ def trigger_tests(request):
                     command.append('bot')
                     
                     # Start the process with output redirected to log file
-                    with open(log_file, 'w') as log:
-                        process = subprocess.Popen(command, cwd=docker_compose_path, stdout=log, stderr=log)
-                    processes.append((process, f"{race}_{build}"))
+                    await match_runs.launch_match(match_id, *command, cwd=docker_compose_path, log_path=log_file)
+                    launched += 1
             
             difficulty_msg = f" with difficulty {difficulty}" if difficulty else ""
-            messages.success(request, f'Test suite started successfully{difficulty_msg}! {len(processes)} tests running. Logs in: {logs_dir}')
+            if warm_pool.enabled():
+                running_msg = f"{launched} tests queued for {settings.RUNNER_WARM_POOL_SIZE} warm workers"
+            else:
+                running_msg = f"{launched} tests running"
+            messages.success(request, f'Test suite started successfully{difficulty_msg}! {running_msg}. Logs in: {logs_dir}')
             
         except Exception as e:
             messages.error(request, f'Failed to start test suite: {str(e)}')
@@ -298,39 +263,272 @@ def trigger_tests(request):
     else:
         return redirect('match_list')
 
-def serve_replay(request, match_id):
+def _earlier_groups(test_group_id: int):
+    """Groups that can be picked as the baseline of a test group, latest first."""
+    return (Match.objects.filter(test_group_id__lt=test_group_id,
+                                 opponent_difficulty=regressions.group_difficulty(test_group_id))
+            .exclude(test_group_id=-1).order_by('-test_group_id')
+            .values_list('test_group_id', flat=True).distinct())
+
+def regression_report(request, test_group_id):
+    """Stored comparison of a test group with its baseline, plus the bot versions of both."""
+    if request.method == 'POST':
+        action = request.POST.get('action')
+        if action == 'toggle_baseline':
+            started = Match.objects.filter(test_group_id=test_group_id).aggregate(Min('start_timestamp'))
+            if started['start_timestamp__min'] is None:
+                raise Http404(f"No test group {test_group_id}")
+            # Groups from before versions were recorded get a row without version metadata
+            test_group, _ = TestGroup.objects.get_or_create(
+                id=test_group_id, defaults={'created_at': started['start_timestamp__min']})
+            test_group.is_baseline = not test_group.is_baseline
+            test_group.save(update_fields=['is_baseline'])
+            if test_group.is_baseline:
+                messages.success(request, f"Later groups at this difficulty are compared against group {test_group_id}.")
+            else:
+                messages.success(request, f"Group {test_group_id} is no longer a baseline.")
+        elif action == 'recompute':
+            baseline_group_id = request.POST.get('baseline_group_id', '')
+            # The form only offers earlier groups, anything else is a hand-made or stale request
+            if baseline_group_id and not (
+                    baseline_group_id.isdecimal()
+                    and _earlier_groups(test_group_id).filter(test_group_id=int(baseline_group_id)).exists()):
+                messages.error(request, f"Group {baseline_group_id} isn't an earlier group at this difficulty.")
+            elif regressions.compute_report(test_group_id, int(baseline_group_id) if baseline_group_id else None) is None:
+                messages.error(request, f"There is no earlier group at this difficulty to compare group {test_group_id} with.")
+        return redirect('regression_report', test_group_id=test_group_id)
+
+    report = RegressionReport.objects.filter(test_group_id=test_group_id).first()
+    if report is None and not Match.objects.filter(test_group_id=test_group_id).exists():
+        raise Http404(f"No test group {test_group_id}")
+
+    group_ids = [test_group_id] + ([report.baseline_group_id] if report else [])
+    versions = TestGroup.objects.in_bulk(group_ids)
+
+    return render(request, 'test_lab/regression_report.html', {
+        'test_group_id': test_group_id,
+        'report': report,
+        'details': report.details if report else None,
+        'group_version': versions.get(test_group_id),
+        'baseline_version': versions.get(report.baseline_group_id) if report else None,
+        'earlier_groups': _earlier_groups(test_group_id),
+        'is_complete': regressions.is_complete(test_group_id),
+    })
+
+async def serve_replay(request, match_id):
     """Open replay files with StarCraft 2 locally."""
-    replay_dir = r'C:\Users\inter\Documents\StarCraft II\Replays\Multiplayer\docker'
-    
     # Find replay file matching the match_id pattern
-    replay_pattern = os.path.join(replay_dir, f"{match_id}_*.SC2Replay")
-    replay_files = glob.glob(replay_pattern)
+    replay_pattern = os.path.join(runner.MATCH_OUTPUT_DIR, f"{match_id}_*.SC2Replay")
+    replay_files = await asyncio.to_thread(glob.glob, replay_pattern)
     
     if not replay_files:
         raise Http404("Replay file not found")
     
     file_path = replay_files[0]  # Take the first matching file
 
-    subprocess.Popen([r"C:\Program Files (x86)\StarCraft II\Support\SC2Switcher.exe", file_path])
-    from django.http import HttpResponse
+    await runner.launch(runner.SC2_SWITCHER_PATH, file_path)
     return HttpResponse(status=204)
 
-def serve_log(request, match_id):
-    """Serve log file for viewing."""
-    from django.http import FileResponse
-    replay_dir = r'C:\Users\inter\Documents\StarCraft II\Replays\Multiplayer\docker'
+LOG_CHUNK_BYTES = 64 * 1024
+
+async def _find_log_file(match_id: int) -> str | None:
+    """Path of a match's log file, or None if there isn't one."""
+    # Logs indexed for search already know their match, which saves listing the directory
+    name = await LogFile.objects.filter(match_id=match_id).values_list('name', flat=True).afirst()
+    if name:
+        path = os.path.join(runner.MATCH_OUTPUT_DIR, name)
+        if await asyncio.to_thread(os.path.isfile, path):
+            return path
     
     # Find log file matching the match_id pattern
-    log_pattern = os.path.join(replay_dir, f"{match_id}*.log")
-    log_files = glob.glob(log_pattern)
-    
-    if not log_files:
+    log_pattern = os.path.join(runner.MATCH_OUTPUT_DIR, f"{match_id}*.log")
+    log_files = await asyncio.to_thread(glob.glob, log_pattern)
+    return log_files[0] if log_files else None  # Take the first matching file
+
+async def _stream_file(log, length: int, chunk_size: int = LOG_CHUNK_BYTES):
+    """Yield the next `length` bytes of an open file without blocking the event loop, closing it at the end.
+
+    Bytes appended while streaming (the bot may still be writing) aren't sent, so the body matches Content-Length.
+    """
+    try:
+        while length > 0:
+            chunk = await asyncio.to_thread(log.read, min(chunk_size, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        log.close()
+
+def _read_file(log, length: int, chunk_size: int = LOG_CHUNK_BYTES):
+    """_stream_file for WSGI, which consumes an async iterator whole before sending any of it."""
+    try:
+        while length > 0:
+            chunk = log.read(min(chunk_size, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        log.close()
+
+async def serve_log(request, match_id):
+    """Serve log file for viewing."""
+    file_path = await _find_log_file(match_id)
+    if file_path is None:
         raise Http404("Log file not found")
     
-    file_path = log_files[0]  # Take the first matching file
-    
-    return FileResponse(open(file_path, 'rb'), content_type='text/plain')
+    log = await asyncio.to_thread(open, file_path, 'rb')
+    size = os.fstat(log.fileno()).st_size
+    
+    # Search results link straight to the matching line
+    offset = min(max(_int_param(request, 'offset') or 0, 0), size)
+    if offset:
+        log.seek(offset)
+    
+    # Under WSGI the response is sent from a worker thread anyway, and a sync iterator streams it
+    # chunk by chunk there instead of being read into memory first
+    stream = _stream_file if settings.RUNNING_UNDER_ASGI else _read_file
+    response = StreamingHttpResponse(stream(log, size - offset), content_type='text/plain')
+    response['Content-Length'] = size - offset
+    response['Content-Disposition'] = content_disposition_header(False, os.path.basename(file_path))
+    return response
+
+TIMELINE_PAGE_SIZE = 500
+TIMELINE_MAX_PAGE_SIZE = 2000
+
+@analytics_view
+def match_timeline(request, match_id):
+    """Page showing a single match's event stream. Events are fetched in windows from match_events."""
+    match = Match.objects.filter(id=match_id).first()
+    if match is None:
+        raise Http404("Match not found")
+
+    event_types = EventType.objects.order_by('name').values_list('name', flat=True)
+    return render(request, 'test_lab/match_timeline.html', {
+        'match': match,
+        'event_types': list(event_types),
+        'page_size': TIMELINE_PAGE_SIZE,
+    })
+
+@analytics_view
+def match_events(request, match_id):
+    """JSON page of a match's events ordered by (game_timestamp, id).
+
+    Uses keyset paging: pass the last row's after_ts/after_id to get the next page.
+    start/end limit the game_timestamp window and type (repeatable) filters by event type name.
+    """
+    events_archived = Match.objects.filter(id=match_id).values_list('events_archived', flat=True).first()
+    if events_archived is None:
+        raise Http404("Match not found")
+
+    # Archived matches are read from cold storage without restoring them
+    event_model = MatchEventArchive if events_archived else MatchEvent
+    events = event_model.objects.filter(match_id=match_id)
+
+    type_names = request.GET.getlist('type')
+    if type_names:
+        events = events.filter(event_type_id__in=[event_names.event_types.id_for(name, create=False) for name in type_names])
+
+    start = _float_param(request, 'start')
+    end = _float_param(request, 'end')
+    if start is not None:
+        events = events.filter(game_timestamp__gte=start)
+    if end is not None:
+        events = events.filter(game_timestamp__lte=end)
+
+    after_ts = _float_param(request, 'after_ts')
+    after_id = _int_param(request, 'after_id')
+    if after_ts is not None and after_id is not None:
+        events = events.filter(Q(game_timestamp__gt=after_ts) | Q(game_timestamp=after_ts, id__gt=after_id))
 
+    limit = min(max(_int_param(request, 'limit') or TIMELINE_PAGE_SIZE, 1), TIMELINE_MAX_PAGE_SIZE)
+    # Fetch one extra row to know whether there is another page
+    rows = list(
+        events.order_by('game_timestamp', 'id')
+        .values_list('id', 'game_timestamp', 'event_type_id', 'label_id')[:limit + 1]
+    )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    type_names_by_id = event_names.event_types.names_for(type_id for _, _, type_id, _ in rows)
+    label_names_by_id = event_names.event_labels.names_for(label_id for _, _, _, label_id in rows)
+    next_cursor = None
+    if has_more:
+        next_cursor = {'after_ts': rows[-1][1], 'after_id': rows[-1][0]}
+
+    return JsonResponse({
+        'events': [
+            [event_id, game_timestamp, type_names_by_id[type_id], label_names_by_id[label_id]]
+            for event_id, game_timestamp, type_id, label_id in rows
+        ],
+        'next': next_cursor,
+    })
+
+@analytics_view
+def search(request):
+    """Full-text search across match event messages and indexed log lines."""
+    query = request.GET.get('q', '').strip()
+    include_logs = request.GET.get('logs', '1') == '1'
+    results = full_text_search(query, include_logs=include_logs) if query else []
+    
+    return render(request, 'test_lab/search.html', {
+        'query': query,
+        'include_logs': include_logs,
+        'results': results,
+    })
+
+def trends(request):
+    """Page charting rolling win rate and game length per opponent or map across test groups."""
+    return render(request, 'test_lab/trends.html', {
+        'selected_difficulty': request.GET.get('difficulty', ''),
+        'dimension': request.GET.get('dimension', 'opponent'),
+        'difficulties': Match.Difficulty.values,
+        'default_groups': DEFAULT_GROUPS,
+        'default_window': DEFAULT_WINDOW,
+        'max_window': MAX_WINDOW,
+    })
+
+@analytics_view
+def trend_data(request):
+    """JSON of downsampled rolling trends, see trends.trend_series."""
+    dimension = 'map' if request.GET.get('dimension') == 'map' else 'opponent'
+    return JsonResponse(trend_series(
+        dimension=dimension,
+        groups=_int_param(request, 'groups') or DEFAULT_GROUPS,
+        points=_int_param(request, 'points') or DEFAULT_POINTS,
+        window=_int_param(request, 'window') or DEFAULT_WINDOW,
+        difficulty=request.GET.get('difficulty', ''),
+    ))
+
+def db_metrics(request):
+    """JSON of this process's database connection counters, see db_metrics.ConnectionMetricsMixin."""
+    return JsonResponse({
+        alias: {
+            'conn_max_age': connections.settings[alias].get('CONN_MAX_AGE', 0),
+            'conn_health_checks': connections.settings[alias].get('CONN_HEALTH_CHECKS', False),
+            **stats,
+        }
+        for alias, stats in connection_metrics.snapshot().items()
+    })
+
+def metrics(request):
+    """Runner throughput, match resource use and database connection counters for Prometheus to scrape."""
+    return HttpResponse(render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+THROUGHPUT_WINDOWS = [6, 24, 72, 168]
+
+def throughput(request):
+    """Dashboard of suite throughput, lifecycle latencies, failure rate and container resource use."""
+    hours = _int_param(request, 'hours')
+    if hours not in THROUGHPUT_WINDOWS:
+        hours = 24
+    return render(request, 'test_lab/throughput.html', {
+        'windows': THROUGHPUT_WINDOWS,
+        **throughput_summary(hours),
+    })
+
+@analytics_view
 def map_breakdown(request):
     """View to display match data grouped by map in a pivot table."""
     # Define difficulty order to match the filter dropdown
@@ -342,194 +540,80 @@ def map_breakdown(request):
     # Get difficulty filter from request
     selected_difficulty = request.GET.get('difficulty', '')
     
-    matches = Match.objects.using('sc2bot_test_lab_db_2').all().exclude(test_group_id=-1)
+    # Matches without a valid map name yet are skipped
+    matches = Match.objects.all().exclude(test_group_id=-1).exclude(map_name="TBD")
     
     # Apply difficulty filter if selected
     if selected_difficulty:
         matches = matches.filter(opponent_difficulty=selected_difficulty)
     
-    # Group matches by map and create pivot structure
-    grouped_matches = defaultdict(lambda: defaultdict(list))  # map -> opponent -> [matches]
-    all_opponents = set()
-    difficulty_groups = defaultdict(lambda: defaultdict(list))  # difficulty -> race -> builds
-    
-    # Track win/loss counts for each map/opponent combination
-    map_opponent_stats = defaultdict(lambda: {'victories': 0, 'total_games': 0, 'total_duration': 0, 'games_with_duration': 0})
-    
-    for match in matches:
-        if match.map_name == "TBD":
-            continue  # Skip matches without a valid map name
-        opponent_name = f"{match.opponent_race}-{match.opponent_difficulty}-{match.opponent_build}"
-        all_opponents.add(opponent_name)
-        
-        # Group by map
-        grouped_matches[match.map_name][opponent_name].append(match)
-        
-        # Track stats for this map/opponent combination
-        key = (match.map_name, opponent_name)
-        if match.result in ['Victory', 'Defeat']:
-            map_opponent_stats[key]['total_games'] += 1
-            if match.result == 'Victory':
-                map_opponent_stats[key]['victories'] += 1
-        
-        if match.duration_in_game_time is not None and match.duration_in_game_time > 0:
-            map_opponent_stats[key]['total_duration'] += match.duration_in_game_time
-            map_opponent_stats[key]['games_with_duration'] += 1
-        
-        # Build hierarchical structure for headers
-        difficulty_groups[match.opponent_difficulty][match.opponent_race].append(match.opponent_build)
-    
-    # Sort and deduplicate builds within each race/difficulty group
-    for difficulty in difficulty_groups:
-        for race in difficulty_groups[difficulty]:
-            difficulty_groups[difficulty][race] = sorted(list(set(difficulty_groups[difficulty][race])))
-    
-    # Create ordered list of opponents for consistent column ordering
-    sorted_opponents = []
-    sorted_difficulties = sorted(difficulty_groups.keys(), key=lambda x: difficulty_order.index(x) if x in difficulty_order else 999)
-    
-    # Build header structure and opponent order
+    pivot = map_breakdown_pivot(matches)
+    
+    # Maps alphabetically, opponents by difficulty (in filter order), race and build
+    def opponent_order(opponent):
+        difficulty, race, build = opponent
+        return (difficulty_order.index(difficulty) if difficulty in difficulty_order else 999, race, build)
+    table = pivot.arrange(sorted(pivot.rows), sorted(pivot.columns, key=opponent_order))
+    sorted_opponents = [f"{race}-{difficulty}-{build}" for difficulty, race, build in table.column_keys]
+    
+    # Difficulty headers spanning race headers spanning builds, each with its win rate
+    column_victories = table.column_totals('victories')
+    column_decided = table.column_totals('decided')
+    race_spans = table.column_spans(2)
+    race_victories = span_totals(column_victories, race_spans)
+    race_decided = span_totals(column_decided, race_spans)
     header_structure = []
-    for difficulty in sorted_difficulties:
-        races = sorted(difficulty_groups[difficulty].keys())
-        difficulty_span = sum(len(difficulty_groups[difficulty][race]) for race in races)
-        
+    for (difficulty,), difficulty_start, difficulty_stop in table.column_spans(1):
         race_headers = []
-        for race in races:
-            builds = difficulty_groups[difficulty][race]
-            for build in builds:
-                opponent_name = f"{race}-{difficulty}-{build}"
-                sorted_opponents.append(opponent_name)
-            
+        for (_, race), start, stop in race_spans:
+            if not difficulty_start <= start < difficulty_stop:
+                continue
             race_headers.append({
                 'name': race,
-                'span': len(builds),
-                'builds': builds
+                'span': stop - start,
+                'builds': [
+                    f"{table.column_keys[column][2]} {_percentage(column_victories[column], column_decided[column]) or '-'}"
+                    for column in range(start, stop)
+                ],
+                'win_rate': _percentage(race_victories[difficulty, race], race_decided[difficulty, race]) or "-",
             })
-        
         header_structure.append({
             'difficulty': difficulty,
-            'span': difficulty_span,
-            'races': race_headers
+            'span': difficulty_stop - difficulty_start,
+            'races': race_headers,
+            'win_rate': _percentage(sum(column_victories[difficulty_start:difficulty_stop]),
+                                    sum(column_decided[difficulty_start:difficulty_stop])) or "-",
         })
     
-    # Sort maps alphabetically
-    sorted_maps = sorted(grouped_matches.keys())
-    
     # Create the pivot table data
+    map_victories = table.row_totals('victories')
+    map_decided = table.row_totals('decided')
+    map_total_duration = table.row_totals('total_duration')
+    map_games_with_duration = table.row_totals('games_with_duration')
     pivot_data = []
-    for map_name in sorted_maps:
-        row = {'map_name': map_name, 'results': [], 'overall_win_rate': None, 'overall_avg_duration': None, 'overall_wins': 0, 'overall_games': 0}
-        map_total_victories = 0
-        map_total_games = 0
-        map_total_duration = 0
-        map_games_with_duration = 0
-        for opponent in sorted_opponents:
-            key = (map_name, opponent)
-            stats = map_opponent_stats[key]
-            
-            # Calculate win percentage for this map/opponent combo
-            if stats['total_games'] > 0:
-                win_percentage = (stats['victories'] / stats['total_games']) * 100
-                win_rate_str = f"{win_percentage:.0f}%"
-            else:
-                win_rate_str = None
-            
-            # Calculate average duration for this map/opponent combo
-            if stats['games_with_duration'] > 0:
-                avg_duration = int(stats['total_duration'] / stats['games_with_duration'])
-            else:
-                avg_duration = None
-            
-            cell_data = {
-                'win_rate': win_rate_str,
-                'avg_duration': avg_duration,
-                'wins': stats['victories'],
-                'games_played': stats['total_games']
-            }
-            
-            row['results'].append(cell_data)
-            map_total_victories += stats['victories']
-            map_total_games += stats['total_games']
-            map_total_duration += stats['total_duration']
-            map_games_with_duration += stats['games_with_duration']
-        
-        if map_total_games > 0:
-            overall_win_percentage = (map_total_victories / map_total_games) * 100
-            row['overall_win_rate'] = f"{overall_win_percentage:.0f}%"
-            row['overall_wins'] = map_total_victories
-            row['overall_games'] = map_total_games
-        else:
-            row['overall_win_rate'] = None
-            row['overall_wins'] = 0
-            row['overall_games'] = 0
-        
-        if map_games_with_duration > 0:
-            row['overall_avg_duration'] = int(map_total_duration / map_games_with_duration)
-        else:
-            row['overall_avg_duration'] = None
-
-        pivot_data.append(row)
-    
-    # Calculate win rates for header structure (same as match_list)
-    opponent_stats = defaultdict(lambda: {'victories': 0, 'total_games': 0})
-    for opponent in sorted_opponents:
-        for map_name in sorted_maps:
-            key = (map_name, opponent)
-            stats = map_opponent_stats[key]
-            opponent_stats[opponent]['total_games'] += stats['total_games']
-            opponent_stats[opponent]['victories'] += stats['victories']
-    
-    # Calculate win rates by race within each difficulty
-    for difficulty_group in header_structure:
-        difficulty_name = difficulty_group['difficulty']
-        for race_group in difficulty_group['races']:
-            race_name = race_group['name']
-            race_victories = 0
-            race_total_games = 0
-            
-            for opponent in sorted_opponents:
-                if opponent.startswith(f"{race_name}-{difficulty_name}-"):
-                    stats = opponent_stats[opponent]
-                    race_total_games += stats['total_games']
-                    race_victories += stats['victories']
-            
-            if race_total_games > 0:
-                race_win_percentage = (race_victories / race_total_games) * 100
-                race_group['win_rate'] = f"{race_win_percentage:.0f}%"
-            else:
-                race_group['win_rate'] = "-"
-            
-            # Add win rates to individual builds
-            for i, build in enumerate(race_group['builds']):
-                opponent_name = f"{race_name}-{difficulty_name}-{build}"
-                stats = opponent_stats[opponent_name]
-                if stats['total_games'] > 0:
-                    build_win_percentage = (stats['victories'] / stats['total_games']) * 100
-                    race_group['builds'][i] = f"{build} {build_win_percentage:.0f}%"
-                else:
-                    race_group['builds'][i] = f"{build} -"
-    
-    # Calculate win rates by difficulty
-    difficulty_win_rates = {}
-    for difficulty in sorted_difficulties:
-        difficulty_victories = 0
-        difficulty_total_games = 0
-        for opponent in sorted_opponents:
-            if f"-{difficulty}-" in opponent:
-                stats = opponent_stats[opponent]
-                difficulty_total_games += stats['total_games']
-                difficulty_victories += stats['victories']
+    for row_index, (map_name, cells) in enumerate(zip(table.row_keys, table.rows)):
+        results = []
+        for cell in cells:
+            if cell is None:
+                results.append({'win_rate': None, 'avg_duration': None, 'wins': 0, 'games_played': 0})
+                continue
+            avg_duration = ratio(cell.total_duration, cell.games_with_duration)
+            results.append({
+                'win_rate': _percentage(cell.victories, cell.decided),
+                'avg_duration': None if avg_duration is None else int(avg_duration),
+                'wins': cell.victories,
+                'games_played': cell.decided,
+            })
         
-        if difficulty_total_games > 0:
-            difficulty_win_percentage = (difficulty_victories / difficulty_total_games) * 100
-            difficulty_win_rates[difficulty] = f"{difficulty_win_percentage:.0f}%"
-        else:
-            difficulty_win_rates[difficulty] = "-"
-    
-    # Add difficulty win rates to header structure
-    for difficulty_group in header_structure:
-        difficulty_group['win_rate'] = difficulty_win_rates.get(difficulty_group['difficulty'], "-")
+        overall_avg_duration = ratio(map_total_duration[row_index], map_games_with_duration[row_index])
+        pivot_data.append({
+            'map_name': map_name,
+            'results': results,
+            'overall_win_rate': _percentage(map_victories[row_index], map_decided[row_index]),
+            'overall_avg_duration': None if overall_avg_duration is None else int(overall_avg_duration),
+            'overall_wins': map_victories[row_index],
+            'overall_games': map_decided[row_index],
+        })
     
     return render(request, 'test_lab/map_breakdown.html', {
         'pivot_data': pivot_data,
@@ -539,91 +623,66 @@ def map_breakdown(request):
     })
 
 
+@analytics_view
 def building_timing(request):
     """View to display earliest building construction times per test group."""
-    from collections import defaultdict
-
-    # Get all building events with their match's test_group_id
-    # Using Django ORM: Get minimum game_timestamp for each (test_group_id, building_type) combination
-    building_events = (
-        MatchEvent.objects
-        .using('sc2bot_test_lab_db_2')
-        .filter(type='Building')
-        .values('match__test_group_id', 'match_id', 'message', 'match__result')
-        .annotate(earliest_time=Min('game_timestamp'))
-        .order_by('match__test_group_id', 'message')
-    )
-    
-    # Organize data into a pivot structure
-    # {test_group_id: {building_type: {min, max, avg}}}
-    grouped_data = defaultdict(dict[str, dict[str, any]])
-    all_building_types = set()
-    
-    for event in building_events:
-        test_group_id = event['match__test_group_id']
-        building_type = event['message']
-        earliest_time = event['earliest_time']
-        result = event['match__result'][0]
-        
-        if building_type not in grouped_data[test_group_id]:
-            grouped_data[test_group_id][building_type] = {
-                "min": earliest_time,
-                "max": earliest_time,
-                "avg": earliest_time,
-                "count": 1,
-                "min_result": result,
-                "max_result": result,
-            }
-            all_building_types.add(building_type)
-        else:
-            current = grouped_data[test_group_id][building_type]
-            if earliest_time < current["min"]:
-                current["min"] = earliest_time
-                current["min_result"] = result
-            if earliest_time > current["max"]:
-                current["max"] = earliest_time
-                current["max_result"] = result
-            # For average, we will need to calculate it later
-            current["avg"] += earliest_time  # Temporarily sum for average calculation
-            current["count"] = current["count"] + 1
-    for test_group_id in grouped_data:
-        for building_type in grouped_data[test_group_id]:
-            current = grouped_data[test_group_id][building_type]
-            current["avg"] = current["avg"] / current["count"]
-            del current["count"]  # Remove count as it's no longer needed
-
-    # Sort building types alphabetically for consistent column order
-    building_types_list = list(all_building_types)
-    
-    # Sort test groups in descending order (newest first)
-    sorted_groups = sorted(grouped_data.keys(), reverse=True)
+    # Get filters from request
+    selected_difficulty = request.GET.get('difficulty', '')
+    selected_race = request.GET.get('race', '')
+    selected_build = request.GET.get('build', '')
+    group_min = _int_param(request, 'group_min')
+    group_max = _int_param(request, 'group_max')
+
+    # First completion time of each building per match, precomputed in match_building_timing
+    building_timings = MatchBuildingTiming.objects.all()
+    if selected_difficulty:
+        building_timings = building_timings.filter(match__opponent_difficulty=selected_difficulty)
+    if selected_race:
+        building_timings = building_timings.filter(match__opponent_race=selected_race)
+    if selected_build:
+        building_timings = building_timings.filter(match__opponent_build=selected_build)
+    if group_min is not None:
+        building_timings = building_timings.filter(test_group_id__gte=group_min)
+    if group_max is not None:
+        building_timings = building_timings.filter(test_group_id__lte=group_max)
 
-    # Calculate average timing for each building type across all test groups
+    pivot = building_timing_pivot(building_timings)
+
+    # Test groups newest first, building types in the order they were first seen until sorted below
+    table = pivot.arrange(sorted(pivot.rows, reverse=True), list(pivot.columns))
+    building_names = event_names.event_labels.names_for(table.column_keys)
+
+    # Average timing of each building type across the test groups that built it
     avg_timings = []
-    for building_type in building_types_list:
-        timings: List[float | None] = [grouped_data[gid].get(building_type).get("avg") for gid in sorted_groups if grouped_data[gid].get(building_type) is not None] # type: ignore
-        if timings:
-            avg_timings.append(sum(timings) / len(timings)) # type: ignore
-        else:
-            avg_timings.append(None)
+    for column in zip(*table.rows):
+        group_averages = [timing.total / timing.count for timing in column if timing is not None]
+        avg_timings.append(sum(group_averages) / len(group_averages))
 
     # Sort building types by average timing
-    sorted_building_types, avg_timings = zip(*sorted(zip(building_types_list, avg_timings), key=lambda x: x[1]))
-    
-    # Create a dict for quick lookup of average timings
-    avg_timing_dict = dict(zip(sorted_building_types, avg_timings))
+    column_order = sorted(range(len(table.column_keys)), key=lambda column: avg_timings[column])
+    sorted_building_types = [building_names[table.column_keys[column]] for column in column_order]
+    avg_timings = [avg_timings[column] for column in column_order]
     
     # Create pivot table data with performance class
     pivot_data = []
-    for group_id in sorted_groups:
+    for group_id, cells in zip(table.row_keys, table.rows):
         row = {
             'test_group_id': group_id,
             'timings': []
         }
-        for building_type in sorted_building_types:
-            timing = grouped_data[group_id].get(building_type)
-            if timing and avg_timing_dict.get(building_type):
-                avg = avg_timing_dict[building_type]
+        for column, avg in zip(column_order, avg_timings):
+            cell = cells[column]
+            if cell is None:
+                row['timings'].append(None)
+                continue
+            timing = {
+                'min': cell.min,
+                'max': cell.max,
+                'avg': cell.total / cell.count,
+                'min_result': cell.min_result,
+                'max_result': cell.max_result,
+            }
+            if avg:
                 diff = timing['avg'] - avg
                 
                 # Determine performance class
@@ -652,4 +711,28 @@ def building_timing(request):
         'pivot_data': pivot_data,
         'building_types': sorted_building_types,
         'avg_timings': avg_timings,
+        'difficulties': Match.Difficulty.values,
+        'races': Match.Race.values,
+        'builds': Match.Build.values,
+        'selected_difficulty': selected_difficulty,
+        'selected_race': selected_race,
+        'selected_build': selected_build,
+        'group_min': group_min,
+        'group_max': group_max,
     })
+
+
+def _int_param(request, name: str) -> int | None:
+    """Read an optional integer GET parameter, ignoring blank or malformed values."""
+    try:
+        return int(request.GET.get(name, ''))
+    except ValueError:
+        return None
+
+
+def _float_param(request, name: str) -> float | None:
+    """Read an optional float GET parameter, ignoring blank or malformed values."""
+    try:
+        return float(request.GET.get(name, ''))
+    except ValueError:
+        return None
@@ -0,0 +1,239 @@
+"""Optional pool of long-lived bot workers that play queued matches one after another.
+
+By default every match is its own `docker compose run --rm ... bot`, so each game
+pays for creating a container and booting the SC2 client. With
+RUNNER_WARM_POOL_SIZE set, trigger_tests queues matches here instead. That many
+workers are started once, and each takes the next queued match whenever it is free.
+
+A worker is any process that speaks this line-based JSON protocol:
+
+- worker -> pool (stdout): {"event": "ready"} once it can take a match, and again after resetting from each game
+- pool -> worker (stdin): {"match_id": 12, "race": "zerg", "build": "rush", "difficulty": "Hard"}
+- worker -> pool (stdout): {"event": "game_started", "match_id": 12}
+- worker -> pool (stdout): {"event": "finished", "match_id": 12, "status": 0}
+
+Everything else a worker prints goes to the current match's log file. That covers
+stdout lines that aren't events and all of stderr. Logs are therefore still written
+as <match_id>_<race>_<build>.log. test_lab.stub_worker implements the protocol
+without StarCraft.
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import Counter
+
+from django.conf import settings
+
+from . import runner
+from .match_runs import PoolRecorder
+
+BOOT_TIMEOUT = 5 * 60
+GAME_TIMEOUT = 2 * 60 * 60
+RESTART_DELAY = 5
+# Longest stdout line read from a worker
+LINE_LIMIT = 1024 * 1024
+
+logger = logging.getLogger(__name__)
+
+
+class WorkerExited(Exception):
+    """The worker process ended while the pool was waiting on it."""
+
+
+class PoolWorker:
+    """One long-lived worker process and the matches it plays, restarted if it dies."""
+
+    def __init__(self, pool: 'WarmPool', number: int):
+        self.pool = pool
+        self.name = f"sc2-worker-{number}"
+        # Only the docker command names its container, a plain process has none to sample
+        self.container = self.name if any('{name}' in arg for arg in pool.command) else None
+        self.state = 'stopped'
+        self.process: asyncio.subprocess.Process | None = None
+        self._stderr_copier: asyncio.Task | None = None
+        self._log = None
+        # Boot time not yet attributed to a match
+        self._boot_seconds: float | None = None
+
+    def _open_log(self, path: str, mode: str = 'w'):
+        if self._log is not None:
+            self._log.close()
+        self._log = open(path, mode, encoding='utf-8')
+
+    def _write_log(self, line: bytes):
+        if self._log is not None:
+            self._log.write(line.decode('utf-8', errors='replace'))
+            # Flushed per line so serve_log can follow a running match
+            self._log.flush()
+
+    async def _copy_stderr(self):
+        async for line in self.process.stderr:
+            self._write_log(line)
+
+    async def _next_event(self) -> dict:
+        while True:
+            line = await self.process.stdout.readline()
+            if not line:
+                raise WorkerExited(f"{self.name} exited with code {await self.process.wait()}")
+            try:
+                event = json.loads(line)
+            except ValueError:
+                event = None
+            if isinstance(event, dict) and 'event' in event:
+                return event
+            self._write_log(line)
+
+    async def _wait_until_ready(self):
+        async with asyncio.timeout(BOOT_TIMEOUT):
+            while (await self._next_event())['event'] != 'ready':
+                pass
+
+    async def _start(self):
+        self.state = 'starting'
+        self._open_log(os.path.join(self.pool.log_dir, f"{self.name}.log"), mode='a')
+        started = time.monotonic()
+        self.process = await asyncio.create_subprocess_exec(
+            *[arg.replace('{name}', self.name) for arg in self.pool.command],
+            cwd=self.pool.cwd,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            limit=LINE_LIMIT,
+        )
+        self._stderr_copier = asyncio.create_task(self._copy_stderr())
+        await self._wait_until_ready()
+        self._boot_seconds = time.monotonic() - started
+
+    async def _stop(self):
+        self.state = 'stopped'
+        if self.process is not None and self.process.returncode is None:
+            self.process.kill()
+            await self.process.wait()
+        if self._stderr_copier is not None:
+            self._stderr_copier.cancel()
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+
+    async def _play(self, assignment: dict):
+        match_id = assignment['match_id']
+        recorder = self.pool.recorder
+        self.state = 'busy'
+        self._open_log(assignment['log_path'])
+        await recorder.assignment_started(match_id, self.name, self.container, self._boot_seconds)
+        self._boot_seconds = None
+
+        try:
+            message = {key: assignment[key] for key in ('match_id', 'race', 'build', 'difficulty')}
+            self.process.stdin.write(json.dumps(message).encode('utf-8') + b'\n')
+            await self.process.stdin.drain()
+
+            async with asyncio.timeout(GAME_TIMEOUT):
+                while True:
+                    event = await self._next_event()
+                    if event.get('match_id') != match_id:
+                        continue
+                    if event['event'] == 'game_started':
+                        await recorder.game_started(match_id)
+                    elif event['event'] == 'finished':
+                        break
+        except BaseException:
+            # The worker is restarted, so this match is over either way
+            await recorder.assignment_finished(match_id, self.process.returncode)
+            raise
+        await recorder.assignment_finished(match_id, event.get('status', 0))
+
+        self.state = 'resetting'
+        self._open_log(os.path.join(self.pool.log_dir, f"{self.name}.log"), mode='a')
+        await self._wait_until_ready()
+
+    async def run(self):
+        while True:
+            try:
+                await self._start()
+                while True:
+                    self.state = 'idle'
+                    assignment = await self.pool.queue.get()
+                    try:
+                        await self._play(assignment)
+                    finally:
+                        self.pool.queue.task_done()
+            except asyncio.CancelledError:
+                await self._stop()
+                raise
+            except Exception:
+                logger.exception("Warm pool worker %s failed, restarting it", self.name)
+            await self._stop()
+            await asyncio.sleep(RESTART_DELAY)
+
+
+class WarmPool:
+    """`size` workers started from `command` taking match assignments from one shared queue.
+
+    '{name}' in command is replaced by each worker's name, e.g. to name its container.
+    Runs on the event loop it is started from (the runner's background loop in the app).
+    """
+
+    def __init__(self, size: int, command: list[str], cwd: str | None = None, log_dir: str = '.',
+                 recorder=None):
+        self.command = command
+        self.cwd = cwd
+        self.log_dir = log_dir
+        self.recorder = recorder or PoolRecorder()
+        self.queue: asyncio.Queue[dict] = asyncio.Queue()
+        self.workers = [PoolWorker(self, number) for number in range(1, size + 1)]
+        self._tasks: list[asyncio.Task] = []
+
+    def start(self):
+        os.makedirs(self.log_dir, exist_ok=True)
+        self._tasks = [asyncio.create_task(worker.run()) for worker in self.workers]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, assignment: dict):
+        self.queue.put_nowait(assignment)
+
+    async def join(self):
+        """Wait until every submitted assignment has been played."""
+        await self.queue.join()
+
+    def status(self) -> dict[str, int]:
+        """Number of workers in each state, plus the queued assignments."""
+        return {**Counter(worker.state for worker in self.workers), 'queued': self.queue.qsize()}
+
+
+_pool: WarmPool | None = None
+
+
+def enabled() -> bool:
+    return settings.RUNNER_WARM_POOL_SIZE > 0
+
+
+def pool_status() -> dict[str, int]:
+    return _pool.status() if _pool is not None else {}
+
+
+async def _submit(assignment: dict):
+    global _pool
+    if _pool is None:
+        _pool = WarmPool(settings.RUNNER_WARM_POOL_SIZE, settings.RUNNER_WARM_POOL_COMMAND,
+                         cwd=runner.DOCKER_COMPOSE_PATH, log_dir=runner.MATCH_OUTPUT_DIR)
+        _pool.start()
+    _pool.submit(assignment)
+
+
+async def submit_match(match_id: int, race: str, build: str, difficulty: str, log_path: str):
+    """Queue a match for the next free warm worker, starting the pool on first use."""
+    await runner.in_background(_submit({
+        'match_id': match_id,
+        'race': race,
+        'build': build,
+        'difficulty': difficulty,
+        'log_path': log_path,
+    }))